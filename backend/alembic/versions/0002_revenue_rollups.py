@@ -0,0 +1,63 @@
+"""revenue_rollups table, backfilled from invoices
+
+Revision ID: 0002_revenue_rollups
+Revises: 0001_initial
+Create Date: 2025-11-01
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002_revenue_rollups"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+
+def _month(bind, column: str) -> str:
+    if bind.dialect.name == "sqlite":
+        return f"strftime('%Y-%m', {column})"
+    return f"DATE_FORMAT({column}, '%Y-%m')"
+
+
+def upgrade():
+    op.create_table(
+        "revenue_rollups",
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.owner_id"), primary_key=True),
+        sa.Column("house_id", sa.Integer(), primary_key=True),
+        sa.Column("month", sa.String(7), primary_key=True),
+        sa.Column("paid_total", sa.Float(), nullable=False),
+        sa.Column("paid_count", sa.Integer(), nullable=False),
+        sa.Column("pending_count", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+    # Backfill: đã thanh toán theo tháng payment_date, chưa thanh toán theo tháng due_date
+    bind = op.get_bind()
+    op.execute(sa.text(f"""
+        INSERT INTO revenue_rollups (owner_id, house_id, month, paid_total, paid_count, pending_count)
+        SELECT owner_id, house_id, month, SUM(paid_total), SUM(paid_count), SUM(pending_count)
+        FROM (
+            SELECT h.owner_id, r.house_id, {_month(bind, 'i.payment_date')} AS month,
+                   i.price + i.water_price + i.internet_price + i.general_price + i.electricity_price AS paid_total,
+                   1 AS paid_count, 0 AS pending_count
+            FROM invoices i
+            JOIN rented_rooms rr ON i.rr_id = rr.rr_id
+            JOIN rooms r ON rr.room_id = r.room_id
+            JOIN houses h ON r.house_id = h.house_id
+            WHERE i.is_paid = TRUE AND i.payment_date IS NOT NULL
+            UNION ALL
+            SELECT h.owner_id, r.house_id, {_month(bind, 'i.due_date')} AS month,
+                   0 AS paid_total, 0 AS paid_count, 1 AS pending_count
+            FROM invoices i
+            JOIN rented_rooms rr ON i.rr_id = rr.rr_id
+            JOIN rooms r ON rr.room_id = r.room_id
+            JOIN houses h ON r.house_id = h.house_id
+            WHERE i.is_paid = FALSE
+        ) t
+        GROUP BY owner_id, house_id, month
+    """))
+
+
+def downgrade():
+    op.drop_table("revenue_rollups")
@@ -0,0 +1,125 @@
+"""owner_id on rooms, rented_rooms and invoices, backfilled from houses
+
+Revision ID: 0003_denormalize_owner_id
+Revises: 0002_revenue_rollups
+Create Date: 2025-11-01
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003_denormalize_owner_id"
+down_revision = "0002_revenue_rollups"
+branch_labels = None
+depends_on = None
+
+# (bảng, câu lệnh backfill) - theo thứ tự cha -> con
+BACKFILL = [
+    ("rooms", "UPDATE rooms SET owner_id = (SELECT h.owner_id FROM houses h WHERE h.house_id = rooms.house_id)"),
+    ("rented_rooms", "UPDATE rented_rooms SET owner_id = (SELECT r.owner_id FROM rooms r WHERE r.room_id = rented_rooms.room_id)"),
+    ("invoices", "UPDATE invoices SET owner_id = (SELECT rr.owner_id FROM rented_rooms rr WHERE rr.rr_id = invoices.rr_id)"),
+]
+
+# Trigger MySQL giữ owner_id đồng bộ khi phòng đổi nhà / nhà đổi chủ (giống database_setup.sql)
+MYSQL_TRIGGERS = [
+    """
+    CREATE TRIGGER tr_before_update_room_owner
+    BEFORE UPDATE ON rooms
+    FOR EACH ROW
+    BEGIN
+        IF NEW.house_id <> OLD.house_id THEN
+            SET NEW.owner_id = (SELECT owner_id FROM houses WHERE house_id = NEW.house_id);
+        END IF;
+    END
+    """,
+    """
+    CREATE TRIGGER tr_after_update_room_owner
+    AFTER UPDATE ON rooms
+    FOR EACH ROW
+    BEGIN
+        IF NEW.owner_id <> OLD.owner_id THEN
+            UPDATE rented_rooms SET owner_id = NEW.owner_id WHERE room_id = NEW.room_id;
+            UPDATE invoices i
+            JOIN rented_rooms rr ON i.rr_id = rr.rr_id
+            SET i.owner_id = NEW.owner_id
+            WHERE rr.room_id = NEW.room_id;
+        END IF;
+    END
+    """,
+    """
+    CREATE TRIGGER tr_after_update_house_owner
+    AFTER UPDATE ON houses
+    FOR EACH ROW
+    BEGIN
+        IF NEW.owner_id <> OLD.owner_id THEN
+            UPDATE rooms SET owner_id = NEW.owner_id WHERE house_id = NEW.house_id;
+            UPDATE revenue_rollups SET owner_id = NEW.owner_id WHERE house_id = NEW.house_id;
+        END IF;
+    END
+    """,
+]
+
+
+
+def _deposit_trigger(with_owner: bool) -> str:
+    columns = "rr_id, owner_id" if with_owner else "rr_id"
+    values = "NEW.rr_id, NEW.owner_id" if with_owner else "NEW.rr_id"
+    return f"""
+    CREATE TRIGGER tr_after_insert_rented_room_invoice
+    AFTER INSERT ON rented_rooms
+    FOR EACH ROW
+    BEGIN
+        INSERT INTO invoices (
+            price, water_price, internet_price, general_price, electricity_price,
+            electricity_num, water_num, due_date, {columns}, is_paid, created_at
+        ) VALUES (
+            NEW.deposit, 0, 0, 0, 0,
+            0, 0, DATE_ADD(NEW.start_date, INTERVAL 30 DAY), {values}, FALSE, NOW()
+        );
+    END
+    """
+
+
+def _has_trigger(bind, name: str) -> bool:
+    return bool(bind.execute(
+        sa.text("SELECT COUNT(*) FROM information_schema.TRIGGERS WHERE TRIGGER_SCHEMA = DATABASE() AND TRIGGER_NAME = :name"),
+        {"name": name},
+    ).scalar())
+
+
+def upgrade():
+    for table, _ in BACKFILL:
+        op.add_column(table, sa.Column("owner_id", sa.Integer(), nullable=True))
+    for _, stmt in BACKFILL:
+        op.execute(sa.text(stmt))
+    for table, _ in BACKFILL:
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column("owner_id", existing_type=sa.Integer(), nullable=False)
+            batch.create_foreign_key(f"fk_{table}_owner_id", "users", ["owner_id"], ["owner_id"])
+            batch.create_index(f"ix_{table}_owner_id", ["owner_id"])
+
+    bind = op.get_bind()
+    if bind.dialect.name == "mysql":
+        # Trigger tạo hóa đơn tiền cọc (nếu đã cài từ database_setup.sql) phải ghi cả owner_id
+        if _has_trigger(bind, "tr_after_insert_rented_room_invoice"):
+            op.execute(sa.text("DROP TRIGGER tr_after_insert_rented_room_invoice"))
+            op.execute(sa.text(_deposit_trigger(with_owner=True)))
+        for name in ("tr_before_update_room_owner", "tr_after_update_room_owner", "tr_after_update_house_owner"):
+            op.execute(sa.text(f"DROP TRIGGER IF EXISTS {name}"))
+        for stmt in MYSQL_TRIGGERS:
+            op.execute(sa.text(stmt))
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "mysql":
+        for name in ("tr_before_update_room_owner", "tr_after_update_room_owner", "tr_after_update_house_owner"):
+            op.execute(sa.text(f"DROP TRIGGER IF EXISTS {name}"))
+        if _has_trigger(bind, "tr_after_insert_rented_room_invoice"):
+            op.execute(sa.text("DROP TRIGGER tr_after_insert_rented_room_invoice"))
+            op.execute(sa.text(_deposit_trigger(with_owner=False)))
+    for table, _ in reversed(BACKFILL):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_index(f"ix_{table}_owner_id")
+            batch.drop_constraint(f"fk_{table}_owner_id", type_="foreignkey")
+            batch.drop_column("owner_id")
@@ -0,0 +1,77 @@
+"""owner-scoped composite indexes for the hot CRUD / report queries
+
+Thay các index một cột chạy tay trong database_setup.sql (idx_*) và index owner_id
+đơn lẻ của 0003 bằng index ghép khớp với điều kiện lọc thực tế.
+
+Revision ID: 0004_hot_path_indexes
+Revises: 0003_denormalize_owner_id
+Create Date: 2025-11-01
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004_hot_path_indexes"
+down_revision = "0003_denormalize_owner_id"
+branch_labels = None
+depends_on = None
+
+# (tên, bảng, cột)
+INDEXES = [
+    # invoices: doanh thu đã thu theo payment_date / hóa đơn chờ theo due_date (theo chủ nhà)
+    ("ix_invoices_owner_paid_payment", "invoices", ["owner_id", "is_paid", "payment_date"]),
+    ("ix_invoices_owner_paid_due", "invoices", ["owner_id", "is_paid", "due_date"]),
+    ("ix_invoices_owner_due", "invoices", ["owner_id", "due_date"]),
+    ("ix_invoices_rr_paid_due", "invoices", ["rr_id", "is_paid", "due_date"]),
+    # rooms: phòng trống theo chủ nhà / theo nhà
+    ("ix_rooms_owner_available", "rooms", ["owner_id", "is_available"]),
+    ("ix_rooms_house_available", "rooms", ["house_id", "is_available"]),
+    # rented_rooms: hợp đồng đang hiệu lực theo chủ nhà / theo phòng
+    ("ix_rented_rooms_owner_active", "rented_rooms", ["owner_id", "is_active"]),
+    ("ix_rented_rooms_room_active", "rented_rooms", ["room_id", "is_active"]),
+    ("ix_houses_owner_id", "houses", ["owner_id"]),
+    ("ix_assets_room_id", "assets", ["room_id"]),
+    ("ix_revenue_rollups_owner_month", "revenue_rollups", ["owner_id", "month"]),
+]
+
+# Index bị thay thế (đã là tiền tố của index ghép ở trên)
+SUPERSEDED = [
+    ("ix_invoices_owner_id", "invoices", ["owner_id"]),
+    ("ix_rooms_owner_id", "rooms", ["owner_id"]),
+    ("ix_rented_rooms_owner_id", "rented_rooms", ["owner_id"]),
+]
+
+# Index chạy tay từ database_setup.sql, có thể có hoặc không
+LEGACY = [
+    ("idx_rooms_house_id", "rooms"),
+    ("idx_rooms_is_available", "rooms"),
+    ("idx_rented_rooms_room_id", "rented_rooms"),
+    ("idx_rented_rooms_is_active", "rented_rooms"),
+    ("idx_invoices_rr_id", "invoices"),
+    ("idx_invoices_is_paid", "invoices"),
+    ("idx_invoices_payment_date", "invoices"),
+    ("idx_assets_room_id", "assets"),
+    ("idx_houses_owner_id", "houses"),
+]
+
+
+def _existing(table: str):
+    return {ix["name"] for ix in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    # Tạo index mới trước để khoá ngoại luôn có index phục vụ khi xoá index cũ
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+    for name, table, _ in SUPERSEDED:
+        op.drop_index(name, table_name=table)
+    for name, table in LEGACY:
+        if name in _existing(table):
+            op.drop_index(name, table_name=table)
+
+
+def downgrade():
+    for name, table, columns in SUPERSEDED:
+        op.create_index(name, table, columns)
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,30 @@
+"""invoices.billing_month for idempotent monthly billing runs
+
+Hóa đơn do billing run tạo mang billing_month = 'YYYY-MM'; ràng buộc unique
+(rr_id, billing_month) đảm bảo mỗi hợp đồng chỉ có một hóa đơn tháng. Hóa đơn nhập
+tay (và hóa đơn đặt cọc từ trigger) để NULL nên không bị ảnh hưởng.
+
+Revision ID: 0005_invoice_billing_month
+Revises: 0004_hot_path_indexes
+Create Date: 2025-11-08
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005_invoice_billing_month"
+down_revision = "0004_hot_path_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("invoices") as batch:
+        batch.add_column(sa.Column("billing_month", sa.String(7), nullable=True))
+        batch.create_unique_constraint("uq_invoices_rr_billing_month", ["rr_id", "billing_month"])
+
+
+def downgrade():
+    with op.batch_alter_table("invoices") as batch:
+        batch.drop_constraint("uq_invoices_rr_billing_month", type_="unique")
+        batch.drop_column("billing_month")
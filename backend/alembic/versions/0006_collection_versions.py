@@ -0,0 +1,28 @@
+"""collection_versions table for ETag / conditional GET
+
+Revision ID: 0006_collection_versions
+Revises: 0005_invoice_billing_month
+Create Date: 2025-11-10
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006_collection_versions"
+down_revision = "0005_invoice_billing_month"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Không cần backfill: chưa có dòng nghĩa là version 0
+    op.create_table(
+        "collection_versions",
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.owner_id"), primary_key=True),
+        sa.Column("collection", sa.String(32), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("collection_versions")
@@ -0,0 +1,56 @@
+"""owner_kpis table for /reports/system-overview, backfilled from base tables
+
+Revision ID: 0007_owner_kpis
+Revises: 0006_collection_versions
+Create Date: 2025-11-14
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007_owner_kpis"
+down_revision = "0006_collection_versions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "owner_kpis",
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.owner_id"), primary_key=True),
+        sa.Column("total_houses", sa.Integer(), nullable=False),
+        sa.Column("total_rooms", sa.Integer(), nullable=False),
+        sa.Column("available_rooms", sa.Integer(), nullable=False),
+        sa.Column("occupied_rooms", sa.Integer(), nullable=False),
+        sa.Column("active_contracts", sa.Integer(), nullable=False),
+        sa.Column("pending_invoices", sa.Integer(), nullable=False),
+        sa.Column("revenue_month", sa.String(7)),
+        sa.Column("month_revenue", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+    # Backfill một lần (chạy lúc migrate, không phải mỗi request); doanh thu lấy từ revenue_rollups
+    # theo tháng thanh toán mới nhất, giống rebuild_owner_kpis
+    op.execute(sa.text("""
+        INSERT INTO owner_kpis (owner_id, total_houses, total_rooms, available_rooms, occupied_rooms,
+                                active_contracts, pending_invoices, revenue_month, month_revenue)
+        SELECT k.owner_id, k.total_houses, k.total_rooms, k.available_rooms, k.occupied_rooms,
+               k.active_contracts, k.pending_invoices, k.revenue_month,
+               COALESCE((SELECT SUM(rr.paid_total) FROM revenue_rollups rr
+                         WHERE rr.owner_id = k.owner_id AND rr.month = k.revenue_month), 0)
+        FROM (
+            SELECT u.owner_id,
+                (SELECT COUNT(*) FROM houses WHERE owner_id = u.owner_id) AS total_houses,
+                (SELECT COUNT(*) FROM rooms WHERE owner_id = u.owner_id) AS total_rooms,
+                (SELECT COUNT(*) FROM rooms WHERE owner_id = u.owner_id AND is_available = TRUE) AS available_rooms,
+                (SELECT COUNT(*) FROM rooms WHERE owner_id = u.owner_id AND is_available = FALSE) AS occupied_rooms,
+                (SELECT COUNT(*) FROM rented_rooms WHERE owner_id = u.owner_id AND is_active = TRUE) AS active_contracts,
+                (SELECT COUNT(*) FROM invoices WHERE owner_id = u.owner_id AND is_paid = FALSE) AS pending_invoices,
+                (SELECT MAX(month) FROM revenue_rollups WHERE owner_id = u.owner_id AND paid_count > 0) AS revenue_month
+            FROM users u
+        ) k
+    """))
+
+
+def downgrade():
+    op.drop_table("owner_kpis")
@@ -0,0 +1,98 @@
+"""house owner transfer moves the house's counters between owner_kpis rows
+
+Revision ID: 0008_house_owner_kpis
+Revises: 0007_owner_kpis
+Create Date: 2025-11-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008_house_owner_kpis"
+down_revision = "0007_owner_kpis"
+branch_labels = None
+depends_on = None
+
+# Bản của 0003: chỉ lan truyền owner_id
+OLD_TRIGGER = """
+    CREATE TRIGGER tr_after_update_house_owner
+    AFTER UPDATE ON houses
+    FOR EACH ROW
+    BEGIN
+        IF NEW.owner_id <> OLD.owner_id THEN
+            UPDATE rooms SET owner_id = NEW.owner_id WHERE house_id = NEW.house_id;
+            UPDATE revenue_rollups SET owner_id = NEW.owner_id WHERE house_id = NEW.house_id;
+        END IF;
+    END
+    """
+
+# Chuyển chỉ số của nhà từ dòng owner_kpis của chủ cũ sang chủ mới (giống database_setup.sql).
+# Doanh thu tháng: chủ cũ bớt phần của nhà trong revenue_month (tháng giữ nguyên, như khi xóa nhà);
+# chủ mới chuyển sang tháng thanh toán mới nhất của nhà nếu tháng đó mới hơn, rồi cộng phần của nhà.
+NEW_TRIGGER = """
+    CREATE TRIGGER tr_after_update_house_owner
+    AFTER UPDATE ON houses
+    FOR EACH ROW
+    BEGIN
+        DECLARE v_rooms, v_available, v_occupied, v_contracts, v_pending INT DEFAULT 0;
+        DECLARE v_house_month, v_old_month, v_new_month VARCHAR(7) DEFAULT NULL;
+        IF NEW.owner_id <> OLD.owner_id THEN
+            UPDATE rooms SET owner_id = NEW.owner_id WHERE house_id = NEW.house_id;
+            UPDATE revenue_rollups SET owner_id = NEW.owner_id WHERE house_id = NEW.house_id;
+
+            SELECT COUNT(*), COALESCE(SUM(is_available = TRUE), 0), COALESCE(SUM(is_available = FALSE), 0)
+            INTO v_rooms, v_available, v_occupied
+            FROM rooms WHERE house_id = NEW.house_id;
+            SELECT COUNT(*) INTO v_contracts
+            FROM rented_rooms rr JOIN rooms r ON rr.room_id = r.room_id
+            WHERE r.house_id = NEW.house_id AND rr.is_active = TRUE;
+            SELECT COALESCE(SUM(pending_count), 0), MAX(CASE WHEN paid_count > 0 THEN month END)
+            INTO v_pending, v_house_month
+            FROM revenue_rollups WHERE house_id = NEW.house_id;
+
+            SELECT revenue_month INTO v_old_month FROM owner_kpis WHERE owner_id = OLD.owner_id;
+            UPDATE owner_kpis SET
+                total_houses = total_houses - 1,
+                total_rooms = total_rooms - v_rooms,
+                available_rooms = available_rooms - v_available,
+                occupied_rooms = occupied_rooms - v_occupied,
+                active_contracts = active_contracts - v_contracts,
+                pending_invoices = pending_invoices - v_pending,
+                month_revenue = month_revenue - COALESCE((SELECT paid_total FROM revenue_rollups
+                                                          WHERE house_id = NEW.house_id AND month = v_old_month), 0)
+            WHERE owner_id = OLD.owner_id;
+
+            INSERT IGNORE INTO owner_kpis (owner_id, total_houses, total_rooms, available_rooms, occupied_rooms,
+                                           active_contracts, pending_invoices, month_revenue)
+            VALUES (NEW.owner_id, 0, 0, 0, 0, 0, 0, 0);
+            SELECT revenue_month INTO v_new_month FROM owner_kpis WHERE owner_id = NEW.owner_id;
+            IF v_house_month IS NOT NULL AND (v_new_month IS NULL OR v_new_month < v_house_month) THEN
+                SET v_new_month = v_house_month;
+                UPDATE owner_kpis SET revenue_month = v_new_month, month_revenue = 0 WHERE owner_id = NEW.owner_id;
+            END IF;
+            UPDATE owner_kpis SET
+                total_houses = total_houses + 1,
+                total_rooms = total_rooms + v_rooms,
+                available_rooms = available_rooms + v_available,
+                occupied_rooms = occupied_rooms + v_occupied,
+                active_contracts = active_contracts + v_contracts,
+                pending_invoices = pending_invoices + v_pending,
+                month_revenue = month_revenue + COALESCE((SELECT paid_total FROM revenue_rollups
+                                                          WHERE house_id = NEW.house_id AND month = v_new_month), 0)
+            WHERE owner_id = NEW.owner_id;
+        END IF;
+    END
+    """
+
+
+def upgrade():
+    # Trigger chỉ có trên MySQL; SQLite (dev) không đổi chủ nhà bằng trigger
+    if op.get_bind().dialect.name == "mysql":
+        op.execute(sa.text("DROP TRIGGER IF EXISTS tr_after_update_house_owner"))
+        op.execute(sa.text(NEW_TRIGGER))
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "mysql":
+        op.execute(sa.text("DROP TRIGGER IF EXISTS tr_after_update_house_owner"))
+        op.execute(sa.text(OLD_TRIGGER))
@@ -2,35 +2,62 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from datetime import datetime, date
 
-from ...core.security import get_current_active_user
-from ...models.user import User
-from ...services.ai_service import ai_service
+from ...core.security import get_current_active_user, Principal
+from ...services.ai_service import report_jobs
+from ...services import ai_jobs
 
 router = APIRouter()
 
 class RevenueReportRequest(BaseModel):
     start_date: date
     end_date: date
+    force_refresh: bool = False  # bỏ qua cache, luôn gọi lại model
+
+def _submit(request: RevenueReportRequest, current_user: Principal) -> ai_jobs.ReportJob:
+    return report_jobs.submit(
+        owner_id=current_user.owner_id,
+        start_date=request.start_date.strftime('%Y-%m-%d'),
+        end_date=request.end_date.strftime('%Y-%m-%d'),
+        force_refresh=request.force_refresh,
+    )
+
+@router.post("/revenue-report-jobs", status_code=202)
+async def submit_revenue_report_job(
+    request: RevenueReportRequest,
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """
+    Đưa yêu cầu báo cáo AI vào hàng đợi, trả job_id ngay; poll GET /revenue-report-jobs/{job_id} để lấy kết quả
+    """
+    return _submit(request, current_user).to_dict()
+
+@router.get("/revenue-report-jobs/{job_id}")
+async def read_revenue_report_job(
+    job_id: str,
+    current_user: Principal = Depends(get_current_active_user)
+):
+    job = report_jobs.get(job_id, owner_id=current_user.owner_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
 @router.post("/generate-revenue-report")
 async def generate_revenue_report(
     request: RevenueReportRequest,
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """
-    Tạo báo cáo doanh thu bằng AI (phạm vi tài khoản đang đăng nhập)
+    Tạo báo cáo doanh thu bằng AI (phạm vi tài khoản đang đăng nhập).
+    Giữ cho frontend cũ: chạy qua cùng hàng đợi job và chờ kết quả, không chặn event loop.
     """
-    try:
-        report = ai_service.generate_revenue_report(
-            start_date=request.start_date.strftime('%Y-%m-%d'),
-            end_date=request.end_date.strftime('%Y-%m-%d'),
-            owner_id=current_user.owner_id
-        )
-
-        return {
-            "report": report,
-            "period": f"{request.start_date} đến {request.end_date}",
-            "timestamp": datetime.now()
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Lỗi AI service: {str(e)}")
+    job = await report_jobs.wait(_submit(request, current_user))
+    if job.status == ai_jobs.TIMEOUT:
+        raise HTTPException(status_code=504, detail=f"Lỗi AI service: {job.error}")
+    if job.status != ai_jobs.SUCCEEDED:
+        raise HTTPException(status_code=500, detail=f"Lỗi AI service: {job.error}")
+
+    return {
+        "report": job.report,
+        "period": f"{request.start_date} đến {request.end_date}",
+        "timestamp": datetime.now()
+    }
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from . import auth, users, houses, rooms, assets, rented_rooms, invoices, ai, reports
+from . import auth, users, houses, rooms, assets, rented_rooms, invoices, ai, reports, internal
 
 api_router = APIRouter()
 
@@ -12,3 +12,4 @@ api_router.include_router(rented_rooms.router, prefix="/rented-rooms", tags=["re
 api_router.include_router(invoices.router, prefix="/invoices", tags=["invoices"])
 api_router.include_router(ai.router, prefix="/ai", tags=["ai-chatbot"])
 api_router.include_router(reports.router, prefix="/reports", tags=["reports"])
+api_router.include_router(internal.router, prefix="/internal", tags=["internal"])
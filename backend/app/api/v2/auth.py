@@ -1,19 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from datetime import timedelta
 
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
 from app.core.config import settings
-from app.core.security import authenticate_user, create_access_token
+from app.core.security import authenticate_user_async, create_access_token, get_password_hash_async, principal_cache, Principal
 from app.schemas.user import Token, UserLogin, User, UserCreate
 from app.crud import user as user_crud
 
 router = APIRouter()
 
 @router.post("/login", response_model=Token)
-async def login_for_access_token(credentials: UserLogin,db: Session = Depends(get_db)):
-    user = authenticate_user(db, credentials.email, credentials.password)
+async def login_for_access_token(credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    user = await authenticate_user_async(db, credentials.email, credentials.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -21,12 +22,13 @@ async def login_for_access_token(credentials: UserLogin,db: Session = Depends(ge
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # Only allow owner role to log in
-    if not hasattr(user, 'role') or user.role is None:
-        db.refresh(user, ['role'])
+    # Only allow owner role to log in (role is eager-loaded)
     if not user.role or user.role.authority != 'owner':
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only owner is allowed to login")
 
+    # Nạp sẵn cache để request đầu tiên với token mới không phải truy vấn lại
+    principal_cache.set(user.owner_id, Principal.from_user(user))
+
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
         data={"sub": user.email, "oid": user.owner_id}, expires_delta=access_token_expires
@@ -45,8 +47,9 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
     db_phone_user = user_crud.get_user_by_phone(db, phone=user.phone)
     if db_phone_user:
         raise HTTPException(status_code=400, detail="Phone already registered")
+    hashed_password = await get_password_hash_async(user.password)
     try:
-        return user_crud.create_user(db=db, user=user)
+        return user_crud.create_user(db=db, user=user, hashed_password=hashed_password)
     except IntegrityError:
         db.rollback()
         # In case of race condition or DB unique constraint violation
@@ -1,37 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.core.database import get_db
-from app.core.security import get_current_active_user
+from app.core.security import get_current_active_user, Principal
+from app.core.pagination import set_next_cursor
+from app.core.etag import conditional_get
 from app.schemas.house import House, HouseCreate, HouseUpdate
-from app.schemas.user import User
-from app.crud import house as house_crud
+from app.crud import house as house_crud, collection_version
 from app.models.room import Room
 from app.models.rented_room import RentedRoom
 
 router = APIRouter()
 
+not_modified = Depends(conditional_get(collection_version.HOUSES))
+
 @router.post("/", response_model=House)
 def create_house(
     house: HouseCreate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     return house_crud.create_house(db=db, house=house, owner_id=current_user.owner_id)
 
-@router.get("/", response_model=List[House])
+@router.get("/", response_model=List[House], dependencies=[not_modified])
 def read_houses(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(get_current_active_user),
+    after: Optional[str] = Query(default=None, description="Cursor từ header X-Next-Cursor"),
+    current_user: Principal = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    houses = house_crud.get_houses_by_owner(db, owner_id=current_user.owner_id, skip=skip, limit=limit)
-    return houses
+    houses = house_crud.get_houses_by_owner(db, owner_id=current_user.owner_id, skip=skip, limit=limit, after=after)
+    return set_next_cursor(response, houses, limit, house_crud.HOUSE_SORT)
 
-@router.get("/{house_id}", response_model=House)
-def read_house(house_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+@router.get("/{house_id}", response_model=House, dependencies=[not_modified])
+def read_house(house_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
     db_house = house_crud.get_house_by_id(db, house_id=house_id, owner_id=current_user.owner_id)
     if db_house is None:
         raise HTTPException(status_code=404, detail="House not found")
@@ -42,7 +47,7 @@ def update_house(
     house_id: int,
     house_update: HouseUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     db_house = house_crud.update_house(db, house_id=house_id, house_update=house_update, owner_id=current_user.owner_id)
     if db_house is None:
@@ -50,7 +55,7 @@ def update_house(
     return db_house
 
 @router.delete("/{house_id}")
-def delete_house(house_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+def delete_house(house_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
     # Ensure house belongs to current user
     db_house = house_crud.get_house_by_id(db, house_id=house_id, owner_id=current_user.owner_id)
     if db_house is None:
@@ -0,0 +1,76 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+
+from app.core.database import engine, async_engine
+from app.core.pool_metrics import pool_snapshot
+from app.core.request_metrics import request_metrics
+from app.core.slow_query import slow_query_log
+from app.core.security import require_internal_access, principal_cache, password_hasher_stats
+from app.services.ai_service import ai_service, report_cache, report_jobs
+from app.services.occupancy import occupancy_cache
+
+# Endpoint vận hành, không dành cho frontend
+router = APIRouter(dependencies=[Depends(require_internal_access)])
+
+@router.get("/pool")
+def read_pool_metrics():
+    """
+    Trạng thái connection pool (sync + async): số connection đang mượn, overflow, histogram thời gian chờ
+    """
+    return {
+        "sync": pool_snapshot(engine.pool),
+        "async": pool_snapshot(async_engine.sync_engine.pool),
+    }
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def read_request_metrics():
+    """
+    Số liệu theo route dạng Prometheus text (theo từng worker): histogram độ trễ, số câu SQL và thời gian SQL
+    mỗi request, số request có câu SQL giống hệt lặp lại (nghi vấn N+1) kèm câu SQL đó
+    """
+    return PlainTextResponse(request_metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/slow-queries")
+def read_slow_queries(limit: int = Query(default=50, ge=1, le=1000)):
+    """
+    Truy vấn chậm gần nhất (mới nhất trước, theo từng worker): câu SQL, tham số (đã che theo
+    slow_query_redact_tables), route, frame gọi, EXPLAIN
+    """
+    if slow_query_log is None:
+        return {"enabled": False, "queries": []}
+    return {"enabled": True, **slow_query_log.stats(), "queries": slow_query_log.recent(limit)}
+
+@router.delete("/slow-queries")
+def clear_slow_queries():
+    """
+    Xóa ring buffer truy vấn chậm (file log giữ nguyên)
+    """
+    if slow_query_log is not None:
+        slow_query_log.clear()
+    return {"message": "Slow query buffer cleared"}
+
+@router.get("/caches")
+def read_cache_stats():
+    """
+    Hit/miss của các cache trong tiến trình (theo từng worker)
+    """
+    return {
+        "principal": principal_cache.stats(),
+        "ai_report": report_cache.stats(),
+        "occupancy": occupancy_cache.stats(),
+    }
+
+@router.get("/password-hasher")
+def read_password_hasher_stats():
+    """
+    Executor bcrypt: số job đang chờ/chạy và số request bị từ chối (503)
+    """
+    return password_hasher_stats()
+
+@router.get("/ai-report-jobs")
+def read_ai_report_job_stats():
+    """
+    Hàng đợi job báo cáo AI: số job đang chờ/chạy, bị từ chối (503), thành công, lỗi, quá thời gian;
+    kèm bộ giới hạn lời gọi LLM (backend, số lời gọi đang chạy, timeout)
+    """
+    return {**report_jobs.stats(), "llm": ai_service.llm_stats()}
@@ -1,33 +1,121 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from typing import List, Optional
 
 from app.core.database import get_db
-from app.schemas.invoice import Invoice, InvoiceCreate, InvoiceUpdate, InvoiceWithDetails
-from app.crud import invoice as invoice_crud
-from app.core.security import get_current_active_user
-from app.schemas.user import User
+from app.schemas.invoice import Invoice, InvoiceCreate, InvoiceUpdate, InvoiceWithDetails, BillingRunRequest, BillingRunSummary, MeterReadingImportSummary
+from app.crud import invoice as invoice_crud, meter_reading as meter_reading_crud, collection_version
+from app.core.security import get_current_active_user, Principal
+from app.core.pagination import set_next_cursor
+from app.core.etag import conditional_get
+from app.services.meter_import import CHUNK_SIZE, detect_format, iter_readings
+from app.services import invoice_export
 
 router = APIRouter()
 
+# Hóa đơn nhúng hợp đồng (rented_room) nên ETag theo cả hai tập dữ liệu
+not_modified = Depends(conditional_get(collection_version.INVOICES, collection_version.RENTED_ROOMS))
+
 @router.post("/", response_model=InvoiceWithDetails)
-def create_invoice(invoice: InvoiceCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+def create_invoice(invoice: InvoiceCreate, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
     created = invoice_crud.create_invoice(db=db, invoice=invoice, owner_id=current_user.owner_id)
     if created is None:
         raise HTTPException(status_code=404, detail="Rented room not found or not owned by user")
     # Return with details
     return invoice_crud.get_invoice_by_id(db, created.invoice_id, current_user.owner_id)
 
-@router.get("/", response_model=List[InvoiceWithDetails])
+@router.post("/billing-run", response_model=BillingRunSummary)
+def run_billing(request: BillingRunRequest, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
+    """
+    Tạo hóa đơn tháng cho mọi hợp đồng đang hiệu lực (một transaction). Chạy lại cùng tháng sẽ bỏ qua hợp đồng đã có hóa đơn.
+    """
+    try:
+        summary = invoice_crud.run_billing(
+            db,
+            owner_id=current_user.owner_id,
+            month=request.month,
+            house_id=request.house_id,
+            due_day=request.due_day,
+        )
+    except IntegrityError:
+        db.rollback()
+        # Một lần chạy khác cho cùng tháng vừa ghi trước - chạy lại sẽ chỉ tạo phần còn thiếu
+        raise HTTPException(status_code=409, detail="Billing run for this month is already in progress, please retry")
+    if summary is None:
+        raise HTTPException(status_code=404, detail="House not found or not owned by user")
+    return summary
+
+# Giới hạn số lỗi trả về trong response (tổng số vẫn nằm ở failed)
+MAX_REPORTED_ERRORS = 1000
+
+@router.post("/meter-readings", response_model=MeterReadingImportSummary)
+async def import_meter_readings(
+    request: Request,
+    format: Optional[str] = Query(default=None, pattern="^(csv|jsonl)$", description="Mặc định theo Content-Type (text/csv, application/x-ndjson)"),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """
+    Nhập chỉ số điện/nước hàng loạt từ body CSV hoặc JSON lines (đọc dần từng dòng).
+    Mỗi dòng: invoice_id hoặc rr_id + month, electricity_num, water_num (tùy chọn).
+    Tiền điện tính ở server; dòng lỗi được báo lại mà không dừng cả file.
+    """
+    fmt = detect_format(request.headers.get("content-type"), format)
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Chỉ hỗ trợ text/csv hoặc application/x-ndjson")
+
+    processed = updated = 0
+    errors = []
+    batch = []
+
+    async def flush():
+        nonlocal updated
+        chunk = list(batch)
+        batch.clear()
+        try:
+            # Ghi DB (sync) ngoài event loop; session chỉ dùng tuần tự nên an toàn
+            n, chunk_errors = await run_in_threadpool(meter_reading_crud.apply_readings, db, current_user.owner_id, chunk)
+        except SQLAlchemyError as e:
+            await run_in_threadpool(db.rollback)
+            n, chunk_errors = 0, [(r.line, f"Lỗi ghi dữ liệu: {e.__class__.__name__}") for r in chunk]
+        updated += n
+        errors.extend(chunk_errors)
+
+    async for line_no, item in iter_readings(request.stream(), fmt):
+        processed += 1
+        if isinstance(item, str):
+            errors.append((line_no, item))
+            continue
+        batch.append(item)
+        if len(batch) >= CHUNK_SIZE:
+            await flush()
+    if batch:
+        await flush()
+
+    errors.sort()
+    return {
+        "processed": processed,
+        "updated": updated,
+        "failed": len(errors),
+        "errors": [{"row": row, "error": message} for row, message in errors[:MAX_REPORTED_ERRORS]],
+        "errors_truncated": len(errors) > MAX_REPORTED_ERRORS,
+    }
+
+@router.get("/", response_model=List[InvoiceWithDetails], dependencies=[not_modified])
 def read_invoices(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    after: Optional[str] = Query(default=None, description="Cursor từ header X-Next-Cursor"),
     month: Optional[str] = Query(default=None, description="YYYY-MM"),
     house_id: Optional[int] = None,
     room_id: Optional[int] = None,
     is_paid: Optional[bool] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     # If any filter provided, use filtered fetch; else fallback to existing behavior
     if any(v is not None for v in [month, house_id, room_id, is_paid]):
@@ -40,23 +128,47 @@ def read_invoices(
             house_id=house_id,
             room_id=room_id,
             is_paid=is_paid,
+            after=after,
         )
     else:
-        invoices = invoice_crud.get_all_invoices(db, owner_id=current_user.owner_id, skip=skip, limit=limit)
-    return invoices
+        invoices = invoice_crud.get_all_invoices(db, owner_id=current_user.owner_id, skip=skip, limit=limit, after=after)
+    return set_next_cursor(response, invoices, limit, invoice_crud.INVOICE_SORT)
+
+@router.get("/export")
+def export_invoices(
+    format: str = Query(default="csv", pattern="^(csv|xlsx)$"),
+    month: Optional[str] = Query(default=None, description="YYYY-MM"),
+    house_id: Optional[int] = None,
+    room_id: Optional[int] = None,
+    is_paid: Optional[bool] = None,
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """
+    Xuất toàn bộ hóa đơn (cùng bộ lọc với GET /invoices/) dạng CSV hoặc XLSX, stream theo từng lô
+    """
+    if format == "xlsx" and not invoice_export.xlsx_available():
+        raise HTTPException(status_code=501, detail="Xuất XLSX cần cài openpyxl")
+    filters = dict(month=month, house_id=house_id, room_id=room_id, is_paid=is_paid)
+    stream = invoice_export.stream_xlsx if format == "xlsx" else invoice_export.stream_csv
+    filename = f"invoices-{month or 'all'}.{format}"
+    return StreamingResponse(
+        stream(current_user.owner_id, filters),
+        media_type=invoice_export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
-@router.get("/rented-room/{rr_id}", response_model=List[InvoiceWithDetails])
-def read_invoices_by_rented_room(rr_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+@router.get("/rented-room/{rr_id}", response_model=List[InvoiceWithDetails], dependencies=[not_modified])
+def read_invoices_by_rented_room(rr_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
     invoices = invoice_crud.get_invoices_by_rented_room(db, rr_id=rr_id, owner_id=current_user.owner_id)
     return invoices
 
-@router.get("/pending", response_model=List[InvoiceWithDetails])
-def read_pending_invoices(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    invoices = invoice_crud.get_pending_invoices(db, owner_id=current_user.owner_id, skip=skip, limit=limit)
-    return invoices
+@router.get("/pending", response_model=List[InvoiceWithDetails], dependencies=[not_modified])
+def read_pending_invoices(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = Query(default=None, description="Cursor từ header X-Next-Cursor"), db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
+    invoices = invoice_crud.get_pending_invoices(db, owner_id=current_user.owner_id, skip=skip, limit=limit, after=after)
+    return set_next_cursor(response, invoices, limit, invoice_crud.INVOICE_SORT)
 
-@router.get("/{invoice_id}", response_model=InvoiceWithDetails)
-def read_invoice(invoice_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+@router.get("/{invoice_id}", response_model=InvoiceWithDetails, dependencies=[not_modified])
+def read_invoice(invoice_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
     db_invoice = invoice_crud.get_invoice_by_id(db, invoice_id=invoice_id, owner_id=current_user.owner_id)
     if db_invoice is None:
         raise HTTPException(status_code=404, detail="Invoice not found")
@@ -67,7 +179,7 @@ def update_invoice(
     invoice_id: int,
     invoice_update: InvoiceUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     db_invoice = invoice_crud.update_invoice(db, invoice_id=invoice_id, invoice_update=invoice_update, owner_id=current_user.owner_id)
     if db_invoice is None:
@@ -75,14 +187,14 @@ def update_invoice(
     return db_invoice
 
 @router.post("/{invoice_id}/pay")
-def pay_invoice(invoice_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+def pay_invoice(invoice_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
     db_invoice = invoice_crud.mark_invoice_paid(db, invoice_id=invoice_id, owner_id=current_user.owner_id)
     if db_invoice is None:
         raise HTTPException(status_code=404, detail="Invoice not found")
     return {"message": "Invoice paid successfully"}
 
 @router.delete("/{invoice_id}")
-def delete_invoice(invoice_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+def delete_invoice(invoice_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
     ok = invoice_crud.delete_invoice(db, invoice_id=invoice_id, owner_id=current_user.owner_id)
     if not ok:
         raise HTTPException(status_code=404, detail="Invoice not found")
@@ -1,34 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.core.database import get_db
 from app.schemas.rented_room import RentedRoom, RentedRoomCreate, RentedRoomUpdate
-from app.crud import rented_room as rented_room_crud
-from app.core.security import get_current_active_user
-from app.schemas.user import User
+from app.crud import rented_room as rented_room_crud, collection_version
+from app.core.security import get_current_active_user, Principal
+from app.core.pagination import set_next_cursor
+from app.core.etag import conditional_get
 
 router = APIRouter()
 
+not_modified = Depends(conditional_get(collection_version.RENTED_ROOMS))
+
 @router.post("/", response_model=RentedRoom)
-def create_rented_room(rented_room: RentedRoomCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+def create_rented_room(rented_room: RentedRoomCreate, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
     created = rented_room_crud.create_rented_room(db=db, rented_room=rented_room, owner_id=current_user.owner_id)
     if created is None:
         raise HTTPException(status_code=400, detail="Room is not available or not owned by user")
     return created
 
-@router.get("/", response_model=List[RentedRoom])
-def read_rented_rooms(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    rented_rooms = rented_room_crud.get_active_rented_rooms(db, owner_id=current_user.owner_id, skip=skip, limit=limit)
-    return rented_rooms
+@router.get("/", response_model=List[RentedRoom], dependencies=[not_modified])
+def read_rented_rooms(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = Query(default=None, description="Cursor từ header X-Next-Cursor"), db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
+    rented_rooms = rented_room_crud.get_active_rented_rooms(db, owner_id=current_user.owner_id, skip=skip, limit=limit, after=after)
+    return set_next_cursor(response, rented_rooms, limit, rented_room_crud.RENTED_ROOM_SORT)
 
-@router.get("/room/{room_id}", response_model=List[RentedRoom])
-def read_rented_rooms_by_room(room_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+@router.get("/room/{room_id}", response_model=List[RentedRoom], dependencies=[not_modified])
+def read_rented_rooms_by_room(room_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
     rented_rooms = rented_room_crud.get_rented_rooms_by_room(db, room_id=room_id, owner_id=current_user.owner_id)
     return rented_rooms
 
-@router.get("/{rr_id}", response_model=RentedRoom)
-def read_rented_room(rr_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+@router.get("/{rr_id}", response_model=RentedRoom, dependencies=[not_modified])
+def read_rented_room(rr_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
     db_rented_room = rented_room_crud.get_rented_room_by_id(db, rr_id=rr_id, owner_id=current_user.owner_id)
     if db_rented_room is None:
         raise HTTPException(status_code=404, detail="Rented room not found")
@@ -39,7 +42,7 @@ def update_rented_room(
     rr_id: int,
     rented_room_update: RentedRoomUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     db_rented_room = rented_room_crud.update_rented_room(db, rr_id=rr_id, rented_room_update=rented_room_update, owner_id=current_user.owner_id)
     if db_rented_room is None:
@@ -47,7 +50,7 @@ def update_rented_room(
     return db_rented_room
 
 @router.post("/{rr_id}/terminate")
-def terminate_rental(rr_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+def terminate_rental(rr_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
     db_rented_room = rented_room_crud.terminate_rental(db, rr_id=rr_id, owner_id=current_user.owner_id)
     if db_rented_room is None:
         raise HTTPException(status_code=404, detail="Rented room not found")
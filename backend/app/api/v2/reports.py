@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import text
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Literal, Optional
 from datetime import datetime, date
 
-from app.core.database import get_db
-from app.core.security import get_current_active_user
-from app.models.user import User
+from app.core.database import get_async_db
+from app.core.security import get_current_active_user, Principal
+from app.core.config import settings
+from app.services.reporting import compute_revenue_stats_async, compute_revenue_series_async
+from app.services.occupancy import get_occupancy_async
+from app.crud import owner_kpi
 
 router = APIRouter()
 
@@ -24,85 +26,26 @@ class RevenueStatsRequest(BaseModel):
 @router.post("/revenue-stats", response_model=RevenueStatsResponse)
 async def get_revenue_stats(
     request: RevenueStatsRequest,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Lấy thống kê doanh thu theo chủ nhà (owner)
     """
     try:
-        params = {
-            'start_date': request.start_date,
-            'end_date': request.end_date,
-            'owner_id': current_user.owner_id,
-        }
-
-        # Tổng doanh thu đã thanh toán trong khoảng
-        total_revenue = db.execute(text(
-            """
-            SELECT COALESCE(SUM(i.price + i.water_price + i.internet_price + i.general_price + i.electricity_price), 0) AS total
-            FROM invoices i
-            JOIN rented_rooms rr ON i.rr_id = rr.rr_id
-            JOIN rooms r ON rr.room_id = r.room_id
-            JOIN houses h ON r.house_id = h.house_id
-            WHERE i.is_paid = TRUE
-              AND i.payment_date BETWEEN :start_date AND :end_date
-              AND h.owner_id = :owner_id
-            """
-        ), params).scalar() or 0
-
-        # Số hóa đơn đã thanh toán
-        paid_invoices = db.execute(text(
-            """
-            SELECT COUNT(*)
-            FROM invoices i
-            JOIN rented_rooms rr ON i.rr_id = rr.rr_id
-            JOIN rooms r ON rr.room_id = r.room_id
-            JOIN houses h ON r.house_id = h.house_id
-            WHERE i.is_paid = TRUE
-              AND i.payment_date BETWEEN :start_date AND :end_date
-              AND h.owner_id = :owner_id
-            """
-        ), params).scalar() or 0
-
-        # Số hóa đơn chưa thanh toán đến hạn trong khoảng
-        pending_invoices = db.execute(text(
-            """
-            SELECT COUNT(*)
-            FROM invoices i
-            JOIN rented_rooms rr ON i.rr_id = rr.rr_id
-            JOIN rooms r ON rr.room_id = r.room_id
-            JOIN houses h ON r.house_id = h.house_id
-            WHERE i.is_paid = FALSE
-              AND i.due_date BETWEEN :start_date AND :end_date
-              AND h.owner_id = :owner_id
-            """
-        ), params).scalar() or 0
-
-        # Doanh thu trung bình hàng tháng
-        avg_monthly_revenue = db.execute(text(
-            """
-            SELECT COALESCE(AVG(monthly_revenue), 0) AS avg_rev
-            FROM (
-                SELECT DATE_FORMAT(i.payment_date, '%Y-%m') AS month,
-                       SUM(i.price + i.water_price + i.internet_price + i.general_price + i.electricity_price) AS monthly_revenue
-                FROM invoices i
-                JOIN rented_rooms rr ON i.rr_id = rr.rr_id
-                JOIN rooms r ON rr.room_id = r.room_id
-                JOIN houses h ON r.house_id = h.house_id
-                WHERE i.is_paid = TRUE
-                  AND i.payment_date BETWEEN :start_date AND :end_date
-                  AND h.owner_id = :owner_id
-                GROUP BY DATE_FORMAT(i.payment_date, '%Y-%m')
-            ) t
-            """
-        ), params).scalar() or 0
+        # Đọc từ bảng tổng hợp revenue_rollups (tháng trọn vẹn) + hóa đơn của tháng đầu/cuối
+        stats = await compute_revenue_stats_async(
+            db,
+            owner_id=current_user.owner_id,
+            start_date=request.start_date,
+            end_date=request.end_date,
+        )
 
         return RevenueStatsResponse(
-            total_revenue=float(total_revenue),
-            paid_invoices=int(paid_invoices),
-            pending_invoices=int(pending_invoices),
-            avg_monthly_revenue=float(avg_monthly_revenue)
+            total_revenue=stats.total_revenue,
+            paid_invoices=stats.paid_invoices,
+            pending_invoices=stats.pending_invoices,
+            avg_monthly_revenue=stats.avg_monthly_revenue
         )
         
     except Exception as e:
@@ -111,51 +54,89 @@ async def get_revenue_stats(
 
 @router.get("/system-overview")
 async def get_system_overview(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Lấy tổng quan hệ thống theo chủ nhà (owner)
     """
     try:
-        # Thống kê tổng quan theo owner
-        stats = db.execute(text("""
-            SELECT 
-                (SELECT COUNT(*) FROM houses WHERE owner_id = :owner_id) as total_houses,
-                (SELECT COUNT(*) FROM rooms r JOIN houses h ON r.house_id = h.house_id WHERE h.owner_id = :owner_id) as total_rooms,
-                (SELECT COUNT(*) FROM rooms r JOIN houses h ON r.house_id = h.house_id WHERE r.is_available = TRUE AND h.owner_id = :owner_id) as available_rooms,
-                (SELECT COUNT(*) FROM rooms r JOIN houses h ON r.house_id = h.house_id WHERE r.is_available = FALSE AND h.owner_id = :owner_id) as occupied_rooms,
-                (SELECT COUNT(*) FROM rented_rooms rr JOIN rooms r ON rr.room_id = r.room_id JOIN houses h ON r.house_id = h.house_id WHERE rr.is_active = TRUE AND h.owner_id = :owner_id) as active_contracts,
-                (SELECT COUNT(*) FROM invoices i JOIN rented_rooms rr ON i.rr_id = rr.rr_id JOIN rooms r ON rr.room_id = r.room_id JOIN houses h ON r.house_id = h.house_id WHERE i.is_paid = FALSE AND h.owner_id = :owner_id) as pending_invoices
-        """), {'owner_id': current_user.owner_id}).fetchone()
-
-        # Doanh thu tháng hiện tại theo owner
-        current_month_revenue = db.execute(text("""
-            SELECT 
-                COALESCE(SUM(i.price + i.water_price + i.internet_price + i.general_price + i.electricity_price), 0) as revenue
-            FROM invoices i 
-            JOIN rented_rooms rr ON i.rr_id = rr.rr_id
-            JOIN rooms r ON rr.room_id = r.room_id
-            JOIN houses h ON r.house_id = h.house_id
-            WHERE i.is_paid = TRUE 
-              AND DATE_FORMAT(i.payment_date, '%Y-%m') = DATE_FORMAT(NOW(), '%Y-%m')
-              AND h.owner_id = :owner_id
-        """), {'owner_id': current_user.owner_id}).fetchone()
+        # Một dòng owner_kpis theo khóa chính (các bộ đếm được CRUD cập nhật cùng transaction)
+        stats = await owner_kpi.get_overview_async(db, current_user.owner_id)
 
         # Tỷ lệ lấp đầy
-        occupancy_rate = (stats.occupied_rooms / stats.total_rooms * 100) if stats.total_rooms > 0 else 0
+        occupancy_rate = (stats['occupied_rooms'] / stats['total_rooms'] * 100) if stats['total_rooms'] > 0 else 0
         
         return {
-            'total_houses': stats.total_houses,
-            'total_rooms': stats.total_rooms,
-            'available_rooms': stats.available_rooms,
-            'occupied_rooms': stats.occupied_rooms,
+            'total_houses': stats['total_houses'],
+            'total_rooms': stats['total_rooms'],
+            'available_rooms': stats['available_rooms'],
+            'occupied_rooms': stats['occupied_rooms'],
             'occupancy_rate': round(occupancy_rate, 2),
-            'active_contracts': stats.active_contracts,
-            'pending_invoices': stats.pending_invoices,
-            'current_month_revenue': float(current_month_revenue.revenue or 0),
+            'active_contracts': stats['active_contracts'],
+            'pending_invoices': stats['pending_invoices'],
+            'current_month_revenue': stats['current_month_revenue'],
             'generated_at': datetime.now()
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Lỗi khi lấy tổng quan hệ thống: {str(e)}")
+
+
+# YYYY-MM, tháng 01-12
+MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+def check_month_range(start_month: str, end_month: str):
+    start_year, start_mon = map(int, start_month.split("-"))
+    end_year, end_mon = map(int, end_month.split("-"))
+    months = (end_year - start_year) * 12 + end_mon - start_mon + 1
+    if months < 1:
+        raise HTTPException(status_code=400, detail="end_month phải không trước start_month")
+    if months > settings.report_max_months:
+        raise HTTPException(status_code=400, detail=f"Tối đa {settings.report_max_months} tháng mỗi lần truy vấn")
+
+
+@router.get("/occupancy")
+async def get_occupancy(
+    start_month: str = Query(..., pattern=MONTH_PATTERN, description="YYYY-MM"),
+    end_month: str = Query(..., pattern=MONTH_PATTERN, description="YYYY-MM"),
+    house_id: Optional[int] = Query(default=None),
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Tỷ lệ lấp đầy theo tháng (ngày-phòng có hợp đồng / ngày-phòng) cho từng nhà trọ và toàn bộ
+
+    Một phòng được tính là tồn tại từ created_at (rỗng: từ đầu khoảng báo cáo), hoặc từ ngày bắt đầu
+    hợp đồng đầu tiên nếu sớm hơn (dữ liệu nhập lại có created_at muộn hơn hợp đồng). Vì vậy phòng chưa
+    từng có hợp đồng chỉ làm tăng ngày-phòng từ created_at, còn phòng nhập lại không có ngày-phòng trống
+    trước hợp đồng đầu tiên (các tháng đó có thể báo 100%).
+    """
+    check_month_range(start_month, end_month)
+    return await get_occupancy_async(db, current_user.owner_id, start_month, end_month, house_id)
+
+
+@router.get("/revenue-series")
+async def get_revenue_series(
+    start_month: str = Query(..., pattern=MONTH_PATTERN, description="YYYY-MM"),
+    end_month: str = Query(..., pattern=MONTH_PATTERN, description="YYYY-MM"),
+    group_by: Literal["house", "room"] = Query(default="house"),
+    house_id: Optional[int] = Query(default=None),
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Doanh thu theo tháng x nhà trọ (hoặc x phòng): tiền đã thu / còn chờ và số hóa đơn, dạng mảng theo tháng
+    """
+    check_month_range(start_month, end_month)
+    try:
+        return await compute_revenue_series_async(
+            db,
+            owner_id=current_user.owner_id,
+            start_month=start_month,
+            end_month=end_month,
+            by_room=group_by == "room",
+            house_id=house_id,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Lỗi khi lấy chuỗi doanh thu: {str(e)}")
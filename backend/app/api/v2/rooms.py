@@ -1,40 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.core.database import get_db
 from app.schemas.room import Room, RoomCreate, RoomUpdate
-from app.crud import room as room_crud
-from app.core.security import get_current_active_user
-from app.schemas.user import User
+from app.crud import room as room_crud, collection_version
+from app.core.security import get_current_active_user, Principal
+from app.core.pagination import set_next_cursor
+from app.core.etag import conditional_get
 from app.models.rented_room import RentedRoom
 
 router = APIRouter()
 
+not_modified = Depends(conditional_get(collection_version.ROOMS))
+
 @router.post("/", response_model=Room)
-def create_room(room: RoomCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+def create_room(room: RoomCreate, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
     created = room_crud.create_room(db=db, room=room, owner_id=current_user.owner_id)
     if created is None:
         raise HTTPException(status_code=404, detail="House not found or not owned by user")
     return created
 
-@router.get("/", response_model=List[Room])
-def read_rooms(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    rooms = room_crud.get_all_rooms(db, owner_id=current_user.owner_id, skip=skip, limit=limit)
-    return rooms
+@router.get("/", response_model=List[Room], dependencies=[not_modified])
+def read_rooms(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = Query(default=None, description="Cursor từ header X-Next-Cursor"), db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
+    rooms = room_crud.get_all_rooms(db, owner_id=current_user.owner_id, skip=skip, limit=limit, after=after)
+    return set_next_cursor(response, rooms, limit, room_crud.ROOM_SORT)
 
-@router.get("/house/{house_id}", response_model=List[Room])
-def read_rooms_by_house(house_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    rooms = room_crud.get_rooms_by_house(db, house_id=house_id, owner_id=current_user.owner_id, skip=skip, limit=limit)
-    return rooms
+@router.get("/house/{house_id}", response_model=List[Room], dependencies=[not_modified])
+def read_rooms_by_house(house_id: int, response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = Query(default=None, description="Cursor từ header X-Next-Cursor"), db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
+    rooms = room_crud.get_rooms_by_house(db, house_id=house_id, owner_id=current_user.owner_id, skip=skip, limit=limit, after=after)
+    return set_next_cursor(response, rooms, limit, room_crud.ROOM_SORT)
 
-@router.get("/available", response_model=List[Room])
-def read_available_rooms(house_id: int | None = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    rooms = room_crud.get_available_rooms(db, owner_id=current_user.owner_id, house_id=house_id, skip=skip, limit=limit)
-    return rooms
+@router.get("/available", response_model=List[Room], dependencies=[not_modified])
+def read_available_rooms(response: Response, house_id: int | None = None, skip: int = 0, limit: int = 100, after: Optional[str] = Query(default=None, description="Cursor từ header X-Next-Cursor"), db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
+    rooms = room_crud.get_available_rooms(db, owner_id=current_user.owner_id, house_id=house_id, skip=skip, limit=limit, after=after)
+    return set_next_cursor(response, rooms, limit, room_crud.ROOM_SORT)
 
-@router.get("/{room_id}", response_model=Room)
-def read_room(room_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+@router.get("/{room_id}", response_model=Room, dependencies=[not_modified])
+def read_room(room_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
     db_room = room_crud.get_room_by_id(db, room_id=room_id, owner_id=current_user.owner_id)
     if db_room is None:
         raise HTTPException(status_code=404, detail="Room not found")
@@ -45,7 +48,7 @@ def update_room(
     room_id: int,
     room_update: RoomUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     db_room = room_crud.update_room(db, room_id=room_id, room_update=room_update, owner_id=current_user.owner_id)
     if db_room is None:
@@ -53,7 +56,7 @@ def update_room(
     return db_room
 
 @router.delete("/{room_id}")
-def delete_room(room_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+def delete_room(room_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
     # Load room to ensure ownership and state
     db_room = room_crud.get_room_by_id(db, room_id=room_id, owner_id=current_user.owner_id)
     if db_room is None:
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from sqlalchemy.exc import IntegrityError
 
-from app.core.database import get_db
-from app.core.security import get_current_active_user, verify_password, get_password_hash
+from app.core.database import get_db, get_async_db
+from app.core.security import get_current_active_user_model, invalidate_principal, verify_password_async, get_password_hash_async
 from app.schemas.user import User, UserUpdate, Role, PasswordChange
 from app.models.user import User as UserModel
 from app.crud import user as user_crud
@@ -14,12 +15,9 @@ router = APIRouter()
 # Lấy thông tin người dùng hiện tại
 @router.get("/me", response_model=User)
 async def read_users_me(
-    current_user: UserModel = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserModel = Depends(get_current_active_user_model)
 ):
-    # Nếu chưa load vai trò, thì load lại từ DB
-    if not hasattr(current_user, 'role') or current_user.role is None:
-        db.refresh(current_user, ['role'])
+    # Bản ghi đầy đủ (kèm vai trò) được load trong get_current_active_user_model
     return current_user
 
 # Cập nhật thông tin người dùng hiện tại (PATCH vì chỉ cập nhật một phần)
@@ -27,7 +25,7 @@ async def read_users_me(
 async def update_users_me(
     user_update: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    current_user: UserModel = Depends(get_current_active_user_model)
 ):
     # Pre-check duplicates if changing email/phone
     if user_update.email and user_update.email != current_user.email:
@@ -38,6 +36,7 @@ async def update_users_me(
             raise HTTPException(status_code=400, detail="Phone already registered")
     try:
         updated = user_crud.update_user(db, current_user.owner_id, user_update)
+        invalidate_principal(current_user.owner_id)
         return updated
     except IntegrityError:
         db.rollback()
@@ -53,15 +52,16 @@ def get_roles(db: Session = Depends(get_db)):
 @router.patch("/me/password")
 async def change_password(
     payload: PasswordChange,
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserModel = Depends(get_current_active_user_model)
 ):
     # Kiểm tra mật khẩu hiện tại có đúng không
-    if not verify_password(payload.old_password, current_user.password):
+    if not await verify_password_async(payload.old_password, current_user.password):
         raise HTTPException(status_code=400, detail="Mật khẩu hiện tại không đúng")
 
-    # Cập nhật mật khẩu mới đã băm
-    current_user.password = get_password_hash(payload.new_password)
+    # Cập nhật mật khẩu mới đã băm (current_user thuộc cùng phiên async của request)
+    current_user.password = await get_password_hash_async(payload.new_password)
     db.add(current_user)
-    db.commit()
+    await db.commit()
+    invalidate_principal(current_user.owner_id)
     return {"message": "Đổi mật khẩu thành công"}
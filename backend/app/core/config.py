@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -7,6 +8,72 @@ class Settings(BaseSettings):
     """
 
     database_url: str
+    # Mặc định suy ra từ database_url (aiomysql / aiosqlite)
+    async_database_url: Optional[str] = None
+
+    # Connection pool (áp dụng cho cả engine sync và async)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800  # giây; -1 = không recycle (MySQL đóng connection rảnh sau wait_timeout)
+    db_pool_pre_ping: bool = True
+    # Số connection mở sẵn (sync + async) khi worker khởi động; 0 = không
+    db_pool_prewarm: int = 0
+    # Kiểm tra revision alembic khi khởi động: strict (dừng worker) | warn | off
+    schema_check: str = "strict"
+
+    # Số liệu theo route (độ trễ, số câu / thời gian SQL mỗi request) tại /internal/metrics
+    request_metrics_enabled: bool = True
+    # Một câu SQL giống hệt lặp lại >= ngần này lần trong một request thì bị đánh dấu nghi vấn N+1; 0 = tắt
+    n_plus_one_threshold: int = 5
+
+    # Câu SQL chạy lâu hơn ngưỡng (ms) được ghi lại kèm tham số, route, frame gọi và EXPLAIN (chạy nền); 0 = tắt
+    slow_query_threshold_ms: float = 500
+    slow_query_explain: bool = True
+    # Ring buffer xem tại /internal/slow-queries; file xoay vòng (mỗi dòng một JSON, đường dẫn tương đối
+    # tính từ thư mục backend), mặc định không ghi file
+    slow_query_buffer_size: int = 200
+    slow_query_log_file: Optional[str] = None
+    slow_query_log_max_bytes: int = 10 * 1024 * 1024
+    slow_query_log_backups: int = 5
+    # Câu SQL chạm tới các bảng này (phân tách bằng dấu phẩy; * = mọi câu) được lưu với tham số đã che;
+    # để trống = giữ giá trị thật (chỉ bật khi cần gỡ lỗi)
+    slow_query_redact_tables: str = "*"
+
+    # Token cho các endpoint nội bộ (/internal, header X-Internal-Token); để trống = tắt hẳn (403)
+    internal_api_token: Optional[str] = None
+
+    # Cache principal (owner_id, is_active, role) cho get_current_user; 0 = tắt
+    principal_cache_ttl_seconds: float = 30
+    principal_cache_max_entries: int = 10000
+
+    # bcrypt chạy trên executor riêng; vượt quá workers + max_queue thì trả 503
+    password_hash_workers: int = 2
+    password_hash_max_queue: int = 16
+
+    # Cache kết quả báo cáo AI theo (chủ nhà, kỳ, dấu vân tay số liệu); 0 = tắt
+    ai_report_cache_ttl_seconds: float = 6 * 3600
+    ai_report_cache_max_entries: int = 512
+
+    # Cache chuỗi tỷ lệ lấp đầy theo tháng (khóa gồm phiên bản dữ liệu phòng/hợp đồng của chủ nhà); 0 = tắt
+    occupancy_cache_ttl_seconds: float = 3600
+    occupancy_cache_max_entries: int = 1024
+    # Số tháng tối đa của một lần truy vấn chuỗi theo tháng (/reports/occupancy, /reports/revenue-series)
+    report_max_months: int = 120
+
+    # Job sinh báo cáo AI: số job chạy đồng thời, số job chờ tối đa, hạn chót của mỗi job (chờ + gọi model)
+    ai_report_workers: int = 2
+    ai_report_max_queue: int = 8
+    ai_report_timeout_seconds: float = 120
+    ai_report_job_ttl_seconds: float = 3600
+
+    # Backend sinh văn bản: gemini | stub (trả báo cáo mẫu sau llm_stub_latency_seconds, dùng offline/benchmark)
+    llm_backend: str = "gemini"
+    gemini_model: str = "gemini-2.5-pro"
+    llm_stub_latency_seconds: float = 1.0
+    # Số lời gọi LLM đồng thời tối đa trong một worker và timeout mỗi lần gọi (tính cả thời gian chờ lượt)
+    llm_max_concurrency: int = 4
+    llm_timeout_seconds: float = 90
 
     secret_key: str
     algorithm: str
@@ -1,10 +1,29 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.pool_metrics import InstrumentedQueuePool, InstrumentedAsyncQueuePool
+from app.core.request_metrics import instrument_engine
+from app.core.slow_query import slow_query_log
+
+def pool_options(url: str, async_: bool = False) -> dict:
+    """Tham số pool lấy từ Settings (SQLite in-memory dùng pool riêng nên chỉ giữ pre_ping/recycle)."""
+    options = dict(pool_pre_ping=settings.db_pool_pre_ping, pool_recycle=settings.db_pool_recycle)
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return options
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool if async_ else InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+    )
+    return options
 
 #Tạo kết nối đến cơ sở dữ liệu
-engine = create_engine(settings.database_url)
+engine = create_engine(settings.database_url, **pool_options(settings.database_url))
 #Tạo một lớp session để tương tác với cơ sở dữ liệu
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 #Tạo lớp cơ sở cho các mô hình ORM
@@ -17,3 +36,37 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Driver async tương ứng với driver sync (mysql+pymysql -> mysql+aiomysql, sqlite -> sqlite+aiosqlite)
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    """Suy ra URL async từ DATABASE_URL (giữ nguyên nếu đã là driver async)."""
+    parsed = make_url(url)
+    drivername = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+#Engine async cho các endpoint async def (không chặn event loop khi chờ DB)
+ASYNC_DATABASE_URL = settings.async_database_url or to_async_url(settings.database_url)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL, async_=True))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False, class_=AsyncSession)
+
+#Đếm số câu SQL / thời gian SQL theo request (xem app.core.request_metrics)
+if settings.request_metrics_enabled:
+    instrument_engine(engine)
+    instrument_engine(async_engine)
+
+#Ghi lại truy vấn chậm (EXPLAIN chạy nền trên engine sync, dùng chung cho câu SQL từ engine async)
+if slow_query_log is not None:
+    slow_query_log.instrument(engine)
+    slow_query_log.instrument(async_engine, explain_engine=engine)
+
+#Hàm phụ thuộc lấy phiên async
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,52 @@
+import hashlib
+from typing import Dict, Optional
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy.orm import Session
+from .database import get_db
+from .security import get_current_active_user, Principal
+from ..crud import collection_version
+
+# Trình duyệt luôn hỏi lại server (no-cache) nhưng được giữ bản cũ và nhận 304
+CACHE_CONTROL = "private, no-cache"
+
+def make_etag(request: Request, owner_id: int, versions: Dict[str, int]) -> str:
+    """ETag yếu: băm (phiên bản app, chủ nhà, URL kèm query, phiên bản từng tập dữ liệu)."""
+    parts = [
+        request.app.version,
+        str(owner_id),
+        request.url.path,
+        str(sorted(request.query_params.multi_items())),
+        ",".join(f"{name}:{version}" for name, version in sorted(versions.items())),
+    ]
+    digest = hashlib.sha1("|".join(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """So sánh yếu theo RFC 9110: bỏ tiền tố W/ ở cả hai phía."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+def conditional_get(*collections: str):
+    """Dependency cho GET: trả 304 nếu If-None-Match khớp, trước khi handler chạy truy vấn ORM nào.
+
+    `collections` là các tập dữ liệu mà payload được dựng từ đó (vd. hóa đơn nhúng hợp đồng).
+    Chỉ tốn một truy vấn theo khóa chính vào collection_versions; cùng session với handler
+    nên dữ liệu trả về không cũ hơn phiên bản đã ghi trong ETag.
+    """
+    def dependency(
+        request: Request,
+        response: Response,
+        db: Session = Depends(get_db),
+        current_user: Principal = Depends(get_current_active_user),
+    ):
+        versions = collection_version.get_versions(db, current_user.owner_id, collections)
+        etag = make_etag(request, current_user.owner_id, versions)
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Authorization"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+    return dependency
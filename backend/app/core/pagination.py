@@ -0,0 +1,58 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+from fastapi import HTTPException, Response, status
+from sqlalchemy import and_, or_
+
+# Header trả về cursor trang tiếp theo (body vẫn là danh sách để giữ tương thích)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Mã hoá giá trị khoá sắp xếp của bản ghi cuối thành cursor mờ (opaque)."""
+    payload = [{"$dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != size:
+            raise ValueError("cursor size mismatch")
+        return [datetime.fromisoformat(v["$dt"]) if isinstance(v, dict) else v for v in payload]
+    except (ValueError, TypeError, KeyError, binascii.Error):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def _after(sort_columns, values):
+    # (a, b) > (x, y)  <=>  a >= x AND (a > x OR (a = x AND b > y))
+    # Điều kiện a >= x đứng riêng để index có thể seek theo khoảng
+    clauses = []
+    for i, column in enumerate(sort_columns):
+        equal = [sort_columns[j] == values[j] for j in range(i)]
+        clauses.append(and_(*equal, column > values[i]))
+    if len(sort_columns) == 1:
+        return clauses[0]
+    return and_(sort_columns[0] >= values[0], or_(*clauses))
+
+def paginate(query, sort_columns, skip: int = 0, limit: int = 100, after: Optional[str] = None):
+    """Phân trang theo khoá ổn định (keyset) khi có `after`, ngược lại dùng skip/limit cũ."""
+    query = query.order_by(*sort_columns)
+    if after:
+        values = decode_cursor(after, len(sort_columns))
+        return query.filter(_after(sort_columns, values)).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
+
+def next_cursor(items, limit: int, sort_columns) -> Optional[str]:
+    """Cursor của trang tiếp theo, None nếu đã hết dữ liệu."""
+    if limit <= 0 or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor([getattr(last, column.key) for column in sort_columns])
+
+def set_next_cursor(response: Response, items, limit: int, sort_columns):
+    cursor = next_cursor(items, limit, sort_columns)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return items
@@ -0,0 +1,96 @@
+import threading
+import time
+from typing import Dict, List
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+# Ngưỡng (ms) của histogram thời gian chờ lấy connection
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class PoolWaitStats:
+    """Histogram thời gian chờ lấy connection từ pool (tính cả lúc phải mở connection mới)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts: List[int] = [0] * (len(WAIT_BUCKETS_MS) + 1)
+            self.count = 0
+            self.sum_ms = 0.0
+            self.max_ms = 0.0
+            self.timeouts = 0
+
+    def observe(self, wait_ms: float, timed_out: bool = False):
+        i = 0
+        while i < len(WAIT_BUCKETS_MS) and wait_ms > WAIT_BUCKETS_MS[i]:
+            i += 1
+        with self._lock:
+            self._counts[i] += 1
+            self.count += 1
+            self.sum_ms += wait_ms
+            self.max_ms = max(self.max_ms, wait_ms)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            # Bucket cộng dồn theo kiểu Prometheus (le = "nhỏ hơn hoặc bằng")
+            buckets, running = {}, 0
+            for bound, n in zip([str(b) for b in WAIT_BUCKETS_MS] + ["+Inf"], self._counts):
+                running += n
+                buckets[bound] = running
+            return {
+                "count": self.count,
+                "sum_ms": round(self.sum_ms, 3),
+                "max_ms": round(self.max_ms, 3),
+                "timeouts": self.timeouts,
+                "buckets_ms": buckets,
+            }
+
+
+# Giữ ở cấp module để số liệu không mất khi engine.dispose() tạo lại pool
+POOL_WAIT_STATS = {"sync": PoolWaitStats(), "async": PoolWaitStats()}
+
+
+class _WaitTimingMixin:
+    wait_stats: PoolWaitStats
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.observe((time.perf_counter() - t0) * 1000, timed_out=True)
+            raise
+        self.wait_stats.observe((time.perf_counter() - t0) * 1000)
+        return conn
+
+
+class InstrumentedQueuePool(_WaitTimingMixin, QueuePool):
+    wait_stats = POOL_WAIT_STATS["sync"]
+
+
+class InstrumentedAsyncQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    wait_stats = POOL_WAIT_STATS["async"]
+
+
+def pool_snapshot(pool) -> Dict[str, object]:
+    """Trạng thái hiện tại của pool + histogram thời gian chờ."""
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__, "status": pool.status()}
+    data = {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # overflow() của SQLAlchemy âm khi pool chưa mở đủ pool_size connection
+        "overflow": max(0, pool.overflow()),
+        "timeout_s": pool.timeout(),
+    }
+    stats = getattr(pool, "wait_stats", None)
+    if stats is not None:
+        data["wait"] = stats.snapshot()
+    return data
@@ -0,0 +1,244 @@
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Ngưỡng (giây) của histogram thời gian xử lý request và tổng thời gian SQL trong request
+LATENCY_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Ngưỡng của histogram số câu SQL mỗi request
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# Giới hạn số cặp (route, câu SQL) nghi vấn N+1 được giữ làm series riêng
+MAX_SUSPECT_SERIES = 200
+STATEMENT_LABEL_LENGTH = 160
+
+ROUTE_UNMATCHED = "unmatched"
+
+
+class Histogram:
+    """Histogram kiểu Prometheus (bucket cộng dồn khi xuất)."""
+
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def lines(self, name: str, labels: str) -> List[str]:
+        out, running = [], 0
+        for bound, n in zip([_number(b) for b in self.bounds] + ["+Inf"], self.counts):
+            running += n
+            out.append(f'{name}_bucket{{{labels},le="{bound}"}} {running}')
+        out.append(f"{name}_sum{{{labels}}} {_number(self.sum)}")
+        out.append(f"{name}_count{{{labels}}} {self.count}")
+        return out
+
+
+class RequestSqlStats:
+    """Số câu SQL, tổng thời gian SQL và số lần lặp của từng câu trong một request."""
+
+    __slots__ = ("statements", "seconds", "seen", "scope")
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.statements = 0
+        self.seconds = 0.0
+        self.seen: Dict[str, int] = {}
+
+    def record(self, statement: str, seconds: float):
+        self.statements += 1
+        self.seconds += seconds
+        self.seen[statement] = self.seen.get(statement, 0) + 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        if threshold <= 0:
+            return []
+        return [(s, n) for s, n in self.seen.items() if n >= threshold]
+
+
+# Request hiện tại; threadpool của Starlette (route def thường) và greenlet của engine async đều mang theo context
+_current: ContextVar[Optional[RequestSqlStats]] = ContextVar("request_sql_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = getattr(context, "_metrics_started", None)
+    if stats is not None and started is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+def current_route() -> Optional[str]:
+    """Method + template route của request đang xử lý (None ngoài request, vd. job nền)."""
+    stats = _current.get()
+    if stats is None or stats.scope is None:
+        return None
+    return f"{stats.scope['method']} {_route_template(stats.scope)}"
+
+
+def instrument_engine(engine):
+    """Gắn hook đếm / đo thời gian SQL vào engine (Engine hoặc AsyncEngine); chỉ ghi khi đang trong request."""
+    engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _statement_label(statement: str) -> str:
+    return re.sub(r"\s+", " ", statement).strip()[:STATEMENT_LABEL_LENGTH]
+
+
+class _RouteStats:
+    __slots__ = ("statuses", "latency", "sql_count", "sql_time", "sql_statements", "n_plus_one")
+
+    def __init__(self):
+        self.statuses: Dict[int, int] = {}
+        self.latency = Histogram(LATENCY_BUCKETS_S)
+        self.sql_count = Histogram(SQL_COUNT_BUCKETS)
+        self.sql_time = Histogram(LATENCY_BUCKETS_S)
+        self.sql_statements = 0
+        self.n_plus_one = 0
+
+
+class RequestMetrics:
+    """Số liệu theo (method, route) của một worker: độ trễ, số câu SQL, thời gian SQL, nghi vấn N+1."""
+
+    def __init__(self, n_plus_one_threshold: int = 5):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str], _RouteStats] = {}
+        # (method, route, câu SQL) -> (số request có câu lặp >= ngưỡng, số lần lặp lớn nhất)
+        self._suspects: Dict[Tuple[str, str, str], List[int]] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float, sql: RequestSqlStats):
+        repeated = sql.repeated(self.n_plus_one_threshold)
+        with self._lock:
+            stats = self._routes.get((method, route))
+            if stats is None:
+                stats = self._routes[(method, route)] = _RouteStats()
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.latency.observe(seconds)
+            stats.sql_count.observe(sql.statements)
+            stats.sql_time.observe(sql.seconds)
+            stats.sql_statements += sql.statements
+            if repeated:
+                stats.n_plus_one += 1
+            for statement, n in repeated:
+                key = (method, route, _statement_label(statement))
+                entry = self._suspects.get(key)
+                if entry is None:
+                    if len(self._suspects) >= MAX_SUSPECT_SERIES:
+                        continue
+                    entry = self._suspects[key] = [0, 0]
+                    logger.warning("Possible N+1 in %s %s: statement repeated %d times: %s", method, route, n, key[2])
+                entry[0] += 1
+                entry[1] = max(entry[1], n)
+
+    def render(self) -> str:
+        """Số liệu dạng text exposition của Prometheus (version 0.0.4)."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            suspects = sorted(self._suspects.items())
+            lines = [
+                "# HELP app_http_requests_total HTTP requests by route template and status.",
+                "# TYPE app_http_requests_total counter",
+            ]
+            for (method, route), stats in routes:
+                for status, n in sorted(stats.statuses.items()):
+                    lines.append(f'app_http_requests_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {n}')
+            for name, kind, help_text, attr in (
+                ("app_http_request_duration_seconds", "histogram", "Request handling time.", "latency"),
+                ("app_http_request_sql_statements", "histogram", "SQL statements executed per request.", "sql_count"),
+                ("app_http_request_sql_duration_seconds", "histogram", "Time spent in SQL per request.", "sql_time"),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                for (method, route), stats in routes:
+                    lines += getattr(stats, attr).lines(name, f'method="{method}",route="{_escape(route)}"')
+            lines += [
+                "# HELP app_sql_statements_total SQL statements executed while handling requests.",
+                "# TYPE app_sql_statements_total counter",
+            ]
+            lines += [f'app_sql_statements_total{{method="{m}",route="{_escape(r)}"}} {s.sql_statements}' for (m, r), s in routes]
+            lines += [
+                f"# HELP app_sql_n_plus_one_requests_total Requests that repeated one identical statement at least {self.n_plus_one_threshold} times.",
+                "# TYPE app_sql_n_plus_one_requests_total counter",
+            ]
+            lines += [f'app_sql_n_plus_one_requests_total{{method="{m}",route="{_escape(r)}"}} {s.n_plus_one}' for (m, r), s in routes]
+            for i, (name, kind, help_text) in enumerate((
+                ("app_sql_n_plus_one_statement_requests_total", "counter", "Requests in which this statement was an N+1 suspect."),
+                ("app_sql_n_plus_one_statement_max_repeats", "gauge", "Largest repeat count of this statement within one request."),
+            )):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                for (method, route, statement), values in suspects:
+                    labels = f'method="{method}",route="{_escape(route)}",statement="{_escape(statement)}"'
+                    lines.append(f"{name}{{{labels}}} {values[i]}")
+        return "\n".join(lines) + "\n"
+
+
+# Giữ ở cấp module (theo từng worker), giống POOL_WAIT_STATS
+request_metrics = RequestMetrics(settings.n_plus_one_threshold)
+
+
+def _route_template(scope) -> str:
+    # FastAPI bản mới giữ router lồng nhau nên scope["route"].path thiếu prefix; template đầy đủ nằm ở
+    # effective_route_context. Bản cũ chép route kèm prefix nên scope["route"].path đã đầy đủ.
+    effective = (scope.get("fastapi") or {}).get("effective_route_context")
+    return getattr(effective, "path", None) or getattr(scope.get("route"), "path", None) or ROUTE_UNMATCHED
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware: đo thời gian mỗi request và gom số liệu SQL do hook của engine ghi lại.
+
+    Nhãn route là template của route đã khớp (vd. /api/v2/invoices/{invoice_id}) để số series
+    không tăng theo id; request không khớp route nào gộp vào "unmatched".
+    """
+
+    def __init__(self, app, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        sql = RequestSqlStats(scope)
+        token = _current.set(sql)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current.reset(token)
+            self.metrics.observe(scope["method"], _route_template(scope), status, time.perf_counter() - started, sql)
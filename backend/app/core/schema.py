@@ -0,0 +1,99 @@
+import ast
+import logging
+from pathlib import Path
+from typing import List, Optional, Set
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_DIR = Path(__file__).resolve().parents[2] / "alembic" / "versions"
+
+
+class SchemaMismatchError(RuntimeError):
+    pass
+
+
+def _assigned(tree: ast.Module, name: str):
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == name for t in node.targets):
+            return ast.literal_eval(node.value)
+    return None
+
+
+def expected_heads(versions_dir: Path = VERSIONS_DIR) -> Set[str]:
+    """Head revision(s) của alembic, đọc thẳng từ file migration.
+
+    Không import alembic (~150ms) và không chạy file migration: chỉ parse
+    `revision` / `down_revision` nên rẻ khi kiểm tra lúc khởi động worker.
+    """
+    revisions, parents = set(), set()
+    for path in versions_dir.glob("*.py"):
+        tree = ast.parse(path.read_text(encoding="utf-8"))
+        revision = _assigned(tree, "revision")
+        if revision is None:
+            continue
+        revisions.add(revision)
+        down = _assigned(tree, "down_revision")
+        if isinstance(down, (tuple, list)):
+            parents.update(down)
+        elif down:
+            parents.add(down)
+    return revisions - parents
+
+
+def current_revisions(conn) -> Optional[List[str]]:
+    """Revision đang ghi trong alembic_version; None nếu bảng chưa tồn tại."""
+    try:
+        return [row[0] for row in conn.execute(text("SELECT version_num FROM alembic_version"))]
+    except DBAPIError:
+        conn.rollback()
+        return None
+
+
+def check_schema_revision(engine: Engine, mode: str = "strict"):
+    """So revision của CSDL với head của code bằng một truy vấn (không reflect bảng).
+
+    mode: strict = raise SchemaMismatchError, warn = chỉ ghi log, off = bỏ qua.
+    """
+    if mode == "off":
+        return
+    expected = expected_heads()
+    with engine.connect() as conn:
+        current = current_revisions(conn)
+    if current is not None and set(current) == expected:
+        return
+    message = (
+        f"Database schema revision {current or 'missing'} does not match code {sorted(expected)}; "
+        "run `python manage_db.py upgrade` (or `python manage_db.py create` for a new database)"
+    )
+    if mode == "warn":
+        logger.warning(message)
+        return
+    raise SchemaMismatchError(message)
+
+
+def prewarm_pool(engine: Engine, connections: int):
+    """Mở trước `connections` connection rồi trả lại pool để request đầu không phải chờ connect."""
+    held = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            held.append(conn)
+            conn.exec_driver_sql("SELECT 1")
+    finally:
+        for conn in held:
+            conn.close()
+
+
+async def prewarm_async_pool(engine, connections: int):
+    held = []
+    try:
+        for _ in range(connections):
+            conn = await engine.connect()
+            held.append(conn)
+            await conn.exec_driver_sql("SELECT 1")
+    finally:
+        for conn in held:
+            await conn.close()
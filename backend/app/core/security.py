@@ -1,24 +1,98 @@
+import asyncio
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Header, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from .config import settings
-from .database import get_db
+from .database import get_db, get_async_db
+from .cache import TTLCache
 from ..models.user import User
+from ..crud import user_async
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # HTTPBearer scheme for JSON-based login (extracts Bearer token from Authorization header)
 bearer_scheme = HTTPBearer()
 
+# Thông tin tối thiểu của người dùng đăng nhập mà các route cần (không phải bản ghi ORM)
+@dataclass(frozen=True)
+class Principal:
+    owner_id: int
+    is_active: bool
+    authority: Optional[str]
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            owner_id=user.owner_id,
+            is_active=bool(user.is_active),
+            authority=user.role.authority if user.role is not None else None,
+        )
+
+# Cache principal theo oid: đường xác thực thông thường không cần truy vấn DB.
+# Phải invalidate khi thông tin người dùng thay đổi (users/me, đổi mật khẩu, xóa user).
+principal_cache = TTLCache(ttl=settings.principal_cache_ttl_seconds, max_entries=settings.principal_cache_max_entries)
+
+def invalidate_principal(owner_id: int):
+    principal_cache.invalidate(owner_id)
+
 # Xác thực mật khẩu người dùng
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 # Hash mật khẩu người dùng
 def get_password_hash(password):
     return pwd_context.hash(password)
+
+# bcrypt tốn ~200ms CPU mỗi lần: chạy trên executor giới hạn để không chặn event loop.
+# Số việc đang chờ + đang chạy vượt giới hạn thì từ chối ngay (503) thay vì xếp hàng vô hạn.
+_hash_executor = ThreadPoolExecutor(max_workers=settings.password_hash_workers, thread_name_prefix="bcrypt")
+_hash_limit = settings.password_hash_workers + settings.password_hash_max_queue
+_hash_lock = threading.Lock()
+_hash_in_flight = 0
+_hash_rejected = 0
+
+def _hash_done(_future):
+    global _hash_in_flight
+    with _hash_lock:
+        _hash_in_flight -= 1
+
+async def _run_password_job(fn, *args):
+    global _hash_in_flight, _hash_rejected
+    with _hash_lock:
+        if _hash_in_flight >= _hash_limit:
+            _hash_rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        _hash_in_flight += 1
+    # Bộ đếm giảm khi job thực sự xong (kể cả khi request bị hủy giữa chừng)
+    future = _hash_executor.submit(fn, *args)
+    future.add_done_callback(_hash_done)
+    return await asyncio.wrap_future(future)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await _run_password_job(get_password_hash, password)
+
+def password_hasher_stats():
+    with _hash_lock:
+        return {
+            "workers": settings.password_hash_workers,
+            "max_queue": settings.password_hash_max_queue,
+            "in_flight": _hash_in_flight,
+            "rejected": _hash_rejected,
+        }
 # Lấy người dùng theo email
 def get_user(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
@@ -33,6 +107,16 @@ def authenticate_user(db: Session, email: str, password: str):
     if not verify_password(password, user.password):
         return False
     return user
+# Xác thực người dùng (phiên async, vai trò được load sẵn)
+async def authenticate_user_async(db: AsyncSession, email: str, password: str):
+    user = await user_async.get_user_by_email(db, email)
+    # Trả connection về pool trước khi chờ bcrypt (user đã load đủ, kể cả role)
+    await db.close()
+    if not user:
+        return False
+    if not await verify_password_async(password, user.password):
+        return False
+    return user
 # Tạo access token JWT
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -45,7 +129,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 # Lấy người dùng hiện tại từ token
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme), db: Session = Depends(get_db)):
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -56,35 +140,59 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(b
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         email: Optional[str] = payload.get("sub")
         owner_id: Optional[int] = payload.get("oid")
-        if owner_id is not None:
-            user = get_user_by_id(db, owner_id=owner_id)
-        elif email is not None:
-            user = get_user(db, email=email)
-        else:
-            raise credentials_exception
     except JWTError:
         raise credentials_exception
+    if owner_id is not None:
+        principal = principal_cache.get(owner_id)
+        if principal is not None:
+            return principal
+        user = await user_async.get_user_by_id(db, owner_id)
+    elif email is not None:
+        # Token cũ chỉ có email
+        user = await user_async.get_user_by_email(db, email)
+    else:
+        raise credentials_exception
     if user is None:
         raise credentials_exception
-    return user
+    principal = Principal.from_user(user)
+    principal_cache.set(principal.owner_id, principal)
+    return principal
 
 # Lấy người dùng hiện tại và kiểm tra trạng thái hoạt động
-async def get_current_active_user(current_user: User = Depends(get_current_user)):
+async def get_current_active_user(current_user: Principal = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+# Bản ghi User đầy đủ (kèm role) cho các route cần nhiều hơn Principal - luôn đọc từ DB
+async def get_current_active_user_model(current_user: Principal = Depends(get_current_active_user), db: AsyncSession = Depends(get_async_db)):
+    user = await user_async.get_user_by_id(db, current_user.owner_id)
+    if user is None:
+        invalidate_principal(current_user.owner_id)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
 def require_role(required_role: str):
     """Decorator to check if user has required role"""
-    async def role_checker(current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
-        # Load role relationship if not already loaded
-        if not hasattr(current_user, 'role') or current_user.role is None:
-            db.refresh(current_user, ['role'])
-        
-        if current_user.role.authority != required_role:
+    async def role_checker(current_user: Principal = Depends(get_current_active_user)):
+        if current_user.authority != required_role:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Access denied. Required role: {required_role}"
             )
         return current_user
     return role_checker
+
+# Bảo vệ endpoint nội bộ (/internal) bằng header X-Internal-Token; chưa cấu hình token thì đóng hẳn
+# (không tin địa chỉ client: sau reverse proxy cùng máy mọi request đều đến từ localhost)
+async def require_internal_access(x_internal_token: Optional[str] = Header(default=None)):
+    if (
+        not settings.internal_api_token
+        or not x_internal_token
+        or not secrets.compare_digest(x_internal_token, settings.internal_api_token)
+    ):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
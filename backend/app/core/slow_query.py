@@ -0,0 +1,261 @@
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional
+from sqlalchemy import event
+from app.core.config import settings
+from app.core.request_metrics import current_route
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.dirname(APP_DIR)
+# Frame trong các file này là hạ tầng (engine, session), không phải nơi phát ra truy vấn
+_INFRA_FILES = {os.path.abspath(__file__), os.path.join(APP_DIR, "core", "database.py")}
+MAX_PARAM_LENGTH = 200
+MAX_EXECUTEMANY_ROWS = 5
+MAX_CACHED_PLANS = 256
+REDACTED = "<redacted>"
+EXPLAIN_PREFIX = {"sqlite": "EXPLAIN QUERY PLAN ", "mysql": "EXPLAIN ", "mariadb": "EXPLAIN ", "postgresql": "EXPLAIN "}
+
+# Đánh dấu luồng đang chạy EXPLAIN để không ghi chính câu EXPLAIN là truy vấn chậm
+_explaining = threading.local()
+
+
+def _short(value):
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = str(value)
+    return text if len(text) <= MAX_PARAM_LENGTH else text[:MAX_PARAM_LENGTH] + "..."
+
+
+def _params(parameters, executemany: bool, redact: bool = False):
+    """Tham số bind dạng JSON được (chuỗi dài bị cắt; executemany chỉ giữ vài dòng đầu).
+
+    redact: giữ tên / số lượng tham số, thay mọi giá trị bằng REDACTED.
+    """
+    value = (lambda v: REDACTED) if redact else _short
+
+    def one(p):
+        if isinstance(p, dict):
+            return {k: value(v) for k, v in p.items()}
+        if isinstance(p, (list, tuple)):
+            return [value(v) for v in p]
+        return value(p)
+
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "first": [one(p) for p in rows[:MAX_EXECUTEMANY_ROWS]]}
+    return one(parameters)
+
+
+def _redact_pattern(tables: str) -> Optional["re.Pattern[str]"]:
+    """Regex khớp câu SQL có nhắc tới một trong các bảng (danh sách phân tách bằng dấu phẩy; * = mọi câu)."""
+    names = [t.strip() for t in (tables or "").split(",") if t.strip()]
+    if not names:
+        return None
+    if "*" in names:
+        return re.compile("")
+    return re.compile(r"\b(?:%s)\b" % "|".join(re.escape(n) for n in names), re.IGNORECASE)
+
+
+def _describe(frame) -> str:
+    return f"{os.path.relpath(frame.f_code.co_filename, BACKEND_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}"
+
+
+def _app_frame(frame) -> Optional[str]:
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_DIR) and filename not in _INFRA_FILES:
+            return _describe(frame)
+        frame = frame.f_back
+    return None
+
+
+def caller_frame() -> Optional[str]:
+    """Frame đầu tiên trong code app (crud / service / route) đã phát ra câu SQL.
+
+    Với engine async, câu SQL chạy trong greenlet con của SQLAlchemy; coroutine gọi nó nằm trên
+    stack của greenlet cha nên dò tiếp ở đó.
+    """
+    found = _app_frame(sys._getframe(1))
+    if found is None:
+        greenlet = sys.modules.get("greenlet")
+        parent = greenlet.getcurrent().parent if greenlet is not None else None
+        if parent is not None and parent.gr_frame is not None:
+            found = _app_frame(parent.gr_frame)
+    return found
+
+
+class SlowQueryLog:
+    """Ghi lại câu SQL chạy lâu hơn ngưỡng: câu lệnh, tham số, route, frame gọi và EXPLAIN.
+
+    Bản ghi vào ring buffer ngay (xem tại /internal/slow-queries); EXPLAIN chạy trên một luồng nền
+    bằng connection riêng, xong thì bản ghi mới được ghi ra file xoay vòng (mỗi dòng một JSON).
+    Kế hoạch EXPLAIN được nhớ theo câu lệnh nên một câu chậm lặp lại chỉ EXPLAIN một lần.
+    Câu SQL chạm tới bảng trong redact_tables được lưu / ghi file với tham số đã che (EXPLAIN vẫn dùng giá trị thật).
+    """
+
+    def __init__(self, threshold_ms: float, buffer_size: int = 200, explain: bool = True,
+                 log_file: Optional[str] = None, max_bytes: int = 10 * 1024 * 1024, backups: int = 5,
+                 max_pending_explains: int = 32, redact_tables: str = ""):
+        self.threshold_s = threshold_ms / 1000
+        self._redact = _redact_pattern(redact_tables)
+        self.explain_enabled = explain
+        self.max_pending_explains = max_pending_explains
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=buffer_size)
+        self._plans: "OrderedDict[str, object]" = OrderedDict()
+        self._pending = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.captured = 0
+        self.explained = 0
+        self.explain_skipped = 0
+        self.explain_errors = 0
+        self._file = self._open_file(log_file, max_bytes, backups) if log_file else None
+
+    @staticmethod
+    def _open_file(path: str, max_bytes: int, backups: int) -> RotatingFileHandler:
+        # Dùng thẳng handler, không qua logger: logging.config.fileConfig (vd. alembic) tắt các logger đã có.
+        # delay=True: chỉ tạo file (và thư mục, xem _write) khi có truy vấn chậm đầu tiên
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        return handler
+
+    def instrument(self, engine, explain_engine=None):
+        """Gắn hook vào engine (Engine hoặc AsyncEngine). EXPLAIN chạy trên explain_engine (sync),
+        mặc định chính engine; engine async dùng engine sync cùng CSDL."""
+        sync_engine = getattr(engine, "sync_engine", engine)
+        explain_engine = explain_engine or sync_engine
+
+        def before(conn, cursor, statement, parameters, context, executemany):
+            if context is not None:
+                context._slow_query_started = time.perf_counter()
+
+        def after(conn, cursor, statement, parameters, context, executemany):
+            started = getattr(context, "_slow_query_started", None)
+            if started is None:
+                return
+            elapsed = time.perf_counter() - started
+            if elapsed >= self.threshold_s and not getattr(_explaining, "active", False):
+                self.capture(statement, parameters, executemany, elapsed, explain_engine)
+
+        event.listen(sync_engine, "before_cursor_execute", before)
+        event.listen(sync_engine, "after_cursor_execute", after)
+
+    def capture(self, statement: str, parameters, executemany: bool, elapsed: float, explain_engine):
+        record = {
+            "timestamp": datetime.now().isoformat(timespec="milliseconds"),
+            "duration_ms": round(elapsed * 1000, 3),
+            "statement": statement,
+            "parameters": _params(parameters, executemany, self._redacts(statement)),
+            "route": current_route(),
+            "caller": caller_frame(),
+            "thread": threading.current_thread().name,
+            "explain": None,
+        }
+        explainable = (
+            self.explain_enabled and not executemany
+            and statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "WITH")
+            and explain_engine.dialect.name in EXPLAIN_PREFIX
+        )
+        with self._lock:
+            self.captured += 1
+            self._records.append(record)
+            plan = self._plans.get(statement) if explainable else None
+            if plan is not None:
+                self._plans.move_to_end(statement)
+                record["explain"] = plan
+                explainable = False
+            elif explainable and self._pending >= self.max_pending_explains:
+                self.explain_skipped += 1
+                record["explain"] = {"skipped": "explain queue full"}
+                explainable = False
+            elif explainable:
+                self._pending += 1
+                record["explain"] = {"pending": True}
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+        logger.warning("Slow query %.1f ms (%s, %s): %s", record["duration_ms"], record["route"], record["caller"],
+                       " ".join(statement.split())[:300])
+        if explainable:
+            self._executor.submit(self._explain, record, parameters, explain_engine)
+        else:
+            self._write(record)
+
+    def _redacts(self, statement: str) -> bool:
+        return self._redact is not None and self._redact.search(statement) is not None
+
+    def _explain(self, record: Dict[str, object], parameters, explain_engine):
+        statement = record["statement"]
+        _explaining.active = True
+        try:
+            with explain_engine.connect() as conn:
+                result = conn.exec_driver_sql(EXPLAIN_PREFIX[explain_engine.dialect.name] + statement, parameters)
+                plan = [{k: _short(v) for k, v in row.items()} for row in result.mappings()]
+            with self._lock:
+                self.explained += 1
+                self._plans[statement] = plan
+                if len(self._plans) > MAX_CACHED_PLANS:
+                    self._plans.popitem(last=False)
+        except Exception as e:
+            plan = {"error": f"{type(e).__name__}: {e}"[:MAX_PARAM_LENGTH]}
+            with self._lock:
+                self.explain_errors += 1
+        finally:
+            _explaining.active = False
+            with self._lock:
+                self._pending -= 1
+        record["explain"] = plan
+        self._write(record)
+
+    def _write(self, record: Dict[str, object]):
+        if self._file is not None:
+            os.makedirs(os.path.dirname(self._file.baseFilename), exist_ok=True)
+            line = json.dumps(record, ensure_ascii=False, default=str)
+            self._file.handle(logging.makeLogRecord({"msg": line, "levelno": logging.INFO, "levelname": "INFO"}))
+
+    def recent(self, limit: int = 50) -> List[Dict[str, object]]:
+        with self._lock:
+            return [dict(r) for r in list(self._records)[-limit:][::-1]]
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "threshold_ms": self.threshold_s * 1000,
+                "captured": self.captured,
+                "buffered": len(self._records),
+                "explained": self.explained,
+                "explain_pending": self._pending,
+                "explain_skipped": self.explain_skipped,
+                "explain_errors": self.explain_errors,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+
+# None khi slow_query_threshold_ms = 0 (tắt)
+slow_query_log: Optional[SlowQueryLog] = None
+if settings.slow_query_threshold_ms > 0:
+    slow_query_log = SlowQueryLog(
+        settings.slow_query_threshold_ms,
+        buffer_size=settings.slow_query_buffer_size,
+        explain=settings.slow_query_explain,
+        # Không phụ thuộc thư mục làm việc lúc khởi động (uvicorn, alembic, script)
+        log_file=os.path.join(BACKEND_DIR, settings.slow_query_log_file) if settings.slow_query_log_file else None,
+        max_bytes=settings.slow_query_log_max_bytes,
+        backups=settings.slow_query_log_backups,
+        redact_tables=settings.slow_query_redact_tables,
+    )
@@ -0,0 +1,65 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Iterable
+from app.models.collection_version import CollectionVersion
+
+# Collections with a version counter (one per owner); GET payloads name the ones they are built from
+HOUSES = "houses"
+ROOMS = "rooms"
+RENTED_ROOMS = "rented_rooms"
+INVOICES = "invoices"
+
+def bump(db: Session, owner_id: int, *collections: str):
+    """Increment the owner's counters for `collections` (no commit).
+
+    Call right before the write's commit: the upsert locks the counter row until then,
+    so keeping it last keeps concurrent writes of the same owner short. Collections are
+    bumped in sorted order so two writes never wait on each other's rows.
+    """
+    names = sorted(set(collections))
+    if not names:
+        return
+    table = CollectionVersion.__table__
+    values = [dict(owner_id=owner_id, collection=name, version=1) for name in names]
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(values)
+        db.execute(stmt.on_duplicate_key_update(version=table.c.version + 1))
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(values)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.owner_id, table.c.collection],
+            set_={"version": table.c.version + 1},
+        ))
+    else:
+        for name in names:
+            row = db.get(CollectionVersion, (owner_id, name), with_for_update=True)
+            if row is None:
+                db.add(CollectionVersion(owner_id=owner_id, collection=name, version=1))
+            else:
+                row.version += 1
+        db.flush()
+
+def _versions_stmt(owner_id: int, names):
+    return (
+        select(CollectionVersion.collection, CollectionVersion.version)
+        .where(CollectionVersion.owner_id == owner_id, CollectionVersion.collection.in_(names))
+    )
+
+def get_versions(db: Session, owner_id: int, collections: Iterable[str]) -> Dict[str, int]:
+    """Current counters (0 for collections never written) in one primary-key lookup."""
+    names = sorted(set(collections))
+    versions = dict.fromkeys(names, 0)
+    for collection, version in db.execute(_versions_stmt(owner_id, names)):
+        versions[collection] = version
+    return versions
+
+async def get_versions_async(db: AsyncSession, owner_id: int, collections: Iterable[str]) -> Dict[str, int]:
+    names = sorted(set(collections))
+    versions = dict.fromkeys(names, 0)
+    for collection, version in (await db.execute(_versions_stmt(owner_id, names))).all():
+        versions[collection] = version
+    return versions
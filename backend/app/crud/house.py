@@ -1,11 +1,18 @@
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.models.house import House
 from app.schemas.house import HouseCreate, HouseUpdate
+from app.crud import revenue_rollup, collection_version, owner_kpi
+from app.core.pagination import paginate
+
+# Stable sort key for keyset pagination
+HOUSE_SORT = (House.house_id,)
 
 def create_house(db: Session, house: HouseCreate, owner_id: int):
     db_house = House(**house.dict(), owner_id=owner_id)
     db.add(db_house)
+    owner_kpi.apply(db, owner_id, {"total_houses": 1})
+    collection_version.bump(db, owner_id, collection_version.HOUSES)
     db.commit()
     db.refresh(db_house)
     return db_house
@@ -13,8 +20,8 @@ def create_house(db: Session, house: HouseCreate, owner_id: int):
 def get_house_by_id(db: Session, house_id: int, owner_id: int):
     return db.query(House).filter(House.house_id == house_id, House.owner_id == owner_id).first()
 
-def get_houses_by_owner(db: Session, owner_id: int, skip: int = 0, limit: int = 100):
-    return db.query(House).filter(House.owner_id == owner_id).offset(skip).limit(limit).all()
+def get_houses_by_owner(db: Session, owner_id: int, skip: int = 0, limit: int = 100, after: Optional[str] = None):
+    return paginate(db.query(House).filter(House.owner_id == owner_id), HOUSE_SORT, skip=skip, limit=limit, after=after)
 
 def get_all_houses(db: Session, skip: int = 0, limit: int = 100):
     return db.query(House).offset(skip).limit(limit).all()
@@ -25,6 +32,7 @@ def update_house(db: Session, house_id: int, house_update: HouseUpdate, owner_id
         update_data = house_update.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_house, field, value)
+        collection_version.bump(db, owner_id, collection_version.HOUSES)
         db.commit()
         db.refresh(db_house)
     return db_house
@@ -32,6 +40,13 @@ def update_house(db: Session, house_id: int, house_update: HouseUpdate, owner_id
 def delete_house(db: Session, house_id: int, owner_id: int):
     db_house = get_house_by_id(db, house_id, owner_id=owner_id)
     if db_house:
+        revenue_rollup.remove_house(db, owner_id, house_id)
+        owner_kpi.apply(db, owner_id, {k: -v for k, v in owner_kpi.house_counts(db, house_id).items()})
         db.delete(db_house)
+        # Rooms, contracts and invoices go with the house
+        collection_version.bump(
+            db, owner_id,
+            collection_version.HOUSES, collection_version.ROOMS, collection_version.RENTED_ROOMS, collection_version.INVOICES,
+        )
         db.commit()
     return db_house
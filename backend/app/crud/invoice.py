@@ -1,25 +1,35 @@
 from sqlalchemy.orm import Session, joinedload
-from typing import Optional
+from sqlalchemy import select, insert, update, delete, func
+from types import SimpleNamespace
+from typing import Dict, List, Optional
 from datetime import datetime
 from app.models.invoice import Invoice
 from app.models.rented_room import RentedRoom
 from app.models.room import Room
 from app.models.house import House
 from app.schemas.invoice import InvoiceCreate, InvoiceUpdate
+from app.crud import revenue_rollup, collection_version
+from app.core.pagination import paginate
+
+# Stable sort key for keyset pagination; matches the (owner_id, [is_paid,] due_date) indexes
+INVOICE_SORT = (Invoice.due_date, Invoice.invoice_id)
 
 def create_invoice(db: Session, invoice: InvoiceCreate, owner_id: int):
     # Ensure rented room belongs to current owner
-    rr = (
-        db.query(RentedRoom)
+    owned = (
+        db.query(RentedRoom.rr_id, Room.house_id)
         .join(Room)
-        .join(House)
-        .filter(RentedRoom.rr_id == invoice.rr_id, House.owner_id == owner_id)
+        .filter(RentedRoom.rr_id == invoice.rr_id, RentedRoom.owner_id == owner_id)
         .first()
     )
-    if not rr:
+    if not owned:
         return None
-    db_invoice = Invoice(**invoice.dict())
+    db_invoice = Invoice(**invoice.dict(), owner_id=owner_id)
     db.add(db_invoice)
+    db.flush()
+    # Keep the revenue rollup in the same transaction
+    revenue_rollup.apply_delta(db, owner_id, owned.house_id, after=revenue_rollup.invoice_contributions(db_invoice))
+    collection_version.bump(db, owner_id, collection_version.INVOICES)
     db.commit()
     db.refresh(db_invoice)
     return db_invoice
@@ -28,56 +38,54 @@ def get_invoice_by_id(db: Session, invoice_id: int, owner_id: int):
     return (
         db.query(Invoice)
         .options(joinedload(Invoice.rented_room).joinedload(RentedRoom.room))
-        .join(RentedRoom)
-        .join(Room)
-        .join(House)
-        .filter(Invoice.invoice_id == invoice_id, House.owner_id == owner_id)
+        .filter(Invoice.invoice_id == invoice_id, Invoice.owner_id == owner_id)
         .first()
     )
 
-def get_invoices_by_rented_room(db: Session, rr_id: int, owner_id: int):
-    # Verify rented room belongs to owner
-    owned_rr = (
-        db.query(RentedRoom)
-        .join(Room)
-        .join(House)
-        .filter(RentedRoom.rr_id == rr_id, House.owner_id == owner_id)
+def _lock_invoice(db: Session, invoice_id: int, owner_id: int):
+    # Row lock before reading the rollup contribution: a concurrent writer waits instead of
+    # applying its delta against the same `before`. Fresh values even if the session holds the row.
+    if db.get_bind().dialect.name == "sqlite":
+        # No FOR UPDATE in SQLite: a no-op write takes the database write lock until commit instead
+        db.execute(
+            update(Invoice)
+            .where(Invoice.invoice_id == invoice_id, Invoice.owner_id == owner_id)
+            .values(updated_at=Invoice.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+    return (
+        db.query(Invoice)
+        .options(joinedload(Invoice.rented_room).joinedload(RentedRoom.room))
+        .filter(Invoice.invoice_id == invoice_id, Invoice.owner_id == owner_id)
+        .with_for_update(of=Invoice)
+        .populate_existing()
         .first()
     )
-    if not owned_rr:
-        return []
+
+def get_invoices_by_rented_room(db: Session, rr_id: int, owner_id: int):
+    # Only invoices of a rented room owned by the owner
     return (
         db.query(Invoice)
         .options(joinedload(Invoice.rented_room).joinedload(RentedRoom.room))
-        .filter(Invoice.rr_id == rr_id)
+        .filter(Invoice.rr_id == rr_id, Invoice.owner_id == owner_id)
         .all()
     )
 
-def get_pending_invoices(db: Session, owner_id: int, skip: int = 0, limit: int = 100):
-    return (
+def get_pending_invoices(db: Session, owner_id: int, skip: int = 0, limit: int = 100, after: Optional[str] = None):
+    query = (
         db.query(Invoice)
         .options(joinedload(Invoice.rented_room).joinedload(RentedRoom.room))
-        .join(RentedRoom)
-        .join(Room)
-        .join(House)
-        .filter(Invoice.is_paid == False, House.owner_id == owner_id)
-        .offset(skip)
-        .limit(limit)
-        .all()
+        .filter(Invoice.is_paid == False, Invoice.owner_id == owner_id)
     )
+    return paginate(query, INVOICE_SORT, skip=skip, limit=limit, after=after)
 
-def get_all_invoices(db: Session, owner_id: int, skip: int = 0, limit: int = 100):
-    return (
+def get_all_invoices(db: Session, owner_id: int, skip: int = 0, limit: int = 100, after: Optional[str] = None):
+    query = (
         db.query(Invoice)
         .options(joinedload(Invoice.rented_room).joinedload(RentedRoom.room))
-        .join(RentedRoom)
-        .join(Room)
-        .join(House)
-        .filter(House.owner_id == owner_id)
-        .offset(skip)
-        .limit(limit)
-        .all()
+        .filter(Invoice.owner_id == owner_id)
     )
+    return paginate(query, INVOICE_SORT, skip=skip, limit=limit, after=after)
 
 def get_invoices(
     db: Session,
@@ -88,6 +96,7 @@ def get_invoices(
     house_id: Optional[int] = None,
     room_id: Optional[int] = None,
     is_paid: Optional[bool] = None,
+    after: Optional[str] = None,
 ):
     """Fetch invoices with optional filters.
 
@@ -95,25 +104,37 @@ def get_invoices(
     - house_id filters by the room's house
     - room_id filters by specific room
     - is_paid filters by payment status
+    - after is an opaque cursor (keyset pagination); skip is ignored when given
     """
     q = (
         db.query(Invoice)
         .options(joinedload(Invoice.rented_room).joinedload(RentedRoom.room))
-        .join(RentedRoom)
-        .join(Room)
-        .join(House)
-        .filter(House.owner_id == owner_id)
+        .filter(Invoice.owner_id == owner_id)
     )
 
-    if is_paid is not None:
-        q = q.filter(Invoice.is_paid.is_(bool(is_paid)))
+    # Join only when filtering by room/house
+    if room_id is not None or house_id is not None:
+        q = q.join(RentedRoom, Invoice.rr_id == RentedRoom.rr_id)
+    if house_id is not None:
+        q = q.join(Room, RentedRoom.room_id == Room.room_id)
+    q = q.filter(*invoice_filters(month=month, house_id=house_id, room_id=room_id, is_paid=is_paid))
 
-    if room_id is not None:
-        q = q.filter(Room.room_id == room_id)
+    return paginate(q, INVOICE_SORT, skip=skip, limit=limit, after=after)
 
+def invoice_filters(
+    month: Optional[str] = None,
+    house_id: Optional[int] = None,
+    room_id: Optional[int] = None,
+    is_paid: Optional[bool] = None,
+) -> list:
+    """WHERE clauses shared by get_invoices and the export (caller joins RentedRoom/Room as needed)."""
+    filters = []
+    if is_paid is not None:
+        filters.append(Invoice.is_paid.is_(bool(is_paid)))
+    if room_id is not None:
+        filters.append(RentedRoom.room_id == room_id)
     if house_id is not None:
-        q = q.filter(House.house_id == house_id)
-
+        filters.append(Room.house_id == house_id)
     if month:
         try:
             # Parse month start and compute next month start
@@ -122,37 +143,198 @@ def get_invoices(
                 next_month_start = start.replace(year=start.year + 1, month=1)
             else:
                 next_month_start = start.replace(month=start.month + 1)
-            q = q.filter(Invoice.due_date >= start, Invoice.due_date < next_month_start)
+            filters += [Invoice.due_date >= start, Invoice.due_date < next_month_start]
         except Exception:
             # Ignore bad month format silently
             pass
+    return filters
 
-    return q.offset(skip).limit(limit).all()
+# Flat columns for exports: no ORM hydration, names resolved by join
+EXPORT_COLUMNS = (
+    Invoice.invoice_id,
+    Invoice.billing_month,
+    Invoice.due_date,
+    Invoice.payment_date,
+    Invoice.is_paid,
+    House.house_id,
+    House.name.label("house_name"),
+    Room.room_id,
+    Room.name.label("room_name"),
+    RentedRoom.rr_id,
+    RentedRoom.tenant_name,
+    Invoice.price,
+    Invoice.water_price,
+    Invoice.internet_price,
+    Invoice.general_price,
+    Invoice.electricity_num,
+    Invoice.electricity_price,
+    Invoice.water_num,
+)
+
+def iter_invoice_export_rows(
+    db: Session,
+    owner_id: int,
+    month: Optional[str] = None,
+    house_id: Optional[int] = None,
+    room_id: Optional[int] = None,
+    is_paid: Optional[bool] = None,
+    batch_size: int = 1000,
+):
+    """Stream projected invoice rows in INVOICE_SORT order.
+
+    yield_per turns on stream_results (a server-side cursor on MySQL), so only
+    `batch_size` rows are buffered at a time regardless of the result size.
+    """
+    stmt = (
+        select(*EXPORT_COLUMNS)
+        .select_from(Invoice)
+        .join(RentedRoom, Invoice.rr_id == RentedRoom.rr_id)
+        .join(Room, RentedRoom.room_id == Room.room_id)
+        .join(House, Room.house_id == House.house_id)
+        .where(Invoice.owner_id == owner_id, *invoice_filters(month=month, house_id=house_id, room_id=room_id, is_paid=is_paid))
+        .order_by(*INVOICE_SORT)
+        .execution_options(yield_per=batch_size)
+    )
+    yield from db.execute(stmt)
 
 def update_invoice(db: Session, invoice_id: int, invoice_update: InvoiceUpdate, owner_id: int):
-    db_invoice = get_invoice_by_id(db, invoice_id, owner_id)
+    db_invoice = _lock_invoice(db, invoice_id, owner_id)
     if db_invoice:
+        before = revenue_rollup.invoice_contributions(db_invoice)
         update_data = invoice_update.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_invoice, field, value)
+        revenue_rollup.apply_delta(
+            db, owner_id, db_invoice.rented_room.room.house_id,
+            before=before, after=revenue_rollup.invoice_contributions(db_invoice),
+        )
+        collection_version.bump(db, owner_id, collection_version.INVOICES)
         db.commit()
         db.refresh(db_invoice)
     return db_invoice
 
 def mark_invoice_paid(db: Session, invoice_id: int, owner_id: int):
-    db_invoice = get_invoice_by_id(db, invoice_id, owner_id)
+    # Conditional flip: of two concurrent payments only one matches is_paid = false and moves the rollup
+    flipped = db.execute(
+        update(Invoice)
+        .where(Invoice.invoice_id == invoice_id, Invoice.owner_id == owner_id, Invoice.is_paid == False)
+        .values(is_paid=True, payment_date=func.coalesce(Invoice.payment_date, Invoice.created_at))
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+    db_invoice = _lock_invoice(db, invoice_id, owner_id)
+    if db_invoice and flipped:
+        # Only is_paid / payment_date changed: before the flip the invoice was pending in its due month
+        before = revenue_rollup.invoice_contributions(SimpleNamespace(is_paid=False, due_date=db_invoice.due_date))
+        revenue_rollup.apply_delta(
+            db, owner_id, db_invoice.rented_room.room.house_id,
+            before=before, after=revenue_rollup.invoice_contributions(db_invoice),
+        )
+        collection_version.bump(db, owner_id, collection_version.INVOICES)
+    db.commit()
     if db_invoice:
-        db_invoice.is_paid = True
-        if not db_invoice.payment_date:
-            db_invoice.payment_date = db_invoice.created_at
-        db.commit()
         db.refresh(db_invoice)
     return db_invoice
 
 def delete_invoice(db: Session, invoice_id: int, owner_id: int) -> bool:
-    invoice = get_invoice_by_id(db, invoice_id, owner_id)
+    invoice = _lock_invoice(db, invoice_id, owner_id)
     if not invoice:
         return False
-    db.delete(invoice)
+    before = revenue_rollup.invoice_contributions(invoice)
+    house_id = invoice.rented_room.room.house_id
+    # Subtract only if this call removed the row (a concurrent delete may have won)
+    deleted = db.execute(
+        delete(Invoice).where(Invoice.invoice_id == invoice_id).execution_options(synchronize_session=False)
+    ).rowcount
+    if deleted:
+        revenue_rollup.apply_delta(db, owner_id, house_id, before=before)
+        collection_version.bump(db, owner_id, collection_version.INVOICES)
     db.commit()
-    return True
+    return bool(deleted)
+
+def run_billing(db: Session, owner_id: int, month: str, house_id: Optional[int] = None, due_day: int = 1):
+    """Create this month's invoice for every active contract in one transaction.
+
+    Prices are copied from each contract; electricity is left at 0 until meter
+    readings are recorded. Contracts that already have an invoice for `month`
+    (billing_month) are skipped, so re-running is safe. Returns a summary dict,
+    or None when house_id is not owned by the owner.
+    """
+    if house_id is not None:
+        owned = db.query(House.house_id).filter(House.house_id == house_id, House.owner_id == owner_id).first()
+        if not owned:
+            return None
+
+    start = revenue_rollup.month_start(datetime.strptime(month, "%Y-%m"))
+    end = revenue_rollup.next_month_start(start)
+    due_date = start.replace(day=due_day)
+
+    # Contracts in effect during the month (projection only, no ORM objects)
+    stmt = (
+        select(
+            RentedRoom.rr_id,
+            Room.house_id,
+            RentedRoom.monthly_rent,
+            RentedRoom.water_price,
+            RentedRoom.internet_price,
+            RentedRoom.general_price,
+        )
+        .join(Room, RentedRoom.room_id == Room.room_id)
+        .where(
+            RentedRoom.owner_id == owner_id,
+            RentedRoom.is_active == True,
+            RentedRoom.start_date < end,
+            RentedRoom.end_date >= start,
+        )
+    )
+    if house_id is not None:
+        stmt = stmt.where(Room.house_id == house_id)
+    contracts = db.execute(stmt).all()
+
+    # Already billed for this month (uses the (rr_id, billing_month) unique index)
+    billed = set()
+    rr_ids = [c.rr_id for c in contracts]
+    for i in range(0, len(rr_ids), 1000):
+        billed.update(db.execute(
+            select(Invoice.rr_id).where(Invoice.rr_id.in_(rr_ids[i:i + 1000]), Invoice.billing_month == month)
+        ).scalars())
+
+    rows = []
+    by_house: Dict[int, List[revenue_rollup.Contribution]] = {}
+    for c in contracts:
+        if c.rr_id in billed:
+            continue
+        row = dict(
+            price=c.monthly_rent or 0,
+            water_price=c.water_price or 0,
+            internet_price=c.internet_price or 0,
+            general_price=c.general_price or 0,
+            electricity_price=0,
+            electricity_num=0,
+            water_num=0,
+            due_date=due_date,
+            payment_date=None,
+            is_paid=False,
+            billing_month=month,
+            rr_id=c.rr_id,
+            owner_id=owner_id,
+        )
+        rows.append(row)
+        by_house.setdefault(c.house_id, []).extend(revenue_rollup.invoice_contributions(SimpleNamespace(**row)))
+
+    if rows:
+        # executemany; a concurrent run for the same month fails on the unique constraint
+        db.execute(insert(Invoice), rows)
+        for h_id, after in by_house.items():
+            revenue_rollup.apply_delta(db, owner_id, h_id, after=after)
+        collection_version.bump(db, owner_id, collection_version.INVOICES)
+        db.commit()
+
+    return {
+        "month": month,
+        "house_id": house_id,
+        "due_date": due_date,
+        "active_contracts": len(contracts),
+        "created": len(rows),
+        "already_billed": len(billed),
+        "total_amount": float(sum(revenue_rollup.invoice_total(SimpleNamespace(**r)) for r in rows)),
+    }
@@ -0,0 +1,143 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, update, tuple_, bindparam
+from typing import Dict, List, Optional, Tuple
+from app.models.invoice import Invoice
+from app.models.rented_room import RentedRoom
+from app.crud import collection_version
+
+# (row number in the uploaded file, error message)
+RowError = Tuple[int, str]
+
+
+class MeterReading:
+    """One parsed row: identifies an invoice by id or by (rr_id, billing month)."""
+
+    __slots__ = ("line", "invoice_id", "rr_id", "month", "electricity_num", "water_num")
+
+    def __init__(self, line: int, electricity_num: float, invoice_id: Optional[int] = None,
+                 rr_id: Optional[int] = None, month: Optional[str] = None, water_num: Optional[float] = None):
+        self.line = line
+        self.invoice_id = invoice_id
+        self.rr_id = rr_id
+        self.month = month
+        self.electricity_num = electricity_num
+        self.water_num = water_num
+
+
+def _target_invoices(db: Session, owner_id: int, readings: List[MeterReading]):
+    """Resolve every reading of the chunk to its invoice in at most two queries."""
+    columns = (
+        Invoice.invoice_id, Invoice.rr_id, Invoice.billing_month, Invoice.due_date, Invoice.is_paid,
+        RentedRoom.initial_electricity_num, RentedRoom.electricity_unit_price,
+    )
+    by_id, by_month = {}, {}
+    ids = [r.invoice_id for r in readings if r.invoice_id is not None]
+    if ids:
+        for row in db.execute(
+            select(*columns).join(RentedRoom, Invoice.rr_id == RentedRoom.rr_id)
+            .where(Invoice.owner_id == owner_id, Invoice.invoice_id.in_(ids))
+        ):
+            by_id[row.invoice_id] = row
+    keys = list({(r.rr_id, r.month) for r in readings if r.invoice_id is None})
+    if keys:
+        for row in db.execute(
+            select(*columns).join(RentedRoom, Invoice.rr_id == RentedRoom.rr_id)
+            .where(Invoice.owner_id == owner_id, tuple_(Invoice.rr_id, Invoice.billing_month).in_(keys))
+        ):
+            by_month[(row.rr_id, row.billing_month)] = row
+    return by_id, by_month
+
+
+def _recorded_readings(db: Session, owner_id: int, rr_ids: List[int]) -> Dict[int, List[tuple]]:
+    """Existing readings per contract as [(due_date, invoice_id, electricity_num)]."""
+    readings: Dict[int, List[tuple]] = {}
+    rows = db.execute(
+        select(Invoice.rr_id, Invoice.due_date, Invoice.invoice_id, Invoice.electricity_num)
+        .where(Invoice.owner_id == owner_id, Invoice.rr_id.in_(rr_ids), Invoice.electricity_num > 0)
+    )
+    for rr_id, due_date, invoice_id, electricity_num in rows:
+        readings.setdefault(rr_id, []).append((due_date, invoice_id, electricity_num))
+    return readings
+
+
+def _previous_reading(recorded: List[tuple], due_date, invoice_id: int, initial: float) -> float:
+    earlier = [r for r in recorded if (r[0], r[1]) < (due_date, invoice_id)]
+    return max(earlier)[2] if earlier else (initial or 0)
+
+
+def apply_readings(db: Session, owner_id: int, readings: List[MeterReading]) -> Tuple[int, List[RowError]]:
+    """Validate a chunk of readings, compute electricity charges and write them with one executemany.
+
+    The previous reading is the latest earlier invoice of the same contract that has
+    one (including rows earlier in this chunk), falling back to the contract's
+    initial_electricity_num. Only unpaid invoices are updated (the UPDATE itself checks
+    is_paid, so one paid while the chunk was prepared is reported, not changed), so the
+    revenue rollup (which counts unpaid invoices but not their amounts) needs no change.
+    Returns (updated count, per-row errors); the chunk is committed.
+    """
+    errors: List[RowError] = []
+    by_id, by_month = _target_invoices(db, owner_id, readings)
+
+    resolved = []
+    seen = set()
+    for r in readings:
+        target = by_id.get(r.invoice_id) if r.invoice_id is not None else by_month.get((r.rr_id, r.month))
+        if target is None:
+            errors.append((r.line, "Invoice not found"))
+        elif target.is_paid:
+            errors.append((r.line, f"Invoice {target.invoice_id} is already paid"))
+        elif target.invoice_id in seen:
+            errors.append((r.line, f"Duplicate reading for invoice {target.invoice_id}"))
+        else:
+            seen.add(target.invoice_id)
+            resolved.append((r, target))
+    if not resolved:
+        return 0, errors
+
+    recorded = _recorded_readings(db, owner_id, list({t.rr_id for _, t in resolved}))
+    # Oldest first so a later month in the same file sees the reading just applied
+    resolved.sort(key=lambda item: (item[1].rr_id, item[1].due_date, item[1].invoice_id))
+
+    params = []
+    lines: Dict[int, int] = {}
+    for r, target in resolved:
+        history = [h for h in recorded.get(target.rr_id, []) if h[1] != target.invoice_id]
+        previous = _previous_reading(history, target.due_date, target.invoice_id, target.initial_electricity_num)
+        if r.electricity_num < previous:
+            errors.append((r.line, f"Electricity reading {r.electricity_num:g} is lower than previous reading {previous:g}"))
+            continue
+        values = {
+            "target_id": target.invoice_id,
+            "electricity_num": r.electricity_num,
+            "electricity_price": round((r.electricity_num - previous) * (target.electricity_unit_price or 0), 2),
+        }
+        if r.water_num is not None:
+            values["water_num"] = r.water_num
+        params.append(values)
+        lines[target.invoice_id] = r.line
+        recorded.setdefault(target.rr_id, []).append((target.due_date, target.invoice_id, r.electricity_num))
+
+    # executemany groups rows by key set, so split rows with / without water_num
+    table = Invoice.__table__
+    updated = 0
+    for keys in ({"target_id", "electricity_num", "electricity_price", "water_num"},
+                 {"target_id", "electricity_num", "electricity_price"}):
+        batch = [p for p in params if set(p) == keys]
+        if batch:
+            stmt = update(table).where(table.c.invoice_id == bindparam("target_id"), table.c.is_paid == False)
+            updated += db.execute(stmt, batch).rowcount
+    if updated < len(params):
+        # Paid (or deleted) since it was read: the UPDATE matched nothing for it
+        status = dict(db.execute(
+            select(Invoice.invoice_id, Invoice.is_paid).where(Invoice.invoice_id.in_(list(lines)))
+        ).all())
+        for invoice_id, line in lines.items():
+            if invoice_id not in status:
+                errors.append((line, "Invoice not found"))
+            elif status[invoice_id]:
+                errors.append((line, f"Invoice {invoice_id} is already paid"))
+    if updated:
+        collection_version.bump(db, owner_id, collection_version.INVOICES)
+    db.commit()
+    errors.sort()
+    return updated, errors
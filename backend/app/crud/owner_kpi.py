@@ -0,0 +1,182 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, delete, func, case, or_, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+from datetime import datetime
+from app.models.owner_kpi import OwnerKpi
+from app.models.house import House
+from app.models.room import Room
+from app.models.rented_room import RentedRoom
+from app.models.revenue_rollup import RevenueRollup
+
+COUNTERS = ("total_houses", "total_rooms", "available_rooms", "occupied_rooms", "active_contracts", "pending_invoices")
+
+def room_counts(is_available) -> Dict[str, int]:
+    """What one room adds to the counters (NULL is_available counts as neither available nor occupied)."""
+    return {
+        "total_rooms": 1,
+        "available_rooms": int(is_available is not None and bool(is_available)),
+        "occupied_rooms": int(is_available is not None and not is_available),
+    }
+
+def diff(before: Mapping[str, int], after: Mapping[str, int]) -> Dict[str, int]:
+    return {k: after.get(k, 0) - before.get(k, 0) for k in set(before) | set(after)}
+
+def _month_update(table, month: str, amount: float):
+    """month_revenue / revenue_month after adding `amount` paid in `month`.
+
+    Only the latest payment month is tracked: a newer month starts from `amount`
+    (nothing was paid in it before, or it would already be the tracked month),
+    older months leave the row alone and are read from revenue_rollups instead.
+    """
+    newer = or_(table.c.revenue_month.is_(None), table.c.revenue_month < month)
+    month_revenue = case(
+        (table.c.revenue_month == month, table.c.month_revenue + amount),
+        (newer, literal(amount)),
+        else_=table.c.month_revenue,
+    )
+    revenue_month = case((newer, literal(month)), else_=table.c.revenue_month)
+    # month_revenue first: MySQL evaluates ON DUPLICATE KEY assignments left to right
+    return [("month_revenue", month_revenue), ("revenue_month", revenue_month)]
+
+def _upsert(db: Session, owner_id: int, counts: Mapping[str, int], month: Optional[str], amount: float):
+    table = OwnerKpi.__table__
+    values = dict(owner_id=owner_id, month_revenue=amount if month else 0.0, revenue_month=month)
+    values.update({name: counts.get(name, 0) for name in COUNTERS})
+    updates = [(name, table.c[name] + delta) for name, delta in counts.items() if delta]
+    if month:
+        updates += _month_update(table, month, amount)
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        db.execute(insert(table).values(**values).on_duplicate_key_update(updates))
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        db.execute(insert(table).values(**values).on_conflict_do_update(
+            index_elements=[table.c.owner_id], set_=dict(updates),
+        ))
+    else:
+        row = db.get(OwnerKpi, owner_id, with_for_update=True)
+        if row is None:
+            db.add(OwnerKpi(**values))
+        else:
+            for name, delta in counts.items():
+                setattr(row, name, getattr(row, name) + delta)
+            if month and row.revenue_month == month:
+                row.month_revenue += amount
+            elif month and (row.revenue_month is None or row.revenue_month < month):
+                row.revenue_month, row.month_revenue = month, amount
+        db.flush()
+
+def apply(db: Session, owner_id: int, counts: Optional[Mapping[str, int]] = None, revenue: Iterable[Tuple[str, float]] = ()):
+    """Add counter deltas and paid revenue per (month, amount) to the owner's row (no commit).
+
+    Call after the revenue rollup writes and before collection_version.bump so every
+    write locks rollup -> KPI -> version rows in the same order.
+    """
+    counts = {name: delta for name, delta in (counts or {}).items() if delta}
+    months = sorted((m, a) for m, a in revenue if a)
+    if not counts and not months:
+        return
+    if not months:
+        _upsert(db, owner_id, counts, None, 0.0)
+        return
+    # Ascending months so the latest one ends up tracked; counters ride on the first statement
+    for month, amount in months:
+        _upsert(db, owner_id, counts, month, amount)
+        counts = {}
+
+def room_counts_of(db: Session, *filters) -> Dict[str, int]:
+    row = db.execute(
+        select(
+            func.count(),
+            func.sum(case((Room.is_available == True, 1), else_=0)),
+            func.sum(case((Room.is_available == False, 1), else_=0)),
+        ).where(*filters)
+    ).one()
+    return {"total_rooms": row[0] or 0, "available_rooms": row[1] or 0, "occupied_rooms": row[2] or 0}
+
+def active_contracts_of(db: Session, *filters) -> int:
+    return db.execute(
+        select(func.count())
+        .select_from(RentedRoom)
+        .join(Room, RentedRoom.room_id == Room.room_id)
+        .where(RentedRoom.is_active == True, *filters)
+    ).scalar_one()
+
+def house_counts(db: Session, house_id: int) -> Dict[str, int]:
+    """Counters contributed by a house's rooms and contracts (subtract before deleting it)."""
+    counts = {"total_houses": 1, **room_counts_of(db, Room.house_id == house_id)}
+    counts["active_contracts"] = active_contracts_of(db, Room.house_id == house_id)
+    return counts
+
+def rebuild_owner_kpis(db: Session, owner_id: Optional[int] = None) -> int:
+    """Recompute KPI rows from the base tables and revenue_rollups (repairs drift). Returns rows written."""
+    clear = delete(OwnerKpi)
+    if owner_id is not None:
+        clear = clear.where(OwnerKpi.owner_id == owner_id)
+    db.execute(clear)
+
+    def grouped(stmt, owner_col):
+        if owner_id is not None:
+            stmt = stmt.where(owner_col == owner_id)
+        return db.execute(stmt.group_by(owner_col)).all()
+
+    rows: Dict[int, Dict[str, object]] = {}
+
+    def row_for(o):
+        return rows.setdefault(o, dict(owner_id=o, revenue_month=None, month_revenue=0.0, **dict.fromkeys(COUNTERS, 0)))
+
+    for o, n in grouped(select(House.owner_id, func.count()), House.owner_id):
+        row_for(o)["total_houses"] = n
+    for o, n, avail, occ in grouped(
+        select(
+            Room.owner_id,
+            func.count(),
+            func.sum(case((Room.is_available == True, 1), else_=0)),
+            func.sum(case((Room.is_available == False, 1), else_=0)),
+        ),
+        Room.owner_id,
+    ):
+        row_for(o).update(total_rooms=n, available_rooms=avail or 0, occupied_rooms=occ or 0)
+    for o, n in grouped(select(RentedRoom.owner_id, func.count()).where(RentedRoom.is_active == True), RentedRoom.owner_id):
+        row_for(o)["active_contracts"] = n
+    # Same semantics as the rollup: pending = unpaid invoices, revenue by payment month
+    for o, month, paid_total, paid_count, pending in grouped(
+        select(
+            RevenueRollup.owner_id,
+            RevenueRollup.month,
+            func.sum(RevenueRollup.paid_total),
+            func.sum(RevenueRollup.paid_count),
+            func.sum(RevenueRollup.pending_count),
+        ).group_by(RevenueRollup.month),
+        RevenueRollup.owner_id,
+    ):
+        r = row_for(o)
+        r["pending_invoices"] += pending or 0
+        if paid_count and (r["revenue_month"] is None or month > r["revenue_month"]):
+            r["revenue_month"], r["month_revenue"] = month, float(paid_total or 0)
+
+    values = list(rows.values())
+    for i in range(0, len(values), 1000):
+        db.execute(OwnerKpi.__table__.insert(), values[i:i + 1000])
+    db.commit()
+    return len(values)
+
+async def get_overview_async(db: AsyncSession, owner_id: int, now: Optional[datetime] = None) -> Dict[str, object]:
+    """Counters plus this month's paid revenue: one primary-key lookup in the common case."""
+    month = (now or datetime.now()).strftime("%Y-%m")
+    row = await db.get(OwnerKpi, owner_id)
+    overview: Dict[str, object] = {name: getattr(row, name) if row else 0 for name in COUNTERS}
+    if row is None or row.revenue_month is None or row.revenue_month < month:
+        overview["current_month_revenue"] = 0.0
+    elif row.revenue_month == month:
+        overview["current_month_revenue"] = float(row.month_revenue or 0)
+    else:
+        # A later month is tracked (payment dated in the future): read this month from the rollup
+        total = (await db.execute(
+            select(func.coalesce(func.sum(RevenueRollup.paid_total), 0))
+            .where(RevenueRollup.owner_id == owner_id, RevenueRollup.month == month)
+        )).scalar_one()
+        overview["current_month_revenue"] = float(total or 0)
+    return overview
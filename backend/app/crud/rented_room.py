@@ -1,25 +1,22 @@
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import select, update
+from typing import List, Optional
 from app.models.rented_room import RentedRoom
 from app.models.room import Room
-from app.models.house import House
 from app.schemas.rented_room import RentedRoomCreate, RentedRoomUpdate
 from app.crud.room import get_room_by_id
+from app.crud import revenue_rollup, collection_version, owner_kpi
+from app.core.pagination import paginate
+
+# Stable sort key for keyset pagination
+RENTED_ROOM_SORT = (RentedRoom.rr_id,)
 
 def create_rented_room(db: Session, rented_room: RentedRoomCreate, owner_id: int):
-    # Ensure the room belongs to the owner and is available
-    room = (
-        db.query(Room)
-        .join(House)
-        .filter(Room.room_id == rented_room.room_id, 
-                House.owner_id == owner_id, 
-                Room.is_available == True,  
-                rented_room.number_of_tenants <= Room.capacity)
-        .first()
-    )
-    if not room:
+    # Ensure the room belongs to the owner and is available (locked: two contracts cannot take it at once)
+    room = _lock_room(db, rented_room.room_id, owner_id)
+    if not room or room.is_available is not True or rented_room.number_of_tenants > room.capacity:
         return None
-    db_rented_room = RentedRoom(**rented_room.model_dump())
+    db_rented_room = RentedRoom(**rented_room.model_dump(), owner_id=owner_id)
     # Enforce monthly_rent equals room.price at creation time
     db_rented_room.monthly_rent = room.price
     db.add(db_rented_room)
@@ -27,46 +24,84 @@ def create_rented_room(db: Session, rented_room: RentedRoomCreate, owner_id: int
     # Update room availability
     room.is_available = False
 
+    db.flush()
+    # A DB trigger may have created the deposit invoice; account for it in the rollup
+    revenue_rollup.apply_rented_room_invoices(db, owner_id, room.house_id, db_rented_room.rr_id)
+    counts = owner_kpi.diff(owner_kpi.room_counts(True), owner_kpi.room_counts(False))
+    counts["active_contracts"] = int(bool(db_rented_room.is_active))
+    owner_kpi.apply(db, owner_id, counts)
+    # The room becomes unavailable and the deposit invoice may exist now
+    collection_version.bump(
+        db, owner_id, collection_version.RENTED_ROOMS, collection_version.ROOMS, collection_version.INVOICES
+    )
     db.commit()
     db.refresh(db_rented_room)
     return db_rented_room
 
-def get_rented_room_by_id(db: Session, rr_id: int, owner_id: int):
+def _lock_room(db: Session, room_id: int, owner_id: int):
+    # Row lock on the room before reading its availability, so concurrent contract writes on it
+    # apply their KPI deltas one after another. Rooms are locked before their contracts.
+    if db.get_bind().dialect.name == "sqlite":
+        # No FOR UPDATE in SQLite: a no-op write takes the database write lock until commit instead
+        db.execute(
+            update(Room)
+            .where(Room.room_id == room_id, Room.owner_id == owner_id)
+            .values(updated_at=Room.updated_at)
+            .execution_options(synchronize_session=False)
+        )
     return (
-        db.query(RentedRoom)
-        .join(Room)
-        .join(House)
-        .filter(RentedRoom.rr_id == rr_id, House.owner_id == owner_id)
+        db.query(Room)
+        .filter(Room.room_id == room_id, Room.owner_id == owner_id)
+        .with_for_update()
+        .populate_existing()
         .first()
     )
 
+def _room_availability(db: Session, room_id: int):
+    # Column query: reads the row as the database has it (triggers included), not the identity map
+    return db.execute(select(Room.is_available).where(Room.room_id == room_id)).scalar_one_or_none()
+
+def get_rented_room_by_id(db: Session, rr_id: int, owner_id: int):
+    return db.query(RentedRoom).filter(RentedRoom.rr_id == rr_id, RentedRoom.owner_id == owner_id).first()
+
 def get_rented_rooms_by_room(db: Session, room_id: int, owner_id: int):
-    # Verify room belongs to owner
-    room = db.query(Room).join(House).filter(Room.room_id == room_id, House.owner_id == owner_id).first()
-    if not room:
-        return []
-    return db.query(RentedRoom).filter(RentedRoom.room_id == room_id).all()
+    # Only contracts of a room owned by the owner
+    return db.query(RentedRoom).filter(RentedRoom.room_id == room_id, RentedRoom.owner_id == owner_id).all()
 
-def get_active_rented_rooms(db: Session, owner_id: int, skip: int = 0, limit: int = 100):
-    return (
-        db.query(RentedRoom)
-        .join(Room)
-        .join(House)
-        .filter(RentedRoom.is_active == True, House.owner_id == owner_id)
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+def get_active_rented_rooms(db: Session, owner_id: int, skip: int = 0, limit: int = 100, after: Optional[str] = None):
+    query = db.query(RentedRoom).filter(RentedRoom.is_active == True, RentedRoom.owner_id == owner_id)
+    return paginate(query, RENTED_ROOM_SORT, skip=skip, limit=limit, after=after)
 
 def update_rented_room(db: Session, rr_id: int, rented_room_update: RentedRoomUpdate, owner_id: int):
     db_rented_room = get_rented_room_by_id(db, rr_id, owner_id)
     if db_rented_room:
+        room = _lock_room(db, db_rented_room.room_id, owner_id)
+        # Re-read the contract under the room lock: is_active may have changed since the first read
+        db_rented_room = (
+            db.query(RentedRoom)
+            .filter(RentedRoom.rr_id == rr_id, RentedRoom.owner_id == owner_id)
+            .with_for_update()
+            .populate_existing()
+            .first()
+        )
+        if not db_rented_room:
+            return None
+        was_active = bool(db_rented_room.is_active)
+        room_before = room.is_available if room else None
         update_data = rented_room_update.dict(exclude_unset=True)
         # Do not allow changing monthly_rent via update
         if 'monthly_rent' in update_data:
             update_data.pop('monthly_rent', None)
         for field, value in update_data.items():
             setattr(db_rented_room, field, value)
+        # Deactivating a contract frees the room (DB trigger): read the room back after the flush
+        db.flush()
+        counts = owner_kpi.diff(
+            owner_kpi.room_counts(room_before), owner_kpi.room_counts(_room_availability(db, db_rented_room.room_id))
+        ) if room else {}
+        counts["active_contracts"] = int(bool(db_rented_room.is_active)) - int(was_active)
+        owner_kpi.apply(db, owner_id, counts)
+        collection_version.bump(db, owner_id, collection_version.RENTED_ROOMS, collection_version.ROOMS)
         db.commit()
         db.refresh(db_rented_room)
     return db_rented_room
@@ -74,11 +109,21 @@ def update_rented_room(db: Session, rr_id: int, rented_room_update: RentedRoomUp
 def terminate_rental(db: Session, rr_id: int, owner_id: int):
     db_rented_room = get_rented_room_by_id(db, rr_id, owner_id)
     if db_rented_room:
-        db_rented_room.is_active = False
+        room = _lock_room(db, db_rented_room.room_id, owner_id)
+        # Conditional deactivation: of two concurrent terminations only one moves active_contracts
+        deactivated = db.execute(
+            update(RentedRoom)
+            .where(RentedRoom.rr_id == rr_id, RentedRoom.owner_id == owner_id, RentedRoom.is_active == True)
+            .values(is_active=False)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        counts = {"active_contracts": -deactivated}
         # Make room available again
-        room = db.query(Room).filter(Room.room_id == db_rented_room.room_id).first()
         if room:
+            counts.update(owner_kpi.diff(owner_kpi.room_counts(room.is_available), owner_kpi.room_counts(True)))
             room.is_available = True
+        owner_kpi.apply(db, owner_id, counts)
+        collection_version.bump(db, owner_id, collection_version.RENTED_ROOMS, collection_version.ROOMS)
         db.commit()
         db.refresh(db_rented_room)
     return db_rented_room
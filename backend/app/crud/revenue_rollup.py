@@ -0,0 +1,195 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, delete
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+from app.models.revenue_rollup import RevenueRollup
+from app.models.invoice import Invoice
+from app.models.rented_room import RentedRoom
+from app.models.room import Room
+from app.crud import owner_kpi
+
+# (month, paid_total, paid_count, pending_count)
+Contribution = Tuple[str, float, int, int]
+
+def invoice_total(invoice) -> float:
+    return float(
+        (invoice.price or 0)
+        + (invoice.water_price or 0)
+        + (invoice.internet_price or 0)
+        + (invoice.general_price or 0)
+        + (invoice.electricity_price or 0)
+    )
+
+def month_key(value: datetime) -> str:
+    return value.strftime("%Y-%m")
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+def next_month_start(value: datetime) -> datetime:
+    if value.month == 12:
+        return datetime(value.year + 1, 1, 1)
+    return datetime(value.year, value.month + 1, 1)
+
+def invoice_contributions(invoice) -> List[Contribution]:
+    """What a single invoice adds to the rollup.
+
+    Paid invoices count towards the month of payment_date, unpaid ones towards
+    the month of due_date (same semantics as the revenue-stats report).
+    """
+    if invoice.is_paid:
+        if invoice.payment_date is None:
+            return []
+        return [(month_key(invoice.payment_date), invoice_total(invoice), 1, 0)]
+    if invoice.due_date is None:
+        return []
+    return [(month_key(invoice.due_date), 0.0, 0, 1)]
+
+def _upsert_delta(db: Session, owner_id: int, house_id: int, month: str, paid_total: float, paid_count: int, pending_count: int):
+    table = RevenueRollup.__table__
+    values = dict(
+        owner_id=owner_id,
+        house_id=house_id,
+        month=month,
+        paid_total=paid_total,
+        paid_count=paid_count,
+        pending_count=pending_count,
+    )
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(**values)
+        stmt = stmt.on_duplicate_key_update(
+            paid_total=table.c.paid_total + stmt.inserted.paid_total,
+            paid_count=table.c.paid_count + stmt.inserted.paid_count,
+            pending_count=table.c.pending_count + stmt.inserted.pending_count,
+        )
+        db.execute(stmt)
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.owner_id, table.c.house_id, table.c.month],
+            set_={
+                "paid_total": table.c.paid_total + stmt.excluded.paid_total,
+                "paid_count": table.c.paid_count + stmt.excluded.paid_count,
+                "pending_count": table.c.pending_count + stmt.excluded.pending_count,
+            },
+        )
+        db.execute(stmt)
+    else:
+        row = db.get(RevenueRollup, (owner_id, house_id, month), with_for_update=True)
+        if row is None:
+            db.add(RevenueRollup(**values))
+        else:
+            row.paid_total += paid_total
+            row.paid_count += paid_count
+            row.pending_count += pending_count
+        db.flush()
+
+def apply_delta(
+    db: Session,
+    owner_id: int,
+    house_id: int,
+    before: Iterable[Contribution] = (),
+    after: Iterable[Contribution] = (),
+):
+    """Replace `before` contributions with `after` in the rollup (no commit).
+
+    Deltas are merged per month first so that e.g. an edit that does not move
+    money produces no write at all. The owner's KPI row (pending invoices and
+    paid revenue) takes the same deltas.
+    """
+    deltas: Dict[str, List[float]] = {}
+    for sign, items in ((-1, before), (1, after)):
+        for month, paid_total, paid_count, pending_count in items:
+            d = deltas.setdefault(month, [0.0, 0, 0])
+            d[0] += sign * paid_total
+            d[1] += sign * paid_count
+            d[2] += sign * pending_count
+    for month, (paid_total, paid_count, pending_count) in sorted(deltas.items()):
+        if paid_total == 0 and paid_count == 0 and pending_count == 0:
+            continue
+        _upsert_delta(db, owner_id, house_id, month, paid_total, paid_count, pending_count)
+    owner_kpi.apply(
+        db, owner_id,
+        {"pending_invoices": sum(d[2] for d in deltas.values())},
+        revenue=[(month, d[0]) for month, d in deltas.items()],
+    )
+
+def _invoice_rows(db: Session, *filters):
+    """Projected invoice columns (no ORM hydration) with owner/house resolved."""
+    stmt = (
+        select(
+            Invoice.owner_id,
+            Room.house_id,
+            Invoice.price,
+            Invoice.water_price,
+            Invoice.internet_price,
+            Invoice.general_price,
+            Invoice.electricity_price,
+            Invoice.is_paid,
+            Invoice.payment_date,
+            Invoice.due_date,
+        )
+        .select_from(Invoice)
+        .join(RentedRoom, Invoice.rr_id == RentedRoom.rr_id)
+        .join(Room, RentedRoom.room_id == Room.room_id)
+        .where(*filters)
+    )
+    return db.execute(stmt.execution_options(yield_per=5000))
+
+def apply_rented_room_invoices(db: Session, owner_id: int, house_id: int, rr_id: int):
+    """Add invoices inserted outside the ORM (e.g. the deposit-invoice DB trigger)."""
+    after: List[Contribution] = []
+    for row in _invoice_rows(db, Invoice.rr_id == rr_id):
+        after.extend(invoice_contributions(row))
+    apply_delta(db, owner_id, house_id, after=after)
+
+def remove_room(db: Session, owner_id: int, house_id: int, room_id: int):
+    """Subtract every invoice of a room (its contracts cascade-delete them)."""
+    before: List[Contribution] = []
+    for row in _invoice_rows(db, RentedRoom.room_id == room_id):
+        before.extend(invoice_contributions(row))
+    apply_delta(db, owner_id, house_id, before=before)
+
+def remove_house(db: Session, owner_id: int, house_id: int):
+    # The house's invoices are cascade-deleted: take their totals off the KPI row too
+    months = db.execute(
+        select(RevenueRollup.month, RevenueRollup.paid_total, RevenueRollup.pending_count)
+        .where(RevenueRollup.owner_id == owner_id, RevenueRollup.house_id == house_id)
+    ).all()
+    owner_kpi.apply(
+        db, owner_id,
+        {"pending_invoices": -sum(m.pending_count for m in months)},
+        revenue=[(m.month, -m.paid_total) for m in months],
+    )
+    db.execute(
+        delete(RevenueRollup).where(RevenueRollup.owner_id == owner_id, RevenueRollup.house_id == house_id)
+    )
+
+def rebuild_revenue_rollups(db: Session, owner_id: Optional[int] = None) -> int:
+    """Recompute the rollup from the invoices table (repairs drift). Returns number of rows written."""
+    clear = delete(RevenueRollup)
+    filters = []
+    if owner_id is not None:
+        clear = clear.where(RevenueRollup.owner_id == owner_id)
+        filters.append(Invoice.owner_id == owner_id)
+    db.execute(clear)
+
+    totals: Dict[Tuple[int, int, str], List[float]] = {}
+    for row in _invoice_rows(db, *filters):
+        for month, paid_total, paid_count, pending_count in invoice_contributions(row):
+            t = totals.setdefault((row.owner_id, row.house_id, month), [0.0, 0, 0])
+            t[0] += paid_total
+            t[1] += paid_count
+            t[2] += pending_count
+
+    rows = [
+        dict(owner_id=o, house_id=h, month=m, paid_total=t[0], paid_count=t[1], pending_count=t[2])
+        for (o, h, m), t in totals.items()
+    ]
+    for i in range(0, len(rows), 1000):
+        db.execute(RevenueRollup.__table__.insert(), rows[i:i + 1000])
+    db.commit()
+    return len(rows)
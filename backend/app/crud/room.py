@@ -1,58 +1,56 @@
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.models.room import Room
 from app.models.house import House
 from app.schemas.room import RoomCreate, RoomUpdate
+from app.crud import revenue_rollup, collection_version, owner_kpi
+from app.core.pagination import paginate
+
+# Stable sort key for keyset pagination
+ROOM_SORT = (Room.room_id,)
 
 def create_room(db: Session, room: RoomCreate, owner_id: int):
     # Ensure the house belongs to the owner
     house = db.query(House).filter(House.house_id == room.house_id, House.owner_id == owner_id).first()
     if not house:
         return None
-    db_room = Room(**room.dict())
+    db_room = Room(**room.dict(), owner_id=owner_id)
     db.add(db_room)
+    db.flush()
+    owner_kpi.apply(db, owner_id, owner_kpi.room_counts(db_room.is_available))
+    collection_version.bump(db, owner_id, collection_version.ROOMS)
     db.commit()
     db.refresh(db_room)
     return db_room
 
 def get_room_by_id(db: Session, room_id: int, owner_id: int):
-    return (
-        db.query(Room)
-        .join(House)
-        .filter(Room.room_id == room_id, House.owner_id == owner_id)
-        .first()
-    )
+    return db.query(Room).filter(Room.room_id == room_id, Room.owner_id == owner_id).first()
 
-def get_rooms_by_house(db: Session, house_id: int, owner_id: int, skip: int = 0, limit: int = 100):
-    # House must belong to owner
-    house = db.query(House).filter(House.house_id == house_id, House.owner_id == owner_id).first()
-    if not house:
-        return []
-    return db.query(Room).filter(Room.house_id == house_id).offset(skip).limit(limit).all()
+def get_rooms_by_house(db: Session, house_id: int, owner_id: int, skip: int = 0, limit: int = 100, after: Optional[str] = None):
+    # House must belong to owner (rooms carry the house's owner_id)
+    query = db.query(Room).filter(Room.house_id == house_id, Room.owner_id == owner_id)
+    return paginate(query, ROOM_SORT, skip=skip, limit=limit, after=after)
 
-def get_available_rooms(db: Session, owner_id: int, house_id: int | None = None, skip: int = 0, limit: int = 100):
-    query = db.query(Room).join(House).filter(Room.is_available == True, House.owner_id == owner_id)
+def get_available_rooms(db: Session, owner_id: int, house_id: int | None = None, skip: int = 0, limit: int = 100, after: Optional[str] = None):
+    query = db.query(Room).filter(Room.is_available == True, Room.owner_id == owner_id)
     if house_id:
         # ensure the house belongs to the owner
         query = query.filter(Room.house_id == house_id)
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, ROOM_SORT, skip=skip, limit=limit, after=after)
 
-def get_all_rooms(db: Session, owner_id: int, skip: int = 0, limit: int = 100):
-    return (
-        db.query(Room)
-        .join(House)
-        .filter(House.owner_id == owner_id)
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+def get_all_rooms(db: Session, owner_id: int, skip: int = 0, limit: int = 100, after: Optional[str] = None):
+    query = db.query(Room).filter(Room.owner_id == owner_id)
+    return paginate(query, ROOM_SORT, skip=skip, limit=limit, after=after)
 
 def update_room(db: Session, room_id: int, room_update: RoomUpdate, owner_id: int):
     db_room = get_room_by_id(db, room_id, owner_id)
     if db_room:
+        before = owner_kpi.room_counts(db_room.is_available)
         update_data = room_update.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_room, field, value)
+        owner_kpi.apply(db, owner_id, owner_kpi.diff(before, owner_kpi.room_counts(db_room.is_available)))
+        collection_version.bump(db, owner_id, collection_version.ROOMS)
         db.commit()
         db.refresh(db_room)
     return db_room
@@ -60,6 +58,14 @@ def update_room(db: Session, room_id: int, room_update: RoomUpdate, owner_id: in
 def delete_room(db: Session, room_id: int, owner_id: int):
     db_room = get_room_by_id(db, room_id, owner_id)
     if db_room:
+        # Invoices of past contracts are cascade-deleted with the room
+        revenue_rollup.remove_room(db, owner_id, db_room.house_id, room_id)
+        counts = owner_kpi.room_counts(db_room.is_available)
+        counts["active_contracts"] = owner_kpi.active_contracts_of(db, Room.room_id == room_id)
+        owner_kpi.apply(db, owner_id, {k: -v for k, v in counts.items()})
         db.delete(db_room)
+        collection_version.bump(
+            db, owner_id, collection_version.ROOMS, collection_version.RENTED_ROOMS, collection_version.INVOICES
+        )
         db.commit()
     return db_room
@@ -1,11 +1,13 @@
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.models.user import User, Role
 from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash, invalidate_principal
 
-def create_user(db: Session, user: UserCreate):
-    hashed_password = get_password_hash(user.password)
+def create_user(db: Session, user: UserCreate, hashed_password: Optional[str] = None):
+    # Async callers hash on the bcrypt executor and pass the result in
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
 
     # Resolve 'owner' role by authority to avoid hardcoding role_id
     owner_role = db.query(Role).filter(Role.authority == "owner").first()
@@ -54,6 +56,7 @@ def delete_user(db: Session, user_id: int):
     if db_user:
         db.delete(db_user)
         db.commit()
+        invalidate_principal(user_id)
     return db_user
 
 def get_role_by_id(db: Session, role_id: int):
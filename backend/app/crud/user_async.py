@@ -0,0 +1,20 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.models.user import User
+
+# Async counterparts of app.crud.user used by the auth dependency chain.
+# The role is eager-loaded: lazy loads are not allowed on an AsyncSession and
+# every caller (login, require_role, /users/me) needs role.authority.
+
+async def get_user_by_id(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(User).options(selectinload(User.role)).where(User.owner_id == user_id)
+    )
+    return result.scalars().first()
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(
+        select(User).options(selectinload(User.role)).where(User.email == email)
+    )
+    return result.scalars().first()
@@ -1,14 +1,26 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .core.database import engine, Base
-# Ensure models are imported so SQLAlchemy registers all tables before create_all
-from .models import user, house, room, asset, rented_room, invoice  # noqa: F401
+from .core.config import settings
+from .core.database import engine, async_engine
+from .core.schema import check_schema_revision, prewarm_pool, prewarm_async_pool
+# Import đủ model để các relationship khai báo bằng tên lớp được resolve
+from .models import user, house, room, asset, rented_room, invoice, revenue_rollup, collection_version, owner_kpi  # noqa: F401
 from .api.v2.api import api_router
+from .core.pagination import NEXT_CURSOR_HEADER
+from .core.request_metrics import RequestMetricsMiddleware
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bảng do migration tạo (python manage_db.py upgrade); worker chỉ kiểm tra revision bằng một truy vấn
+    check_schema_revision(engine, mode=settings.schema_check)
+    if settings.db_pool_prewarm > 0:
+        warm = min(settings.db_pool_prewarm, settings.db_pool_size)
+        prewarm_pool(engine, warm)
+        await prewarm_async_pool(async_engine, warm)
+    yield
 
-app = FastAPI(title="Room Management API", version="2.0.0")
+app = FastAPI(title="Room Management API", version="2.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -17,8 +29,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cho phép frontend đọc cursor phân trang và ETag
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
 
+# Độ trễ và số câu SQL theo route (ngoài cùng để tính cả CORS); xem /api/v2/internal/metrics
+if settings.request_metrics_enabled:
+    app.add_middleware(RequestMetricsMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix="/api/v2")
 
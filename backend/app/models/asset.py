@@ -9,7 +9,7 @@ class Asset(Base):
     asset_id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
     image_url = Column(String(255))
-    room_id = Column(Integer, ForeignKey("rooms.room_id"), nullable=False)
+    room_id = Column(Integer, ForeignKey("rooms.room_id"), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     room = relationship("Room", back_populates="assets")
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, BigInteger
+from app.core.database import Base
+
+class CollectionVersion(Base):
+    """Bộ đếm phiên bản theo (chủ nhà, tập dữ liệu), tăng cùng transaction với mọi thao tác ghi.
+
+    Dùng để sinh ETag cho các endpoint GET: so khớp If-None-Match chỉ cần đọc bảng này.
+    """
+    __tablename__ = "collection_versions"
+
+    owner_id = Column(Integer, ForeignKey("users.owner_id"), primary_key=True)
+    collection = Column(String(32), primary_key=True)
+    version = Column(BigInteger, default=0, nullable=False)
@@ -12,7 +12,7 @@ class House(Base):
     ward = Column(String(100), nullable=False)
     district = Column(String(100), nullable=False)
     address_line = Column(String(255), nullable=False)
-    owner_id = Column(Integer, ForeignKey("users.owner_id"), nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.owner_id"), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -1,10 +1,22 @@
-from sqlalchemy import Column, Integer, Float, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
 
 class Invoice(Base):
     __tablename__ = "invoices"
+    __table_args__ = (
+        # Paid revenue / counts by payment month (reports, system overview)
+        Index("ix_invoices_owner_paid_payment", "owner_id", "is_paid", "payment_date"),
+        # Pending invoices by due date (pending list, reports, overview count)
+        Index("ix_invoices_owner_paid_due", "owner_id", "is_paid", "due_date"),
+        # Invoice list filtered by month only
+        Index("ix_invoices_owner_due", "owner_id", "due_date"),
+        # Invoices of one contract, optionally unpaid / by month
+        Index("ix_invoices_rr_paid_due", "rr_id", "is_paid", "due_date"),
+        # One billing-run invoice per contract and month (NULL for manual invoices)
+        UniqueConstraint("rr_id", "billing_month", name="uq_invoices_rr_billing_month"),
+    )
     
     invoice_id = Column(Integer, primary_key=True, index=True)
     price = Column(Float, nullable=False)
@@ -17,7 +29,10 @@ class Invoice(Base):
     due_date = Column(DateTime, nullable=False)
     payment_date = Column(DateTime)
     is_paid = Column(Boolean, default=False, nullable=False)
+    billing_month = Column(String(7))  # YYYY-MM, set by the monthly billing run
     rr_id = Column(Integer, ForeignKey("rented_rooms.rr_id"), nullable=False)
+    # Denormalized from houses.owner_id so ownership checks need no join
+    owner_id = Column(Integer, ForeignKey("users.owner_id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
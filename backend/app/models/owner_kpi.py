@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class OwnerKpi(Base):
+    """Chỉ số tổng quan của một chủ nhà, cập nhật cùng transaction với các thao tác ghi.
+
+    /reports/system-overview chỉ cần đọc một dòng theo khóa chính.
+    - month_revenue: doanh thu đã thanh toán của revenue_month (tháng thanh toán mới nhất từng ghi nhận)
+    """
+    __tablename__ = "owner_kpis"
+
+    owner_id = Column(Integer, ForeignKey("users.owner_id"), primary_key=True)
+    total_houses = Column(Integer, default=0, nullable=False)
+    total_rooms = Column(Integer, default=0, nullable=False)
+    available_rooms = Column(Integer, default=0, nullable=False)
+    occupied_rooms = Column(Integer, default=0, nullable=False)
+    active_contracts = Column(Integer, default=0, nullable=False)
+    pending_invoices = Column(Integer, default=0, nullable=False)
+    revenue_month = Column(String(7))  # YYYY-MM
+    month_revenue = Column(Float, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
 
 class RentedRoom(Base):
     __tablename__ = "rented_rooms"
+    __table_args__ = (
+        Index("ix_rented_rooms_owner_active", "owner_id", "is_active"),
+        Index("ix_rented_rooms_room_active", "room_id", "is_active"),
+    )
     
     rr_id = Column(Integer, primary_key=True, index=True)
     tenant_name = Column(String(100), nullable=False)
@@ -21,6 +25,8 @@ class RentedRoom(Base):
     internet_price = Column(Float, default=100000)
     general_price = Column(Float, default=100000)
     room_id = Column(Integer, ForeignKey("rooms.room_id"), nullable=False)
+    # Denormalized from houses.owner_id so ownership checks need no join
+    owner_id = Column(Integer, ForeignKey("users.owner_id"), nullable=False)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
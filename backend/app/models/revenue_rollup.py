@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class RevenueRollup(Base):
+    """Tổng hợp doanh thu theo (chủ nhà, nhà trọ, tháng), cập nhật cùng transaction với hóa đơn.
+
+    - paid_total / paid_count: hóa đơn đã thanh toán, tính theo tháng của payment_date
+    - pending_count: hóa đơn chưa thanh toán, tính theo tháng của due_date
+    """
+    __tablename__ = "revenue_rollups"
+    __table_args__ = (
+        Index("ix_revenue_rollups_owner_month", "owner_id", "month"),
+    )
+
+    owner_id = Column(Integer, ForeignKey("users.owner_id"), primary_key=True)
+    house_id = Column(Integer, primary_key=True)
+    month = Column(String(7), primary_key=True)  # YYYY-MM
+    paid_total = Column(Float, default=0, nullable=False)
+    paid_count = Column(Integer, default=0, nullable=False)
+    pending_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
 
 class Room(Base):
     __tablename__ = "rooms"
+    __table_args__ = (
+        Index("ix_rooms_owner_available", "owner_id", "is_available"),
+        Index("ix_rooms_house_available", "house_id", "is_available"),
+    )
     
     room_id = Column(Integer, primary_key=True, index=True)
     name = Column(String(50), nullable=False)
@@ -12,6 +16,8 @@ class Room(Base):
     description = Column(Text)
     price = Column(Float, nullable=False)
     house_id = Column(Integer, ForeignKey("houses.house_id"), nullable=False)
+    # Denormalized from houses.owner_id so ownership checks need no join
+    owner_id = Column(Integer, ForeignKey("users.owner_id"), nullable=False)
     is_available = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, field_validator
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
 from datetime import datetime
+import re
 
 class InvoiceBase(BaseModel):
     price: float
@@ -32,6 +33,7 @@ class Invoice(InvoiceBase):
     invoice_id: int
     rr_id: int
     is_paid: bool
+    billing_month: Optional[str] = None
     created_at: datetime
     
     @field_validator('is_paid', mode='before')
@@ -44,5 +46,37 @@ class Invoice(InvoiceBase):
     class Config:
         from_attributes = True
 
+class BillingRunRequest(BaseModel):
+    month: str  # YYYY-MM
+    house_id: Optional[int] = None
+    due_day: int = Field(default=1, ge=1, le=28)
+
+    @field_validator('month')
+    @classmethod
+    def validate_month(cls, v: str):
+        if not re.fullmatch(r"^\d{4}-(0[1-9]|1[0-2])$", v or ""):
+            raise ValueError("Tháng không hợp lệ, định dạng YYYY-MM")
+        return v
+
+class BillingRunSummary(BaseModel):
+    month: str
+    house_id: Optional[int] = None
+    due_date: datetime
+    active_contracts: int
+    created: int
+    already_billed: int
+    total_amount: float
+
+class MeterReadingError(BaseModel):
+    row: int
+    error: str
+
+class MeterReadingImportSummary(BaseModel):
+    processed: int
+    updated: int
+    failed: int
+    errors: List[MeterReadingError]
+    errors_truncated: bool = False
+
 class InvoiceWithDetails(Invoice):
     rented_room: "RentedRoom"
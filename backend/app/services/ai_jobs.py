@@ -0,0 +1,191 @@
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+from fastapi import HTTPException, status
+from ..core.cache import TTLCache
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+TIMEOUT = "timeout"
+
+# generate(owner_id, start_date, end_date, force_refresh) -> Markdown
+ReportFn = Callable[[int, str, str, bool], str]
+
+
+class ReportJob:
+    __slots__ = ("job_id", "owner_id", "start_date", "end_date", "force_refresh", "status",
+                 "report", "error", "created_at", "started_at", "finished_at", "deadline", "future")
+
+    def __init__(self, owner_id: int, start_date: str, end_date: str, force_refresh: bool):
+        self.job_id = uuid.uuid4().hex
+        self.owner_id = owner_id
+        self.start_date = start_date
+        self.end_date = end_date
+        self.force_refresh = force_refresh
+        self.status = QUEUED
+        self.report: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.deadline = 0.0
+        self.future: Optional[Future] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "period": f"{self.start_date} đến {self.end_date}",
+            "report": self.report,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ReportJobQueue:
+    """Hàng đợi job sinh báo cáo AI: gọi model trên executor riêng, không chặn event loop.
+
+    - Tối đa `workers` lời gọi model cùng lúc; job đang chờ + đang chạy vượt
+      `workers + max_queue` thì từ chối ngay (503).
+    - Quá `timeout` giây (tính từ lúc nhận job) thì job chuyển sang "timeout"; lời gọi
+      LLM cũng có timeout riêng (llm_timeout_seconds) nên thread worker không bị giữ mãi.
+    - Cùng chủ nhà + kỳ báo cáo đang có job chưa xong thì trả lại job đó.
+    - Job lưu trong bộ nhớ tiến trình `job_ttl` giây: chạy nhiều worker thì phải
+      poll đúng worker đã nhận job (sticky session).
+    """
+
+    def __init__(self, generate: ReportFn, workers: int, max_queue: int, timeout: float, job_ttl: float,
+                 max_jobs: int = 10000):
+        self._generate = generate
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ai-report")
+        self._jobs = TTLCache(ttl=job_ttl, max_entries=max_jobs)
+        self._active: Dict[Tuple[int, str, str, bool], ReportJob] = {}
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.rejected = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.timed_out = 0
+
+    def _call(self, job: ReportJob) -> Optional[str]:
+        """Chạy trên thread worker; trả None (không gọi model) nếu job đã bị đánh dấu timeout khi còn chờ."""
+        with self._lock:
+            if job.status != QUEUED:
+                return None
+            job.status = RUNNING
+            job.started_at = datetime.now()
+        return self._generate(job.owner_id, job.start_date, job.end_date, job.force_refresh)
+
+    def _finish(self, job: ReportJob, key, future: Future):
+        """Chạy khi lời gọi thực sự xong; giảm bộ đếm kể cả với job đã bị đánh dấu timeout."""
+        with self._lock:
+            self._in_flight -= 1
+            if job.status == TIMEOUT:
+                # Kết quả trễ bị bỏ qua; gồm cả None khi _call bỏ qua job đã quá hạn
+                return
+            if self._active.get(key) is job:
+                del self._active[key]
+            error = future.exception()
+            report = future.result() if error is None else None
+            if report is not None:
+                job.report = report
+                job.status = SUCCEEDED
+                self.succeeded += 1
+            elif error is None:
+                # Không có báo cáo: _call bỏ qua job (không còn QUEUED) hoặc model không trả nội dung
+                job.error = "Không có báo cáo"
+                job.status = FAILED
+                self.failed += 1
+            elif isinstance(error, TimeoutError):
+                # Backend LLM tự hết thời gian (llm_timeout_seconds)
+                job.error = str(error)
+                job.status = TIMEOUT
+                self.timed_out += 1
+            else:
+                job.error = str(error)
+                job.status = FAILED
+                self.failed += 1
+            job.finished_at = datetime.now()
+
+    def _check_timeout(self, job: ReportJob):
+        """Job quá hạn thì đánh dấu timeout (thread không dừng được, nhưng kết quả trễ bị bỏ qua)."""
+        with self._lock:
+            if job.status not in (QUEUED, RUNNING) or time.monotonic() < job.deadline:
+                return
+            job.status = TIMEOUT
+            job.error = f"Quá thời gian {self.timeout:g}s"
+            job.finished_at = datetime.now()
+            self.timed_out += 1
+            key = (job.owner_id, job.start_date, job.end_date, job.force_refresh)
+            if self._active.get(key) is job:
+                del self._active[key]
+        # Chưa chạy thì bỏ khỏi hàng đợi của executor luôn
+        job.future.cancel()
+
+    def submit(self, owner_id: int, start_date: str, end_date: str, force_refresh: bool = False) -> ReportJob:
+        key = (owner_id, start_date, end_date, force_refresh)
+        with self._lock:
+            job = self._active.get(key)
+            if job is not None:
+                return job
+            if self._in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="AI service is busy, please retry",
+                    headers={"Retry-After": "5"},
+                )
+            self._in_flight += 1
+            job = ReportJob(owner_id, start_date, end_date, force_refresh)
+            job.deadline = time.monotonic() + self.timeout
+            self._active[key] = job
+        self._jobs.set(job.job_id, job)
+        job.future = self._executor.submit(self._call, job)
+        job.future.add_done_callback(lambda future: self._finish(job, key, future))
+        return job
+
+    def get(self, job_id: str, owner_id: int) -> Optional[ReportJob]:
+        job = self._jobs.get(job_id)
+        if job is None or job.owner_id != owner_id:
+            return None
+        self._check_timeout(job)
+        return job
+
+    async def wait(self, job: ReportJob) -> ReportJob:
+        """Chờ job xong hoặc hết hạn mà không chặn event loop."""
+        remaining = max(job.deadline - time.monotonic(), 0)
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job.future)), remaining)
+        except asyncio.CancelledError:
+            # Job bị hủy do timeout (poll từ request khác); còn lại là request này bị hủy
+            if not job.future.cancelled():
+                raise
+        except Exception:
+            pass  # hết hạn (đánh dấu bên dưới) hoặc lỗi đã ghi vào job trong _finish
+        self._check_timeout(job)
+        return job
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = self._in_flight
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "timeout_s": self.timeout,
+            "in_flight": in_flight,
+            "rejected": self.rejected,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+        }
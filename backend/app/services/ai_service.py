@@ -1,15 +1,48 @@
-import google.generativeai as genai
 from ..core.config import settings
 from ..core.database import get_db
-from sqlalchemy import text
+from ..core.cache import TTLCache
+from .reporting import compute_revenue_stats, RevenueStats
+from .ai_jobs import ReportJobQueue
+from .llm import LLMBackend, build_backend
+from dataclasses import asdict
+from datetime import date
+from typing import Optional
+import hashlib
+import json
 import re
+import threading
+
+# Báo cáo đã sinh, khoá (owner_id, start_date, end_date, dấu vân tay số liệu)
+report_cache = TTLCache(ttl=settings.ai_report_cache_ttl_seconds, max_entries=settings.ai_report_cache_max_entries)
+
+def metrics_fingerprint(stats: RevenueStats, model: str) -> str:
+    """Băm số liệu đưa vào prompt (kèm tên model): hóa đơn thay đổi thì khoá cache đổi theo."""
+    payload = json.dumps({"model": model, **asdict(stats)}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
 
 class AIService:
-    def __init__(self):
-        # Cấu hình Gemini AI (dùng key từ config, không hardcode)
-        genai.configure(api_key=settings.gemini_api_key)
-        # Dùng model ổn định, phổ biến
-        self.model = genai.GenerativeModel('gemini-2.5-pro')
+    def __init__(self, llm: Optional[LLMBackend] = None):
+        # Backend (và SDK Gemini) chỉ được tạo ở lần gọi đầu tiên: import app / khởi động worker không tốn thêm
+        self._llm = llm
+        self._llm_lock = threading.Lock()
+
+    @property
+    def llm(self) -> LLMBackend:
+        if self._llm is None:
+            with self._llm_lock:
+                if self._llm is None:
+                    # Mặc định theo cấu hình llm_backend (Gemini hoặc stub), đã giới hạn đồng thời + timeout
+                    self._llm = build_backend()
+        return self._llm
+
+    @llm.setter
+    def llm(self, backend: LLMBackend):
+        self._llm = backend
+
+    def llm_stats(self) -> Optional[dict]:
+        """Thống kê của backend; None nếu chưa khởi tạo (chưa có lời gọi nào)."""
+        stats = getattr(self._llm, "stats", None)
+        return stats() if stats else None
 
     def _sanitize_markdown(self, content: str) -> str:
         """Chuẩn hoá Markdown: chỉ dùng '-' cho bullet, bỏ ký tự lạ/emoji/fences, gọn dòng."""
@@ -42,118 +75,73 @@ class AIService:
         text_out = re.sub(r"\n{3,}", "\n\n", text_out).strip()
         return text_out
 
-    def generate_revenue_report(self, start_date: str, end_date: str, owner_id: int) -> str:
-        """
-        Tạo báo cáo doanh thu bằng AI (phạm vi theo chủ nhà đăng nhập)
-        """
-        try:
-            db = next(get_db())
-
-            # Tổng doanh thu (đã thanh toán) trong khoảng thời gian, theo owner
-            total_revenue_row = db.execute(text(
-                """
-                SELECT COALESCE(SUM(i.price + i.water_price + i.internet_price + i.general_price + i.electricity_price), 0) as total
-                FROM invoices i
-                JOIN rented_rooms rr ON i.rr_id = rr.rr_id
-                JOIN rooms r ON rr.room_id = r.room_id
-                JOIN houses h ON r.house_id = h.house_id
-                WHERE i.is_paid = TRUE 
-                  AND i.payment_date BETWEEN :start_date AND :end_date
-                  AND h.owner_id = :owner_id
-                """
-            ), { 'start_date': start_date, 'end_date': end_date, 'owner_id': owner_id }).fetchone()
-            total_revenue = float(total_revenue_row.total or 0)
-
-            # Số hóa đơn đã thanh toán trong khoảng thời gian, theo owner
-            paid_invoices_row = db.execute(text(
-                """
-                SELECT COUNT(*) as cnt
-                FROM invoices i
-                JOIN rented_rooms rr ON i.rr_id = rr.rr_id
-                JOIN rooms r ON rr.room_id = r.room_id
-                JOIN houses h ON r.house_id = h.house_id
-                WHERE i.is_paid = TRUE 
-                  AND i.payment_date BETWEEN :start_date AND :end_date
-                  AND h.owner_id = :owner_id
-                """
-            ), { 'start_date': start_date, 'end_date': end_date, 'owner_id': owner_id }).fetchone()
-            paid_invoices = int(paid_invoices_row.cnt or 0)
-
-            # Số hóa đơn chưa thanh toán theo due_date trong khoảng thời gian, theo owner
-            pending_invoices_row = db.execute(text(
-                """
-                SELECT COUNT(*) as cnt
-                FROM invoices i
-                JOIN rented_rooms rr ON i.rr_id = rr.rr_id
-                JOIN rooms r ON rr.room_id = r.room_id
-                JOIN houses h ON r.house_id = h.house_id
-                WHERE i.is_paid = FALSE 
-                  AND i.due_date BETWEEN :start_date AND :end_date
-                  AND h.owner_id = :owner_id
-                """
-            ), { 'start_date': start_date, 'end_date': end_date, 'owner_id': owner_id }).fetchone()
-            pending_invoices = int(pending_invoices_row.cnt or 0)
-
-            # Doanh thu trung bình theo tháng (trong khoảng thời gian), theo owner
-            avg_month_row = db.execute(text(
-                """
-                SELECT COALESCE(AVG(monthly_revenue), 0) as avg_rev
-                FROM (
-                    SELECT DATE_FORMAT(i.payment_date, '%Y-%m') as month,
-                           SUM(i.price + i.water_price + i.internet_price + i.general_price + i.electricity_price) as monthly_revenue
-                    FROM invoices i
-                    JOIN rented_rooms rr ON i.rr_id = rr.rr_id
-                    JOIN rooms r ON rr.room_id = r.room_id
-                    JOIN houses h ON r.house_id = h.house_id
-                    WHERE i.is_paid = TRUE 
-                      AND i.payment_date BETWEEN :start_date AND :end_date
-                      AND h.owner_id = :owner_id
-                    GROUP BY DATE_FORMAT(i.payment_date, '%Y-%m')
-                ) t
-                """
-            ), { 'start_date': start_date, 'end_date': end_date, 'owner_id': owner_id }).fetchone()
-            avg_monthly_revenue = float(avg_month_row.avg_rev or 0)
-
-            db.close()
-            
-            # Tính bổ sung
-            total_invoices = paid_invoices + pending_invoices
-            payment_rate = (paid_invoices / total_invoices * 100) if total_invoices > 0 else 0
+    def _revenue_prompt(self, start_date: str, end_date: str, stats: RevenueStats) -> str:
+        # Prompt chuẩn Markdown, KHÔNG emoji/ký tự lạ, KHÔNG câu mở đầu/kết luận
+        return f"""
+        Bạn là chuyên gia phân tích doanh thu. Hãy trả lời bằng Markdown, đúng định dạng sau và KHÔNG thêm ký tự trang trí/emoji:
 
-            # Prompt chuẩn Markdown, KHÔNG emoji/ký tự lạ, KHÔNG câu mở đầu/kết luận
-            prompt = f"""
-            Bạn là chuyên gia phân tích doanh thu. Hãy trả lời bằng Markdown, đúng định dạng sau và KHÔNG thêm ký tự trang trí/emoji:
+        ## PHÂN TÍCH DOANH THU
+        - **Kỳ báo cáo:** {start_date} - {end_date}
 
-            ## PHÂN TÍCH DOANH THU
-            - **Kỳ báo cáo:** {start_date} - {end_date}
+        ## CHỈ SỐ CHÍNH
+        - **Tổng doanh thu:** {stats.total_revenue:,.0f} VNĐ
+        - **Tỷ lệ thanh toán:** {stats.payment_rate:.1f}%
+        - **Số lượng hóa đơn:** {stats.total_invoices}
+        - **Giá trị trung bình/hóa đơn:** {stats.avg_invoice_value:,.0f} VNĐ
 
-            ## CHỈ SỐ CHÍNH
-            - **Tổng doanh thu:** {total_revenue:,.0f} VNĐ
-            - **Tỷ lệ thanh toán:** {payment_rate:.1f}%
-            - **Số lượng hóa đơn:** {total_invoices}
-            - **Giá trị trung bình/hóa đơn:** {(total_revenue / total_invoices if total_invoices > 0 else 0):,.0f} VNĐ
+        ## ĐIỂM MẠNH
+        - Nêu tối đa 3 ý ngắn gọn dựa trên dữ liệu trên.
 
-            ## ĐIỂM MẠNH
-            - Nêu tối đa 3 ý ngắn gọn dựa trên dữ liệu trên.
+        ## VẤN ĐỀ CẦN LƯU Ý
+        - Nêu tối đa 3 ý ngắn gọn, tập trung rủi ro/điểm yếu.
 
-            ## VẤN ĐỀ CẦN LƯU Ý
-            - Nêu tối đa 3 ý ngắn gọn, tập trung rủi ro/điểm yếu.
+        ## KHUYẾN NGHỊ
+        - Đưa ra 3-4 gợi ý cụ thể, dễ hành động về vấn đề đã nêu, không lan man sang các lĩnh vực khác như bán hàng .v.v.
 
-            ## KHUYẾN NGHỊ
-            - Đưa ra 3-4 gợi ý cụ thể, dễ hành động về vấn đề đã nêu, không lan man sang các lĩnh vực khác như bán hàng .v.v.
+        YÊU CẦU ĐỊNH DẠNG:
+        - Chỉ dùng dấu '-' cho bullet (không dùng '•', '—', '–' hay ký tự khác).
+        - Không có dòng trống thừa, không bọc trong ```.
+        - Không viết câu mở đầu/kết luận.
+        - Mỗi bullet tối đa 1-2 câu, ≤ 120 ký tự.
+        """
 
-            YÊU CẦU ĐỊNH DẠNG:
-            - Chỉ dùng dấu '-' cho bullet (không dùng '•', '—', '–' hay ký tự khác).
-            - Không có dòng trống thừa, không bọc trong ```.
-            - Không viết câu mở đầu/kết luận.
-            - Mỗi bullet tối đa 1-2 câu, ≤ 120 ký tự.
-            """
+    def create_revenue_report(self, owner_id: int, start_date: str, end_date: str, force_refresh: bool = False) -> str:
+        """
+        Tạo báo cáo doanh thu bằng AI (phạm vi theo chủ nhà đăng nhập); lỗi được raise cho job xử lý.
+        Cùng kỳ và số liệu không đổi thì trả lại báo cáo đã cache, trừ khi force_refresh.
+        Chạy đồng bộ (DB + lời gọi LLM): gọi qua report_jobs, không gọi thẳng trong event loop.
+        """
+        db = next(get_db())
+        try:
+            # Dùng chung bộ máy thống kê với /reports/revenue-stats
+            stats = compute_revenue_stats(
+                db,
+                owner_id=owner_id,
+                start_date=date.fromisoformat(start_date),
+                end_date=date.fromisoformat(end_date),
+            )
+        finally:
+            db.close()
 
-            response = self.model.generate_content(prompt)
-            return self._sanitize_markdown(response.text)
+        key = (owner_id, start_date, end_date, metrics_fingerprint(stats, self.llm.name))
+        if not force_refresh:
+            cached = report_cache.get(key)
+            if cached is not None:
+                return cached
 
-        except Exception as e:
-            return f"Không thể tạo báo cáo doanh thu: {str(e)}"
+        prompt = self._revenue_prompt(start_date, end_date, stats)
+        report = self._sanitize_markdown(self.llm.generate(prompt, timeout=settings.llm_timeout_seconds))
+        # Chỉ cache kết quả thành công
+        report_cache.set(key, report)
+        return report
 
-# Khởi tạo service
+# Khởi tạo service (rẻ: backend LLM được tạo khi cần)
 ai_service = AIService()
+
+report_jobs = ReportJobQueue(
+    generate=ai_service.create_revenue_report,
+    workers=settings.ai_report_workers,
+    max_queue=settings.ai_report_max_queue,
+    timeout=settings.ai_report_timeout_seconds,
+    job_ttl=settings.ai_report_job_ttl_seconds,
+)
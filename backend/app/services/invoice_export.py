@@ -0,0 +1,114 @@
+import csv
+import io
+import tempfile
+from datetime import datetime
+from typing import Iterable, Iterator, List
+from ..core.database import SessionLocal
+from ..crud import invoice as invoice_crud
+
+# (tiêu đề cột, tên cột trong EXPORT_COLUMNS); cột "total" tính từ các khoản tiền
+HEADERS = [
+    ("Mã hóa đơn", "invoice_id"),
+    ("Kỳ", "billing_month"),
+    ("Hạn thanh toán", "due_date"),
+    ("Ngày thanh toán", "payment_date"),
+    ("Đã thanh toán", "is_paid"),
+    ("Mã nhà", "house_id"),
+    ("Nhà", "house_name"),
+    ("Mã phòng", "room_id"),
+    ("Phòng", "room_name"),
+    ("Mã hợp đồng", "rr_id"),
+    ("Người thuê", "tenant_name"),
+    ("Tiền phòng", "price"),
+    ("Tiền nước", "water_price"),
+    ("Internet", "internet_price"),
+    ("Phí chung", "general_price"),
+    ("Chỉ số điện", "electricity_num"),
+    ("Tiền điện", "electricity_price"),
+    ("Chỉ số nước", "water_num"),
+    ("Tổng", "total"),
+]
+
+# Số dòng gom lại trước khi đẩy một chunk CSV ra response
+CSV_FLUSH_ROWS = 500
+# Kích thước chunk khi đọc lại file XLSX tạm
+XLSX_CHUNK_BYTES = 64 * 1024
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _values(row) -> List[object]:
+    total = sum(
+        (getattr(row, name) or 0)
+        for name in ("price", "water_price", "internet_price", "general_price", "electricity_price")
+    )
+    values = []
+    for _, key in HEADERS:
+        values.append(total if key == "total" else getattr(row, key))
+    return values
+
+
+def _rows(owner_id: int, filters: dict) -> Iterator[List[object]]:
+    """Mở session riêng cho cả vòng đời response (dependency get_db có thể đóng trước khi stream xong)."""
+    db = SessionLocal()
+    try:
+        for row in invoice_crud.iter_invoice_export_rows(db, owner_id=owner_id, **filters):
+            yield _values(row)
+    finally:
+        db.close()
+
+
+def _csv_cell(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return "" if value is None else value
+
+
+def stream_csv(owner_id: int, filters: dict) -> Iterable[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM để Excel nhận đúng UTF-8 (tiếng Việt)
+    buffer.write("\ufeff")
+    writer.writerow([title for title, _ in HEADERS])
+    pending = 0
+    for values in _rows(owner_id, filters):
+        writer.writerow([_csv_cell(v) for v in values])
+        pending += 1
+        if pending >= CSV_FLUSH_ROWS:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode("utf-8")
+
+
+def xlsx_available() -> bool:
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def stream_xlsx(owner_id: int, filters: dict) -> Iterable[bytes]:
+    """XLSX là file zip nên phải ghi xong mới gửi: dùng workbook write-only + file tạm để bộ nhớ không tăng theo số dòng."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Hoa don")
+    sheet.append([title for title, _ in HEADERS])
+    for values in _rows(owner_id, filters):
+        sheet.append(values)
+    with tempfile.TemporaryFile() as tmp:
+        workbook.save(tmp)
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(XLSX_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
@@ -0,0 +1,143 @@
+import threading
+import time
+from typing import Optional, Protocol
+from ..core.config import settings
+
+# Báo cáo mẫu của backend stub: đủ các mục mà prompt yêu cầu, có sẵn vài ký tự lạ để _sanitize_markdown xử lý
+STUB_REPORT = """```markdown
+## PHÂN TÍCH DOANH THU
+- **Kỳ báo cáo:** (stub)
+
+## CHỈ SỐ CHÍNH
+• Doanh thu ổn định so với kỳ trước.
+— Tỷ lệ thanh toán ở mức khá.
+
+## ĐIỂM MẠNH
+-   Phần lớn hóa đơn được thanh toán đúng hạn.
+
+---
+
+## VẤN ĐỀ CẦN LƯU Ý
+– Một số hóa đơn còn tồn đọng.
+
+
+
+## KHUYẾN NGHỊ
+- Nhắc thanh toán trước hạn 3 ngày.
+- Theo dõi hợp đồng sắp hết hạn.
+```"""
+
+
+class LLMTimeoutError(TimeoutError):
+    pass
+
+
+class LLMBackend(Protocol):
+    """Backend sinh văn bản. `generate` chạy đồng bộ và phải tự tôn trọng `timeout` (giây)."""
+
+    name: str
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        ...
+
+
+class GeminiBackend:
+    def __init__(self, api_key: str, model_name: str):
+        # Import SDK khi thực sự dùng Gemini (stub / benchmark không cần cài)
+        import google.generativeai as genai
+        from google.api_core.exceptions import DeadlineExceeded
+
+        genai.configure(api_key=api_key)
+        self.name = f"gemini:{model_name}"
+        self._model = genai.GenerativeModel(model_name)
+        self._deadline_exceeded = DeadlineExceeded
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        try:
+            response = self._model.generate_content(prompt, request_options={"timeout": timeout})
+        except self._deadline_exceeded as e:
+            raise LLMTimeoutError(str(e)) from e
+        return response.text
+
+
+class StubBackend:
+    """Trả báo cáo cố định sau `latency` giây: chạy offline, tải thử, benchmark trong CI."""
+
+    def __init__(self, latency: float = 0.0, text: str = STUB_REPORT):
+        self.name = "stub"
+        self.latency = latency
+        self.text = text
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        if self.latency > timeout:
+            time.sleep(timeout)
+            raise LLMTimeoutError(f"LLM call exceeded {timeout:.3g}s")
+        time.sleep(self.latency)
+        return self.text
+
+
+class LimitedBackend:
+    """Bọc một backend: giới hạn số lời gọi đồng thời (semaphore dùng chung) và timeout mỗi lần gọi.
+
+    Thời gian chờ semaphore tính vào timeout; hết thời gian mà chưa tới lượt thì raise LLMTimeoutError.
+    """
+
+    def __init__(self, backend: LLMBackend, max_concurrency: int, timeout: float):
+        self.backend = backend
+        self.name = backend.name
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.calls = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        if not self._semaphore.acquire(timeout=timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise LLMTimeoutError(f"No LLM slot within {timeout:.3g}s")
+        with self._lock:
+            self._in_flight += 1
+            self.calls += 1
+        try:
+            return self.backend.generate(prompt, timeout=max(deadline - time.monotonic(), 0.001))
+        except TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "max_concurrency": self.max_concurrency,
+                "timeout_s": self.timeout,
+                "in_flight": self._in_flight,
+                "calls": self.calls,
+                "timeouts": self.timeouts,
+                "errors": self.errors,
+            }
+
+
+def build_backend() -> LimitedBackend:
+    """Backend theo cấu hình (llm_backend = gemini | stub), đã bọc giới hạn đồng thời + timeout."""
+    if settings.llm_backend == "stub":
+        backend: LLMBackend = StubBackend(latency=settings.llm_stub_latency_seconds)
+    elif settings.llm_backend == "gemini":
+        backend = GeminiBackend(api_key=settings.gemini_api_key, model_name=settings.gemini_model)
+    else:
+        raise ValueError(f"Unknown llm_backend: {settings.llm_backend}")
+    return LimitedBackend(backend, max_concurrency=settings.llm_max_concurrency, timeout=settings.llm_timeout_seconds)
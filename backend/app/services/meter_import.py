@@ -0,0 +1,100 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Dict, Optional, Tuple, Union
+from ..crud.meter_reading import MeterReading
+
+# Số dòng mỗi lần ghi xuống DB (một executemany + commit)
+CHUNK_SIZE = 500
+
+CSV_TYPES = {"text/csv", "application/csv"}
+JSONL_TYPES = {"application/x-ndjson", "application/jsonl", "application/x-jsonlines", "application/json-lines"}
+
+
+def detect_format(content_type: Optional[str], explicit: Optional[str] = None) -> Optional[str]:
+    if explicit:
+        return explicit
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in CSV_TYPES:
+        return "csv"
+    if media_type in JSONL_TYPES:
+        return "jsonl"
+    return None
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Tách body thành từng dòng khi dữ liệu tới, không giữ cả file trong bộ nhớ."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+def _number(value, field: str, required: bool) -> Optional[float]:
+    if value is None or (isinstance(value, str) and value.strip() == ""):
+        if required:
+            raise ValueError(f"Thiếu {field}")
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} không phải là số")
+    if number < 0:
+        raise ValueError(f"{field} không được âm")
+    return number
+
+
+def _integer(value) -> Optional[int]:
+    if value is None or (isinstance(value, str) and value.strip() == ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Mã không hợp lệ: {value}")
+
+
+def to_reading(line: int, record: Dict[str, object]) -> MeterReading:
+    """Kiểm tra một bản ghi: cần invoice_id hoặc (rr_id, month) và electricity_num."""
+    invoice_id = _integer(record.get("invoice_id"))
+    rr_id = _integer(record.get("rr_id"))
+    month = (str(record.get("month") or "").strip()) or None
+    if invoice_id is None and (rr_id is None or month is None):
+        raise ValueError("Cần invoice_id hoặc rr_id + month (YYYY-MM)")
+    return MeterReading(
+        line=line,
+        invoice_id=invoice_id,
+        rr_id=rr_id,
+        month=month,
+        electricity_num=_number(record.get("electricity_num"), "electricity_num", required=True),
+        water_num=_number(record.get("water_num"), "water_num", required=False),
+    )
+
+
+async def iter_readings(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Tuple[int, Union[MeterReading, str]]]:
+    """Sinh (số dòng, MeterReading | thông báo lỗi) cho từng dòng dữ liệu."""
+    header = None
+    line_no = 0
+    async for line in iter_lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            if fmt == "csv":
+                values = next(csv.reader([line]))
+                if header is None:
+                    header = [h.strip().lower() for h in values]
+                    continue
+                record = dict(zip(header, values))
+            else:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("Mỗi dòng phải là một JSON object")
+            yield line_no, to_reading(line_no, record)
+        except (ValueError, TypeError) as e:
+            yield line_no, str(e)
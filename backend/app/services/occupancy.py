@@ -0,0 +1,214 @@
+from array import array
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.concurrency import run_in_threadpool
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..crud import collection_version
+from ..models.room import Room
+from ..models.rented_room import RentedRoom
+
+occupancy_cache = TTLCache(ttl=settings.occupancy_cache_ttl_seconds, max_entries=settings.occupancy_cache_max_entries)
+
+
+@dataclass
+class Intervals:
+    """Khoảng thuê đã gộp theo phòng, lưu dạng mảng song song (ngày = date.toordinal(), cuối khoảng không tính).
+
+    - house_ids / room_start: nhà trọ và ngày bắt đầu tồn tại của từng phòng
+    - room_index / starts / ends: khoảng có người thuê, đã gộp các hợp đồng chồng lấn của cùng một phòng
+    """
+    house_ids: array
+    room_start: array
+    room_index: array
+    starts: array
+    ends: array
+
+
+def _day(value) -> Optional[int]:
+    if value is None:
+        return None
+    return (value.date() if isinstance(value, datetime) else value).toordinal()
+
+
+def _rooms_stmt(owner_id: int, house_id: Optional[int]):
+    stmt = select(Room.room_id, Room.house_id, Room.created_at).where(Room.owner_id == owner_id)
+    if house_id is not None:
+        stmt = stmt.where(Room.house_id == house_id)
+    return stmt
+
+
+def _contracts_stmt(owner_id: int, house_id: Optional[int]):
+    stmt = select(
+        RentedRoom.room_id, RentedRoom.start_date, RentedRoom.end_date, RentedRoom.is_active, RentedRoom.updated_at,
+    ).where(RentedRoom.owner_id == owner_id)
+    if house_id is not None:
+        stmt = stmt.join(Room, RentedRoom.room_id == Room.room_id).where(Room.house_id == house_id)
+    return stmt
+
+
+def _build_intervals(room_rows, contract_rows) -> Intervals:
+    """Chuyển kết quả truy vấn sang mảng gọn và gộp các khoảng thuê chồng lấn trên cùng phòng.
+
+    Hợp đồng đã chấm dứt (is_active = FALSE) kết thúc ở min(end_date, updated_at): terminate_rental
+    không lưu ngày chấm dứt, updated_at là lần ghi cuối cùng lên hợp đồng.
+    """
+    index: Dict[int, int] = {}
+    house_ids, room_start = array("l"), array("l")
+    for room_id, house_id, created_at in room_rows:
+        index[room_id] = len(house_ids)
+        house_ids.append(house_id)
+        room_start.append(_day(created_at) or 1)
+
+    spans: List[Tuple[int, int, int]] = []
+    for room_id, start_date, end_date, is_active, updated_at in contract_rows:
+        i = index.get(room_id)
+        if i is None:
+            continue
+        start, end = _day(start_date), _day(end_date)
+        if not is_active and updated_at is not None:
+            end = min(end, _day(updated_at))
+        if start < end:
+            spans.append((i, start, end))
+            # Phòng tồn tại ít nhất từ hợp đồng đầu tiên (dữ liệu nhập lại có created_at muộn hơn)
+            if start < room_start[i]:
+                room_start[i] = start
+    spans.sort()
+
+    room_index, starts, ends = array("l"), array("l"), array("l")
+    for i, start, end in spans:
+        if room_index and room_index[-1] == i and start <= ends[-1]:
+            if end > ends[-1]:
+                ends[-1] = end
+            continue
+        room_index.append(i)
+        starts.append(start)
+        ends.append(end)
+    return Intervals(house_ids, room_start, room_index, starts, ends)
+
+
+def load_intervals(db: Session, owner_id: int, house_id: Optional[int] = None) -> Intervals:
+    rooms = db.execute(_rooms_stmt(owner_id, house_id)).all()
+    contracts = db.execute(_contracts_stmt(owner_id, house_id).execution_options(yield_per=10000))
+    return _build_intervals(rooms, contracts)
+
+
+async def load_intervals_async(db: AsyncSession, owner_id: int, house_id: Optional[int] = None) -> Intervals:
+    rooms = (await db.execute(_rooms_stmt(owner_id, house_id))).all()
+    contracts = (await db.execute(_contracts_stmt(owner_id, house_id))).all()
+    return _build_intervals(rooms, contracts)
+
+
+def month_bounds(start_month: str, end_month: str) -> List[Tuple[str, int]]:
+    """[(YYYY-MM, ordinal ngày đầu tháng)] từ start_month tới end_month, thêm mốc ngày đầu tháng kế tiếp."""
+    year, month = map(int, start_month.split("-"))
+    last = tuple(map(int, end_month.split("-")))
+    bounds = []
+    while (year, month) <= last:
+        bounds.append((f"{year:04d}-{month:02d}", date(year, month, 1).toordinal()))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    bounds.append(("", date(year, month, 1).toordinal()))
+    return bounds
+
+
+def _monthly_sums(events: Dict[int, int], offsets: List[int]) -> List[int]:
+    """Quét các mốc thay đổi số phòng (ngày -> +/-) đã sắp xếp cùng các mốc tháng.
+
+    Giữa hai mốc liên tiếp số phòng không đổi nên chỉ cần cộng số phòng * số ngày của đoạn;
+    chi phí theo số mốc, không theo số ngày trong khoảng báo cáo.
+    """
+    days = sorted(events)
+    sums, j, level, pos, acc, prev = [], 0, 0, offsets[0], 0, 0
+    for boundary in offsets[1:]:
+        while j < len(days) and days[j] < boundary:
+            acc += level * (days[j] - pos)
+            pos = days[j]
+            level += events[pos]
+            j += 1
+        acc += level * (boundary - pos)
+        pos = boundary
+        sums.append(acc - prev)
+        prev = acc
+    return sums
+
+
+def _series(occupied: List[int], room_days: List[int]) -> Dict[str, list]:
+    return {
+        "occupied_room_days": occupied,
+        "room_days": room_days,
+        "occupancy_rate": [round(o / d * 100, 2) if d else 0 for o, d in zip(occupied, room_days)],
+    }
+
+
+def occupancy_series(intervals: Intervals, start_month: str, end_month: str) -> Dict[str, object]:
+    """Số ngày-phòng có người thuê / tồn tại theo tháng, cho từng nhà trọ và toàn bộ.
+
+    Mỗi khoảng [start, end) chỉ ghi +1 / -1 vào các mốc thay đổi (thưa, theo ngày) của nhà trọ tương ứng,
+    nên chi phí là O(số khoảng * log + số nhà trọ * số tháng) thay vì một truy vấn cho mỗi tháng.
+    """
+    bounds = month_bounds(start_month, end_month)
+    months = [m for m, _ in bounds[:-1]]
+    first, stop = bounds[0][1], bounds[-1][1]
+    offsets = [day for _, day in bounds]
+
+    houses = sorted(set(intervals.house_ids))
+    slot = {house_id: n for n, house_id in enumerate(houses)}
+    occupied: List[Dict[int, int]] = [{} for _ in houses]
+    existing: List[Dict[int, int]] = [{} for _ in houses]
+
+    for i, start in enumerate(intervals.room_start):
+        if start < stop:
+            events = existing[slot[intervals.house_ids[i]]]
+            day = max(start, first)
+            events[day] = events.get(day, 0) + 1
+    house_ids = intervals.house_ids
+    for i, start, end in zip(intervals.room_index, intervals.starts, intervals.ends):
+        if end <= first or start >= stop:
+            continue
+        events = occupied[slot[house_ids[i]]]
+        start, end = max(start, first), min(end, stop)
+        events[start] = events.get(start, 0) + 1
+        events[end] = events.get(end, 0) - 1
+
+    total_occupied = [0] * len(months)
+    total_days = [0] * len(months)
+    per_house = []
+    for n, house_id in enumerate(houses):
+        occ = _monthly_sums(occupied[n], offsets)
+        ex = _monthly_sums(existing[n], offsets)
+        total_occupied = [a + b for a, b in zip(total_occupied, occ)]
+        total_days = [a + b for a, b in zip(total_days, ex)]
+        per_house.append({"house_id": house_id, **_series(occ, ex)})
+
+    return {
+        "start_month": start_month,
+        "end_month": end_month,
+        "months": months,
+        "total": _series(total_occupied, total_days),
+        "houses": per_house,
+    }
+
+
+async def get_occupancy_async(
+    db: AsyncSession, owner_id: int, start_month: str, end_month: str, house_id: Optional[int] = None,
+) -> Dict[str, object]:
+    """occupancy_series có cache theo chủ nhà.
+
+    Khóa cache gồm phiên bản houses/rooms/rented_rooms của chủ nhà nên mọi thao tác ghi làm mất hiệu lực
+    ngay; chỉ tốn một truy vấn theo khóa chính khi trúng cache. Vòng quét chạy trên threadpool.
+    """
+    versions = await collection_version.get_versions_async(
+        db, owner_id, (collection_version.HOUSES, collection_version.ROOMS, collection_version.RENTED_ROOMS)
+    )
+    key = (owner_id, house_id, start_month, end_month, tuple(sorted(versions.items())))
+    cached = occupancy_cache.get(key)
+    if cached is not None:
+        return cached
+    intervals = await load_intervals_async(db, owner_id, house_id)
+    result = await run_in_threadpool(occupancy_series, intervals, start_month, end_month)
+    occupancy_cache.set(key, result)
+    return result
@@ -0,0 +1,259 @@
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, func, case, and_, or_, extract
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.invoice import Invoice
+from ..models.revenue_rollup import RevenueRollup
+from ..models.rented_room import RentedRoom
+from ..models.room import Room
+from ..crud.revenue_rollup import month_key, month_start, next_month_start
+
+
+@dataclass(frozen=True)
+class RevenueStats:
+    """Kết quả thống kê doanh thu dùng chung cho /reports và AIService."""
+    total_revenue: float
+    paid_invoices: int
+    pending_invoices: int
+    avg_monthly_revenue: float
+
+    @property
+    def total_invoices(self) -> int:
+        return self.paid_invoices + self.pending_invoices
+
+    @property
+    def payment_rate(self) -> float:
+        return (self.paid_invoices / self.total_invoices * 100) if self.total_invoices > 0 else 0
+
+    @property
+    def avg_invoice_value(self) -> float:
+        return (self.total_revenue / self.total_invoices) if self.total_invoices > 0 else 0
+
+
+# (lo, hi, hi_inclusive) - mỗi đoạn nằm trọn trong một tháng
+Segment = Tuple[datetime, datetime, bool]
+
+
+def _split_range(start: datetime, end: datetime) -> Tuple[datetime, datetime, List[Segment]]:
+    """Chia [start, end] thành các tháng trọn vẹn [first_full, last_partial) và các đoạn lẻ đầu/cuối."""
+    first_full = start if start == month_start(start) else next_month_start(start)
+    last_partial = month_start(end)
+    segments: List[Segment] = []
+    if start < first_full:
+        segments.append((start, min(first_full, end), first_full > end))
+    if last_partial >= first_full:
+        segments.append((last_partial, end, True))
+    return first_full, last_partial, segments
+
+
+def _rollup_stmt(owner_id: int, first_full: datetime, last_partial: datetime):
+    return (
+        select(
+            RevenueRollup.month,
+            func.sum(RevenueRollup.paid_total),
+            func.sum(RevenueRollup.paid_count),
+            func.sum(RevenueRollup.pending_count),
+        )
+        .where(
+            RevenueRollup.owner_id == owner_id,
+            RevenueRollup.month >= month_key(first_full),
+            RevenueRollup.month < month_key(last_partial),
+        )
+        .group_by(RevenueRollup.month)
+    )
+
+
+def _segment_stmt(owner_id: int, segments: List[Segment]):
+    """Một lần quét invoices cho mọi đoạn lẻ, dùng tổng hợp có điều kiện (SUM(CASE ...))."""
+    total_expr = (
+        Invoice.price + Invoice.water_price + Invoice.internet_price + Invoice.general_price + Invoice.electricity_price
+    )
+    columns = []
+    conditions = []
+    for lo, hi, inclusive in segments:
+        def in_range(col):
+            return and_(col >= lo, col <= hi) if inclusive else and_(col >= lo, col < hi)
+
+        paid_cond = and_(Invoice.is_paid == True, in_range(Invoice.payment_date))
+        pending_cond = and_(Invoice.is_paid == False, in_range(Invoice.due_date))
+        columns += [
+            func.sum(case((paid_cond, total_expr), else_=0)),
+            func.sum(case((paid_cond, 1), else_=0)),
+            func.sum(case((pending_cond, 1), else_=0)),
+        ]
+        conditions += [paid_cond, pending_cond]
+
+    return select(*columns).where(Invoice.owner_id == owner_id, or_(*conditions))
+
+
+def _revenue_queries(owner_id: int, start_date: date, end_date: date):
+    """Lập các câu truy vấn cần chạy: (rollup_stmt | None, segments, segment_stmt | None)."""
+    start = datetime.combine(start_date, time.min)
+    end = datetime.combine(end_date, time.min)
+    if start > end:
+        return None, [], None
+    first_full, last_partial, segments = _split_range(start, end)
+    rollup_stmt = _rollup_stmt(owner_id, first_full, last_partial) if first_full < last_partial else None
+    segment_stmt = _segment_stmt(owner_id, segments) if segments else None
+    return rollup_stmt, segments, segment_stmt
+
+
+def _build_stats(rollup_rows, segments: List[Segment], segment_row) -> RevenueStats:
+    monthly: Dict[str, List[float]] = {
+        month: [float(paid_total or 0), int(paid_count or 0), int(pending_count or 0)]
+        for month, paid_total, paid_count, pending_count in rollup_rows
+    }
+    if segment_row is not None:
+        for i, (lo, _, _) in enumerate(segments):
+            paid_total, paid_count, pending_count = segment_row[i * 3:i * 3 + 3]
+            m = monthly.setdefault(month_key(lo), [0.0, 0, 0])
+            m[0] += float(paid_total or 0)
+            m[1] += int(paid_count or 0)
+            m[2] += int(pending_count or 0)
+
+    paid_months = [m[0] for m in monthly.values() if m[1] > 0]
+    return RevenueStats(
+        total_revenue=float(sum(m[0] for m in monthly.values())),
+        paid_invoices=int(sum(m[1] for m in monthly.values())),
+        pending_invoices=int(sum(m[2] for m in monthly.values())),
+        avg_monthly_revenue=float(sum(paid_months) / len(paid_months)) if paid_months else 0.0,
+    )
+
+
+def compute_revenue_stats(db: Session, owner_id: int, start_date: date, end_date: date) -> RevenueStats:
+    """Thống kê doanh thu của chủ nhà trong [start_date, end_date].
+
+    - Tháng trọn vẹn: đọc từ revenue_rollups (1 truy vấn)
+    - Tháng lẻ đầu/cuối: 1 lần quét invoices có điều kiện
+    Hóa đơn đã thanh toán tính theo payment_date, chưa thanh toán theo due_date.
+    """
+    rollup_stmt, segments, segment_stmt = _revenue_queries(owner_id, start_date, end_date)
+    rollup_rows = db.execute(rollup_stmt).all() if rollup_stmt is not None else []
+    segment_row = db.execute(segment_stmt).one() if segment_stmt is not None else None
+    return _build_stats(rollup_rows, segments, segment_row)
+
+
+async def compute_revenue_stats_async(db: AsyncSession, owner_id: int, start_date: date, end_date: date) -> RevenueStats:
+    """Như compute_revenue_stats nhưng chạy trên AsyncSession (không chặn event loop)."""
+    rollup_stmt, segments, segment_stmt = _revenue_queries(owner_id, start_date, end_date)
+    rollup_rows = (await db.execute(rollup_stmt)).all() if rollup_stmt is not None else []
+    segment_row = (await db.execute(segment_stmt)).one() if segment_stmt is not None else None
+    return _build_stats(rollup_rows, segments, segment_row)
+
+
+# Các cột của chuỗi doanh thu, theo thứ tự trong câu truy vấn gom nhóm
+SERIES_FIELDS = ("paid_amount", "pending_amount", "paid_count", "pending_count")
+
+
+def month_range(start_month: str, end_month: str) -> List[str]:
+    """Các tháng YYYY-MM từ start_month tới end_month (gồm cả hai đầu)."""
+    months = []
+    current = datetime.strptime(start_month, "%Y-%m")
+    last = datetime.strptime(end_month, "%Y-%m")
+    while current <= last:
+        months.append(month_key(current))
+        current = next_month_start(current)
+    return months
+
+
+def _series_stmt(owner_id: int, start: datetime, end: datetime, by_room: bool, house_id: Optional[int]):
+    """Một câu GROUP BY (năm, tháng, nhà trọ[, phòng]) trên invoices, chỉ trả các cột đã cộng.
+
+    Cùng quy ước với revenue_rollups: đã thanh toán tính theo tháng payment_date,
+    chưa thanh toán theo tháng due_date. extract() biên dịch được cho cả MySQL và SQLite.
+    """
+    total_expr = (
+        Invoice.price + Invoice.water_price + Invoice.internet_price + Invoice.general_price + Invoice.electricity_price
+    )
+    paid = Invoice.is_paid == True
+    bucket = case((paid, Invoice.payment_date), else_=Invoice.due_date)
+    year, month = extract("year", bucket).label("year"), extract("month", bucket).label("month")
+    keys = [year, month, Room.house_id] + ([Room.room_id] if by_room else [])
+    stmt = (
+        select(
+            *keys,
+            func.sum(case((paid, total_expr), else_=0)),
+            func.sum(case((Invoice.is_paid == False, total_expr), else_=0)),
+            func.sum(case((paid, 1), else_=0)),
+            func.sum(case((Invoice.is_paid == False, 1), else_=0)),
+        )
+        .select_from(Invoice)
+        .join(RentedRoom, Invoice.rr_id == RentedRoom.rr_id)
+        .join(Room, RentedRoom.room_id == Room.room_id)
+        .where(
+            Invoice.owner_id == owner_id,
+            or_(
+                and_(paid, Invoice.payment_date >= start, Invoice.payment_date < end),
+                and_(Invoice.is_paid == False, Invoice.due_date >= start, Invoice.due_date < end),
+            ),
+        )
+        .group_by(*keys)
+    )
+    if house_id is not None:
+        stmt = stmt.where(Room.house_id == house_id)
+    return stmt
+
+
+def _series_query(owner_id: int, start_month: str, end_month: str, by_room: bool, house_id: Optional[int]):
+    start = datetime.strptime(start_month, "%Y-%m")
+    end = next_month_start(datetime.strptime(end_month, "%Y-%m"))
+    return _series_stmt(owner_id, start, end, by_room, house_id)
+
+
+def _build_series(rows, months: List[str], by_room: bool) -> Dict[str, object]:
+    """Xếp các dòng (năm, tháng, nhà[, phòng], tổng...) thành mảng theo tháng cho mỗi nhóm.
+
+    Tháng không có hóa đơn mang giá trị 0, nên mọi mảng cùng độ dài với `months`.
+    """
+    slot = {month: i for i, month in enumerate(months)}
+    width = 4 if by_room else 3
+    groups: Dict[Tuple[int, ...], Dict[str, list]] = {}
+    total = {field: [0] * len(months) for field in SERIES_FIELDS}
+    for row in rows:
+        i = slot.get(f"{int(row[0]):04d}-{int(row[1]):02d}")
+        if i is None:
+            continue
+        key = tuple(row[2:width])
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {field: [0] * len(months) for field in SERIES_FIELDS}
+        for field, value in zip(SERIES_FIELDS, row[width:]):
+            value = float(value or 0) if field.endswith("amount") else int(value or 0)
+            group[field][i] += value
+            total[field][i] += value
+
+    def finish(series: Dict[str, list]) -> Dict[str, list]:
+        series["total_amount"] = [p + q for p, q in zip(series["paid_amount"], series["pending_amount"])]
+        series["invoice_count"] = [p + q for p, q in zip(series["paid_count"], series["pending_count"])]
+        return series
+
+    key_names = ("house_id", "room_id") if by_room else ("house_id",)
+    return {
+        "months": months,
+        "group_by": "room" if by_room else "house",
+        "total": finish(total),
+        "series": [
+            {**dict(zip(key_names, key)), **finish(groups[key])}
+            for key in sorted(groups)
+        ],
+    }
+
+
+def compute_revenue_series(
+    db: Session, owner_id: int, start_month: str, end_month: str, by_room: bool = False, house_id: Optional[int] = None,
+) -> Dict[str, object]:
+    """Doanh thu đã thu / còn chờ và số hóa đơn theo tháng x nhà trọ (x phòng).
+
+    Một truy vấn gom nhóm trả về tối đa (số tháng x số nhóm) dòng; không hydrate ORM.
+    """
+    rows = db.execute(_series_query(owner_id, start_month, end_month, by_room, house_id)).all()
+    return _build_series(rows, month_range(start_month, end_month), by_room)
+
+
+async def compute_revenue_series_async(
+    db: AsyncSession, owner_id: int, start_month: str, end_month: str, by_room: bool = False, house_id: Optional[int] = None,
+) -> Dict[str, object]:
+    rows = (await db.execute(_series_query(owner_id, start_month, end_month, by_room, house_id))).all()
+    return _build_series(rows, month_range(start_month, end_month), by_room)
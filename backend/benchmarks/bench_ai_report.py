@@ -0,0 +1,114 @@
+"""Pipeline báo cáo AI chạy offline với backend stub (không gọi mạng, chạy được trong CI).
+
+- sanitize: thông lượng AIService._sanitize_markdown trên văn bản cỡ báo cáo thật và cỡ lớn
+- pipeline: nhiều job cùng lúc qua ReportJobQueue -> thống kê DB -> prompt -> LLM stub (độ trễ cố định)
+  -> sanitize, với các mức giới hạn đồng thời khác nhau của LimitedBackend
+
+Cách chạy (từ thư mục backend):
+    python -m benchmarks.bench_ai_report --jobs 40 --latency 0.2 --concurrency 1 4 8
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.common import setup_env, percentile, print_table, time_calls
+
+
+def bench_sanitize(service, repeat: int):
+    from app.services.llm import STUB_REPORT
+
+    rows = []
+    for copies in (1, 50):
+        text = "\n".join([STUB_REPORT] * copies)
+        timing = time_calls(lambda: service._sanitize_markdown(text), repeat)
+        rows.append({
+            "input_kb": len(text.encode()) / 1024,
+            "mean_us": timing["mean_ms"] * 1000,
+            "p99_us": timing["p99_ms"] * 1000,
+            "mb_per_s": len(text.encode()) / (timing["mean_ms"] / 1000) / (1024 * 1024),
+        })
+    return rows
+
+
+async def run_pipeline(concurrency: int, jobs: int, latency: float, owners: int, timeout: float):
+    from app.services import ai_jobs
+    from app.services.ai_service import AIService
+    from app.services.llm import LimitedBackend, StubBackend
+
+    llm = LimitedBackend(StubBackend(latency=latency), max_concurrency=concurrency, timeout=timeout)
+    service = AIService(llm=llm)
+    # Hàng đợi đủ rộng để nhận hết job; giới hạn thực sự nằm ở semaphore của LLM
+    queue = ai_jobs.ReportJobQueue(
+        generate=service.create_revenue_report,
+        workers=max(concurrency, 16),
+        max_queue=jobs,
+        timeout=timeout,
+        job_ttl=600,
+    )
+
+    t0 = time.perf_counter()
+    submitted = [
+        queue.submit(owner_id=i % owners + 1, start_date="2022-01-01", end_date=f"2023-{i % 12 + 1:02d}-28", force_refresh=True)
+        for i in range(jobs)
+    ]
+    done = await asyncio.gather(*(queue.wait(job) for job in submitted))
+    elapsed = time.perf_counter() - t0
+
+    latencies = [(job.finished_at - job.created_at).total_seconds() * 1000 for job in done]
+    statuses = {}
+    for job in done:
+        statuses[job.status] = statuses.get(job.status, 0) + 1
+    return {
+        "llm_concurrency": concurrency,
+        "jobs": jobs,
+        "ok": statuses.get(ai_jobs.SUCCEEDED, 0),
+        "timeout": statuses.get(ai_jobs.TIMEOUT, 0),
+        "failed": statuses.get(ai_jobs.FAILED, 0),
+        "jobs_per_s": jobs / elapsed,
+        "mean_ms": statistics.fmean(latencies),
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+        "llm_calls": llm.stats()["calls"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="Mặc định: file SQLite tạm")
+    parser.add_argument("--owners", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.2, help="Độ trễ mỗi lời gọi LLM stub (giây)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--repeat", type=int, default=200, help="Số lần đo sanitize")
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_ai.db')}"
+    setup_env(url)
+    os.environ["LLM_BACKEND"] = "stub"
+
+    from app.core.database import engine, SessionLocal
+    from app.crud.revenue_rollup import rebuild_revenue_rollups
+    from app.services.ai_service import AIService
+    from benchmarks.seed import seed_dataset
+
+    seed_dataset(engine, owners=args.owners, houses_per_owner=2, rooms_per_house=10, invoices_per_contract=12)
+    with SessionLocal() as db:
+        rebuild_revenue_rollups(db)
+
+    print("== _sanitize_markdown ==")
+    print_table(bench_sanitize(AIService(), args.repeat))
+
+    print(f"\n== pipeline ({args.jobs} job, LLM stub {args.latency:g}s) ==")
+    rows = [
+        asyncio.run(run_pipeline(c, args.jobs, args.latency, args.owners, args.timeout))
+        for c in args.concurrency
+    ]
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
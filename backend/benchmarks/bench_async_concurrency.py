@@ -0,0 +1,145 @@
+"""Thông lượng khi nhiều request đồng thời: async def + Session sync (cũ) vs AsyncSession (mới).
+
+Mỗi request chạy compute_revenue_stats cộng thêm một câu `SELECT bench_latency(:ms)` để giả lập
+độ trễ mạng tới MySQL. Với Session sync, độ trễ này nằm ngay trên event loop nên mọi request
+khác phải chờ; với AsyncSession (aiosqlite/aiomysql) event loop vẫn phục vụ request khác.
+
+Lưu ý: khi concurrency vượt pool sync (mặc định 5 + 10 overflow), mẫu cũ còn kẹt cả event loop
+trong QueuePool.get cho tới pool_timeout (connection chỉ được trả khi loop chạy tiếp) - các
+request đó được đếm ở cột errors.
+
+Cách chạy (từ thư mục backend):
+    python -m benchmarks.bench_async_concurrency --concurrency 12 --requests 240 --latency-ms 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import date
+
+from benchmarks.common import setup_env, percentile, print_table
+
+
+def _sleep_ms(ms):
+    time.sleep(ms / 1000)
+    return 0
+
+
+def register_latency(engine):
+    """Hàm SQL bench_latency(ms) chạy bên trong driver (luồng của aiosqlite với engine async)."""
+    from sqlalchemy import event
+
+    engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _):
+        dbapi_conn.create_function("bench_latency", 1, _sleep_ms)
+
+
+def build_app(start: date, end: date, latency_ms: int):
+    from fastapi import FastAPI, Depends
+    from sqlalchemy import text
+    from sqlalchemy.orm import Session
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from app.core.database import get_db, get_async_db
+    from app.services.reporting import compute_revenue_stats, compute_revenue_stats_async
+
+    app = FastAPI()
+    latency = text("SELECT bench_latency(:ms)")
+
+    # Mẫu cũ: async def nhưng truy vấn qua Session sync -> chặn event loop
+    @app.get("/blocking")
+    async def blocking(db: Session = Depends(get_db)):
+        db.execute(latency, {"ms": latency_ms})
+        return compute_revenue_stats(db, owner_id=1, start_date=start, end_date=end).total_revenue
+
+    @app.get("/async")
+    async def non_blocking(db: AsyncSession = Depends(get_async_db)):
+        await db.execute(latency, {"ms": latency_ms})
+        stats = await compute_revenue_stats_async(db, owner_id=1, start_date=start, end_date=end)
+        return stats.total_revenue
+
+    return app
+
+
+async def run_load(app, path: str, total: int, concurrency: int):
+    import httpx
+
+    samples = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://bench") as client:
+        await client.get(path)  # làm nóng pool
+
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                queue.get_nowait()
+                t0 = time.perf_counter()
+                r = await client.get(path)
+                if r.status_code != 200:
+                    errors += 1
+                    continue
+                samples.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    return {
+        "route": path,
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "req_per_s": total / elapsed,
+        "mean_ms": statistics.fmean(samples) if samples else 0.0,
+        "p50_ms": percentile(samples, 50),
+        "p95_ms": percentile(samples, 95),
+        "p99_ms": percentile(samples, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="Mặc định: file SQLite tạm")
+    parser.add_argument("--concurrency", type=int, default=12)
+    parser.add_argument("--requests", type=int, default=240)
+    parser.add_argument("--latency-ms", type=int, default=20, help="Độ trễ giả lập mỗi request (chỉ SQLite)")
+    parser.add_argument("--invoices-per-contract", type=int, default=12)
+    parser.add_argument("--start-date", default="2023-03-15")
+    parser.add_argument("--end-date", default="2024-08-20")
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_async.db')}"
+    setup_env(url)
+
+    from app.core.database import engine, async_engine, SessionLocal
+    from app.crud.revenue_rollup import rebuild_revenue_rollups
+    from benchmarks.seed import seed_dataset
+
+    register_latency(engine)
+    register_latency(async_engine)
+    counts = seed_dataset(engine, invoices_per_contract=args.invoices_per_contract)
+    print(f"Seeded: {counts}")
+    with SessionLocal() as db:
+        rebuild_revenue_rollups(db)
+
+    app = build_app(date.fromisoformat(args.start_date), date.fromisoformat(args.end_date), args.latency_ms)
+
+    async def run_all():
+        rows = [await run_load(app, path, args.requests, args.concurrency) for path in ("/blocking", "/async")]
+        await async_engine.dispose()
+        return rows
+
+    rows = asyncio.run(run_all())
+    print_table(rows)
+    print(f"Speedup: {rows[1]['req_per_s'] / rows[0]['req_per_s']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
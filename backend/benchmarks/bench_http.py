@@ -0,0 +1,390 @@
+"""Benchmark HTTP đầu-cuối cho API v2: thông lượng và p50/p95/p99 theo route dưới một tổ hợp tải thực tế.
+
+Dữ liệu: generate_dataset (cố định theo --seed) trên CSDL tạm, migration bằng manage_db create.
+Server: `uvicorn app.main:app` (--server uvicorn, mặc định), app chạy trong tiến trình qua
+ASGITransport (--server inprocess, không cần uvicorn), hoặc server có sẵn (--base-url, dữ liệu
+đã sinh bằng generate_dataset.py với cùng --password).
+
+Mỗi người dùng ảo thuộc một chủ nhà, đăng nhập rồi lặp lại các thao tác chọn theo trọng số --mix:
+- login: POST /auth/login
+- dashboard: GET /reports/system-overview
+- invoices: GET /invoices với bộ lọc ngẫu nhiên (tháng, nhà trọ, trạng thái thanh toán)
+- pay: POST /invoices/{id}/pay trên một nhóm nhỏ hóa đơn "nóng" (tranh chấp cùng dòng)
+- contract: POST /rented-rooms rồi POST /rented-rooms/{id}/terminate trên phòng trống
+
+Kết quả ghi ra JSON (--output) kèm commit, tham số và môi trường; --compare in chênh lệch
+so với một file kết quả trước đó.
+
+Cách chạy (từ thư mục backend):
+    python -m benchmarks.bench_http --users 32 --duration 30 --workers 4 --output bench_http.json
+    python -m benchmarks.bench_http --server inprocess --duration 10
+    python -m benchmarks.bench_http --compare bench_http_old.json --output bench_http.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from benchmarks.common import setup_env, percentile, print_table
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API = "/api/v2"
+PASSWORD = "owner123"
+DEFAULT_MIX = "login=2,dashboard=40,invoices=35,pay=13,contract=10"
+
+
+class Recorder:
+    """Độ trễ (ms) và mã trạng thái theo route; chỉ ghi sau khi hết thời gian khởi động."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+        self.active = False
+
+    def add(self, route: str, elapsed_ms: float, status: str):
+        if not self.active:
+            return
+        self.samples.setdefault(route, []).append(elapsed_ms)
+        counts = self.statuses.setdefault(route, {})
+        counts[status] = counts.get(status, 0) + 1
+
+    def summary(self, elapsed: float) -> Dict[str, dict]:
+        routes = {}
+        for route in sorted(self.samples):
+            samples = self.samples[route]
+            statuses = self.statuses[route]
+            routes[route] = {
+                "requests": len(samples),
+                "errors": sum(n for s, n in statuses.items() if not s.startswith(("2", "3"))),
+                "rps": len(samples) / elapsed,
+                "mean_ms": statistics.fmean(samples),
+                "p50_ms": percentile(samples, 50),
+                "p95_ms": percentile(samples, 95),
+                "p99_ms": percentile(samples, 99),
+                "max_ms": max(samples),
+                "statuses": dict(sorted(statuses.items())),
+            }
+        return routes
+
+
+class Context:
+    """Dữ liệu khám phá qua API trước khi chạy tải, theo chủ nhà."""
+
+    def __init__(self):
+        self.houses: Dict[int, List[int]] = {}
+        self.months: Dict[int, List[str]] = {}
+        self.hot_invoices: Dict[int, List[int]] = {}
+        self.vacant_rooms: Dict[int, List[dict]] = {}
+
+
+async def timed(client, recorder: Recorder, route: str, method: str, url: str, **kwargs):
+    t0 = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except Exception as e:  # lỗi kết nối / timeout vẫn tính vào route
+        recorder.add(route, (time.perf_counter() - t0) * 1000, type(e).__name__)
+        return None
+    recorder.add(route, (time.perf_counter() - t0) * 1000, str(response.status_code))
+    return response
+
+
+async def login(client, recorder: Recorder, owner_id: int) -> Optional[dict]:
+    response = await timed(client, recorder, "POST /auth/login", "POST", f"{API}/auth/login",
+                           json={"email": f"owner{owner_id}@example.com", "password": PASSWORD})
+    if response is None or response.status_code != 200:
+        return None
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def op_login(client, recorder, ctx, rnd, owner_id, headers):
+    await login(client, recorder, owner_id)
+
+
+async def op_dashboard(client, recorder, ctx, rnd, owner_id, headers):
+    await timed(client, recorder, "GET /reports/system-overview", "GET", f"{API}/reports/system-overview", headers=headers)
+
+
+async def op_invoices(client, recorder, ctx, rnd, owner_id, headers):
+    params = {"limit": 50}
+    if ctx.months.get(owner_id) and rnd.random() < 0.6:
+        params["month"] = rnd.choice(ctx.months[owner_id])
+    if ctx.houses.get(owner_id) and rnd.random() < 0.5:
+        params["house_id"] = rnd.choice(ctx.houses[owner_id])
+    if rnd.random() < 0.5:
+        params["is_paid"] = rnd.random() < 0.5
+    await timed(client, recorder, "GET /invoices", "GET", f"{API}/invoices/", params=params, headers=headers)
+
+
+async def op_pay(client, recorder, ctx, rnd, owner_id, headers):
+    invoices = ctx.hot_invoices.get(owner_id)
+    if invoices:
+        await timed(client, recorder, "POST /invoices/{id}/pay", "POST",
+                    f"{API}/invoices/{rnd.choice(invoices)}/pay", headers=headers)
+
+
+async def op_contract(client, recorder, ctx, rnd, owner_id, headers):
+    rooms = ctx.vacant_rooms.get(owner_id)
+    if not rooms:
+        return
+    room = rooms.pop(rnd.randrange(len(rooms)))
+    try:
+        start = datetime.now().replace(microsecond=0)
+        response = await timed(client, recorder, "POST /rented-rooms", "POST", f"{API}/rented-rooms/", headers=headers, json={
+            "room_id": room["room_id"], "tenant_name": "Bench", "tenant_phone": f"09{rnd.randrange(10**8):08d}",
+            "number_of_tenants": 1, "start_date": start.isoformat(), "end_date": (start + timedelta(days=365)).isoformat(),
+            "monthly_rent": room["price"],
+        })
+        if response is not None and response.status_code == 200:
+            await timed(client, recorder, "POST /rented-rooms/{id}/terminate", "POST",
+                        f"{API}/rented-rooms/{response.json()['rr_id']}/terminate", headers=headers)
+    finally:
+        rooms.append(room)
+
+
+OPERATIONS = {
+    "login": op_login,
+    "dashboard": op_dashboard,
+    "invoices": op_invoices,
+    "pay": op_pay,
+    "contract": op_contract,
+}
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation {name!r}; expected one of {sorted(OPERATIONS)}")
+        mix[name.strip()] = int(weight or 1)
+    return mix
+
+
+async def discover(client, owners: int, hot_invoices: int) -> Context:
+    """Lấy nhà trọ, phòng trống, tháng có hóa đơn và nhóm hóa đơn chưa thanh toán cho từng chủ nhà qua API."""
+    ctx = Context()
+    ignore = Recorder()
+    for owner_id in range(1, owners + 1):
+        headers = await login(client, ignore, owner_id)
+        if headers is None:
+            raise SystemExit(f"Không đăng nhập được owner{owner_id}@example.com / {PASSWORD}")
+        houses = (await client.get(f"{API}/houses/", params={"limit": 1000}, headers=headers)).json()
+        ctx.houses[owner_id] = [h["house_id"] for h in houses]
+        rooms = (await client.get(f"{API}/rooms/available", params={"limit": 1000}, headers=headers)).json()
+        ctx.vacant_rooms[owner_id] = [{"room_id": r["room_id"], "price": r["price"]} for r in rooms]
+        invoices = (await client.get(f"{API}/invoices/", params={"limit": 500}, headers=headers)).json()
+        ctx.months[owner_id] = sorted({i["due_date"][:7] for i in invoices})
+        pending = (await client.get(f"{API}/invoices/", params={"is_paid": False, "limit": hot_invoices},
+                                    headers=headers)).json()
+        ctx.hot_invoices[owner_id] = [i["invoice_id"] for i in pending]
+    return ctx
+
+
+async def run_load(client, ctx: Context, args) -> Dict[str, object]:
+    recorder = Recorder()
+    names = list(args.mix)
+    weights = [args.mix[n] for n in names]
+    stop = asyncio.Event()
+
+    async def user(n: int):
+        rnd = random.Random(args.seed * 1000 + n)
+        owner_id = n % args.owners + 1
+        headers = await login(client, recorder, owner_id)
+        while not stop.is_set():
+            op = rnd.choices(names, weights)[0]
+            await OPERATIONS[op](client, recorder, ctx, rnd, owner_id, headers)
+
+    tasks = [asyncio.create_task(user(n)) for n in range(args.users)]
+    await asyncio.sleep(args.warmup)
+    recorder.active = True
+    t0 = time.perf_counter()
+    await asyncio.sleep(args.duration)
+    recorder.active = False
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    await asyncio.gather(*tasks)
+
+    routes = recorder.summary(elapsed)
+    all_samples = [s for samples in recorder.samples.values() for s in samples]
+    total = {
+        "requests": len(all_samples),
+        "errors": sum(r["errors"] for r in routes.values()),
+        "rps": len(all_samples) / elapsed,
+        "mean_ms": statistics.fmean(all_samples) if all_samples else 0.0,
+        "p50_ms": percentile(all_samples, 50),
+        "p95_ms": percentile(all_samples, 95),
+        "p99_ms": percentile(all_samples, 99),
+        "max_ms": max(all_samples, default=0.0),
+    }
+    return {"elapsed_s": elapsed, "total": total, "routes": routes}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@asynccontextmanager
+async def http_client(args):
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.users + 8, max_keepalive_connections=args.users + 8)
+    if args.server == "inprocess":
+        from app.main import app
+
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                         timeout=args.timeout) as client:
+                yield client
+        return
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        port = _free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=os.environ.copy(),
+        )
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+            deadline = time.monotonic() + 60
+            while True:
+                try:
+                    (await client.get("/")).raise_for_status()
+                    break
+                except httpx.HTTPError:
+                    if (server is not None and server.poll() is not None) or time.monotonic() > deadline:
+                        raise SystemExit(f"Server {base_url} không sẵn sàng")
+                    await asyncio.sleep(0.2)
+            yield client
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def seed(args):
+    from manage_db import create
+    from generate_dataset import generate_dataset
+    from app.core.database import engine, SessionLocal
+    from app.crud.revenue_rollup import rebuild_revenue_rollups
+    from app.crud.owner_kpi import rebuild_owner_kpis
+
+    create()
+    counts = generate_dataset(engine, owners=args.owners, houses_per_owner=args.houses_per_owner,
+                              rooms_per_house=args.rooms_per_house, contracts_per_room=args.contracts_per_room,
+                              invoices_per_contract=args.invoices_per_contract, seed=args.seed,
+                              vacant_ratio=0.2, password=PASSWORD)
+    with SessionLocal() as db:
+        rebuild_revenue_rollups(db)
+        rebuild_owner_kpis(db)
+    engine.dispose()
+    return counts
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous: dict, current: dict):
+    rows = []
+    for route, now in current["routes"].items():
+        before = previous.get("routes", {}).get(route)
+        if before is None:
+            continue
+        rows.append({
+            "route": route,
+            "rps_before": before["rps"], "rps_now": now["rps"],
+            "p95_before": before["p95_ms"], "p95_now": now["p95_ms"],
+            "p95_change_%": (now["p95_ms"] / before["p95_ms"] - 1) * 100 if before["p95_ms"] else 0.0,
+            "p99_before": before["p99_ms"], "p99_now": now["p99_ms"],
+        })
+    print(f"\nSo với {previous.get('meta', {}).get('commit')} ({previous.get('meta', {}).get('timestamp')}):")
+    print_table(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", choices=("uvicorn", "inprocess"), default="uvicorn")
+    parser.add_argument("--base-url", default=None, help="Server đang chạy (bỏ qua sinh dữ liệu và khởi động server)")
+    parser.add_argument("--database-url", default=None, help="CSDL trống; mặc định: file SQLite tạm")
+    parser.add_argument("--workers", type=int, default=1, help="Số worker uvicorn")
+    parser.add_argument("--users", type=int, default=16, help="Số người dùng ảo đồng thời")
+    parser.add_argument("--duration", type=float, default=20.0, help="Số giây đo")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Số giây chạy trước khi bắt đầu đo")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"Mặc định: {DEFAULT_MIX}")
+    parser.add_argument("--hot-invoices", type=int, default=10, help="Số hóa đơn bị tranh chấp thanh toán mỗi chủ nhà")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--owners", type=int, default=4)
+    parser.add_argument("--houses-per-owner", type=int, default=5)
+    parser.add_argument("--rooms-per-house", type=int, default=20)
+    parser.add_argument("--contracts-per-room", type=int, default=3)
+    parser.add_argument("--invoices-per-contract", type=int, default=12)
+    parser.add_argument("--output", default=None, help="Ghi kết quả JSON ra file này")
+    parser.add_argument("--compare", default=None, help="File JSON kết quả trước đó để so sánh")
+    args = parser.parse_args()
+
+    counts = None
+    if args.base_url is None:
+        url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_http.db')}"
+        setup_env(url)
+        os.environ.setdefault("SCHEMA_CHECK", "strict")
+        counts = seed(args)
+        print(f"Seeded: {counts}")
+
+    async def run():
+        async with http_client(args) as client:
+            ctx = await discover(client, args.owners, args.hot_invoices)
+            return await run_load(client, ctx, args)
+
+    result = asyncio.run(run())
+    result["meta"] = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "server": "external" if args.base_url else args.server,
+        "workers": args.workers if args.server == "uvicorn" and not args.base_url else None,
+        "users": args.users,
+        "duration_s": args.duration,
+        "mix": args.mix,
+        "dataset": counts,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+    print_table([{"route": route, **{k: v for k, v in r.items() if k != "statuses"}} for route, r in result["routes"].items()]
+                + [{"route": "TOTAL", **result["total"]}])
+    for route, r in result["routes"].items():
+        if r["errors"]:
+            print(f"{route}: {r['statuses']}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
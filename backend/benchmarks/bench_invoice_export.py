@@ -0,0 +1,67 @@
+"""Bộ nhớ đỉnh khi xuất hóa đơn: get_invoices (ORM + joinedload, một lần lấy hết) vs stream CSV.
+
+Cách chạy (từ thư mục backend):
+    python -m benchmarks.bench_invoice_export --invoices-per-contract 120
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.common import setup_env, print_table
+
+
+def measure(fn):
+    """Chạy hai lần: đo thời gian (không tracemalloc vì làm chậm đáng kể) rồi đo bộ nhớ đỉnh."""
+    t0 = time.perf_counter()
+    rows = fn()
+    elapsed = (time.perf_counter() - t0) * 1000
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, elapsed, peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="Mặc định: file SQLite tạm")
+    parser.add_argument("--houses-per-owner", type=int, default=5)
+    parser.add_argument("--rooms-per-house", type=int, default=40)
+    parser.add_argument("--invoices-per-contract", type=int, default=60)
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_export.db')}"
+    setup_env(url)
+
+    from app.core.database import engine, SessionLocal
+    from app.crud import invoice as invoice_crud
+    from app.services import invoice_export
+    from benchmarks.seed import seed_dataset
+
+    counts = seed_dataset(engine, owners=1, houses_per_owner=args.houses_per_owner,
+                          rooms_per_house=args.rooms_per_house, invoices_per_contract=args.invoices_per_contract)
+    print(f"Seeded: {counts}")
+
+    def legacy():
+        # Cách cũ: tải hết thành ORM object (limit đủ lớn) rồi mới ghi
+        # result = số hóa đơn; với stream_csv là số byte CSV
+        with SessionLocal() as db:
+            return len(invoice_crud.get_all_invoices(db, owner_id=1, limit=counts["invoices"]))
+
+    def streamed():
+        size = 0
+        for chunk in invoice_export.stream_csv(1, {}):
+            size += len(chunk)
+        return size
+
+    rows = []
+    for name, fn in (("get_all_invoices(limit=all)", legacy), ("stream_csv", streamed)):
+        result, elapsed, peak = measure(fn)
+        rows.append({"variant": name, "result": result, "time_ms": elapsed, "peak_mb": peak})
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Bão đăng nhập: thông lượng login và độ trễ p99 của endpoint khác trong lúc bcrypt đang chạy.
+
+So sánh hai cách:
+- inline: verify_password gọi thẳng trong handler async (mẫu cũ) -> event loop bị chặn ~200ms mỗi lần
+- executor: /api/v2/auth/login hiện tại (bcrypt trên executor giới hạn, quá tải thì 503)
+
+Trong lúc các worker login chạy liên tục, một probe gọi /api/v2/reports/system-overview
+(đã có token, principal nằm trong cache) và đo độ trễ.
+
+Cách chạy (từ thư mục backend):
+    python -m benchmarks.bench_login_storm --login-workers 16 --duration 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.common import setup_env, register_mysql_compat, percentile, print_table
+
+EMAIL = "storm@example.com"
+PASSWORD = "Passw0rd!"
+
+
+def build_app():
+    from fastapi import FastAPI, Depends, HTTPException
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from app.api.v2 import auth, reports
+    from app.core.database import get_async_db
+    from app.core.security import verify_password, create_access_token
+    from app.crud import user_async
+    from app.schemas.user import UserLogin
+
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/api/v2/auth")
+    app.include_router(reports.router, prefix="/api/v2/reports")
+
+    # Mẫu cũ: bcrypt chạy ngay trên event loop
+    @app.post("/legacy/login")
+    async def legacy_login(credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
+        user = await user_async.get_user_by_email(db, credentials.email)
+        if not user or not verify_password(credentials.password, user.password):
+            raise HTTPException(status_code=401)
+        return {"access_token": create_access_token({"sub": user.email, "oid": user.owner_id})}
+
+    return app
+
+
+async def run_storm(app, login_path: str, login_workers: int, duration: float):
+    import httpx
+
+    login_status = {}
+    probe_samples = []
+    stop = asyncio.Event()
+    creds = {"email": EMAIL, "password": PASSWORD}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60) as client:
+        token = (await client.post("/api/v2/auth/login", json=creds)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        await client.get("/api/v2/reports/system-overview", headers=headers)
+
+        async def login_worker():
+            while not stop.is_set():
+                r = await client.post(login_path, json=creds)
+                login_status[r.status_code] = login_status.get(r.status_code, 0) + 1
+                if r.status_code == 503:
+                    await asyncio.sleep(0.05)
+
+        async def probe():
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                r = await client.get("/api/v2/reports/system-overview", headers=headers)
+                r.raise_for_status()
+                probe_samples.append((time.perf_counter() - t0) * 1000)
+                await asyncio.sleep(0.01)
+
+        tasks = [asyncio.create_task(login_worker()) for _ in range(login_workers)]
+        tasks.append(asyncio.create_task(probe()))
+        t0 = time.perf_counter()
+        await asyncio.sleep(duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - t0
+
+    return {
+        "login_route": login_path,
+        "logins_ok_per_s": login_status.get(200, 0) / elapsed,
+        "login_503": login_status.get(503, 0),
+        "probe_requests": len(probe_samples),
+        "probe_mean_ms": statistics.fmean(probe_samples) if probe_samples else 0.0,
+        "probe_p50_ms": percentile(probe_samples, 50),
+        "probe_p99_ms": percentile(probe_samples, 99),
+        "probe_max_ms": max(probe_samples, default=0.0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="Mặc định: file SQLite tạm")
+    parser.add_argument("--login-workers", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="Số giây cho mỗi kịch bản")
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_login.db')}"
+    setup_env(url)
+
+    from app.core.database import engine, async_engine, SessionLocal, Base
+    from app.crud import user as user_crud
+    from app.schemas.user import UserCreate
+    from benchmarks.seed import seed_dataset
+
+    register_mysql_compat(async_engine)
+    seed_dataset(engine, owners=1, houses_per_owner=2, rooms_per_house=10, invoices_per_contract=6)
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user_crud.create_user(db, UserCreate(fullname="Storm Owner", phone="0900000000", email=EMAIL, password=PASSWORD))
+
+    app = build_app()
+
+    async def run_all():
+        rows = []
+        for path in ("/legacy/login", "/api/v2/auth/login"):
+            rows.append(await run_storm(app, path, args.login_workers, args.duration))
+        await async_engine.dispose()
+        return rows
+
+    print_table(asyncio.run(run_all()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Chuỗi tỷ lệ lấp đầy theo tháng: quét mốc thay đổi (services/occupancy.py) vs một truy vấn cho mỗi tháng.
+
+Mặc định 1 chủ nhà, 50 nhà trọ x 100 phòng x 20 hợp đồng = 100k hợp đồng, 60 tháng.
+- per_month_sql: mỗi tháng một truy vấn lấy các hợp đồng giao với tháng rồi cộng số ngày (cách làm thông thường)
+- load_intervals: đọc (room_id, start, end, is_active) thành mảng gọn + gộp khoảng
+- sweep: occupancy_series trên mảng đã nạp (phần được cache theo chủ nhà)
+
+Cách chạy (từ thư mục backend):
+    python -m benchmarks.bench_occupancy
+    python -m benchmarks.bench_occupancy --houses 100 --rooms-per-house 100 --contracts-per-room 10 --repeat 5
+"""
+import argparse
+import os
+import tempfile
+from datetime import date, datetime
+
+from benchmarks.common import setup_env, QueryCounter, time_calls, print_table
+
+
+def per_month_sql(db, owner_id: int, months):
+    """Mốc so sánh: một truy vấn cho mỗi tháng, cộng ngày-phòng theo nhà trọ ở Python."""
+    from sqlalchemy import select
+    from app.models.room import Room
+    from app.models.rented_room import RentedRoom
+
+    result = {}
+    for month, first, stop in months:
+        lo, hi = datetime.fromordinal(first), datetime.fromordinal(stop)
+        rows = db.execute(
+            select(Room.house_id, RentedRoom.start_date, RentedRoom.end_date)
+            .join(Room, RentedRoom.room_id == Room.room_id)
+            .where(RentedRoom.owner_id == owner_id, RentedRoom.start_date < hi, RentedRoom.end_date > lo)
+        )
+        per_house = {}
+        for house_id, start, end in rows:
+            days = (min(end, hi) - max(start, lo)).days
+            per_house[house_id] = per_house.get(house_id, 0) + max(days, 0)
+        result[month] = per_house
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="CSDL trống; mặc định: file SQLite tạm")
+    parser.add_argument("--houses", type=int, default=50)
+    parser.add_argument("--rooms-per-house", type=int, default=100)
+    parser.add_argument("--contracts-per-room", type=int, default=20)
+    parser.add_argument("--contract-days", type=int, default=90)
+    parser.add_argument("--start-month", default="2022-01")
+    parser.add_argument("--end-month", default="2026-12")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_occupancy.db')}"
+    setup_env(url)
+
+    from app.core.database import engine, SessionLocal
+    from app.services.occupancy import load_intervals, occupancy_series, month_bounds
+    from benchmarks.seed import seed_dataset
+
+    counts = seed_dataset(engine, owners=1, houses_per_owner=args.houses, rooms_per_house=args.rooms_per_house,
+                          contracts_per_room=args.contracts_per_room, invoices_per_contract=0,
+                          contract_days=args.contract_days)
+    print(f"Seeded: {counts}")
+
+    bounds = month_bounds(args.start_month, args.end_month)
+    months = [(m, first, stop) for (m, first), (_, stop) in zip(bounds, bounds[1:])]
+    counter = QueryCounter(engine)
+    rows = []
+    with SessionLocal() as db:
+        intervals = load_intervals(db, 1)
+        series = occupancy_series(intervals, args.start_month, args.end_month)
+
+        # Hai cách phải ra cùng số ngày-phòng có người thuê (dữ liệu seed không có hợp đồng chồng lấn)
+        legacy = per_month_sql(db, 1, months)
+        for i, (m, _, _) in enumerate(months):
+            expected = sum(legacy[m].values())
+            assert series["total"]["occupied_room_days"][i] == expected, (m, series["total"]["occupied_room_days"][i], expected)
+
+        for name, fn in (
+            ("per_month_sql", lambda: per_month_sql(db, 1, months)),
+            ("load_intervals", lambda: load_intervals(db, 1)),
+            ("sweep", lambda: occupancy_series(intervals, args.start_month, args.end_month)),
+            ("load_intervals+sweep", lambda: occupancy_series(load_intervals(db, 1), args.start_month, args.end_month)),
+        ):
+            with counter.measure() as q:
+                fn()
+            rows.append({"variant": name, "queries": q["queries"], **time_calls(fn, args.repeat)})
+
+    print(f"{counts['rented_rooms']} hợp đồng, {len(months)} tháng, {len(intervals.starts)} khoảng sau khi gộp")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
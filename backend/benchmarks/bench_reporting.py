@@ -0,0 +1,126 @@
+"""So sánh thống kê doanh thu: 4 truy vấn cũ vs compute_revenue_stats (rollup + 1 lần quét).
+
+Cách chạy (từ thư mục backend):
+    python -m benchmarks.bench_reporting --invoices-per-contract 24 --repeat 50
+"""
+import argparse
+import os
+import tempfile
+from datetime import date, datetime, time
+
+from benchmarks.common import setup_env, register_mysql_compat, QueryCounter, time_calls, print_table
+
+# Bản sao nguyên văn 4 truy vấn cũ trong reports.py / ai_service.py để làm mốc so sánh
+LEGACY_QUERIES = [
+    """
+    SELECT COALESCE(SUM(i.price + i.water_price + i.internet_price + i.general_price + i.electricity_price), 0) AS total
+    FROM invoices i
+    JOIN rented_rooms rr ON i.rr_id = rr.rr_id
+    JOIN rooms r ON rr.room_id = r.room_id
+    JOIN houses h ON r.house_id = h.house_id
+    WHERE i.is_paid = TRUE
+      AND i.payment_date BETWEEN :start_date AND :end_date
+      AND h.owner_id = :owner_id
+    """,
+    """
+    SELECT COUNT(*)
+    FROM invoices i
+    JOIN rented_rooms rr ON i.rr_id = rr.rr_id
+    JOIN rooms r ON rr.room_id = r.room_id
+    JOIN houses h ON r.house_id = h.house_id
+    WHERE i.is_paid = TRUE
+      AND i.payment_date BETWEEN :start_date AND :end_date
+      AND h.owner_id = :owner_id
+    """,
+    """
+    SELECT COUNT(*)
+    FROM invoices i
+    JOIN rented_rooms rr ON i.rr_id = rr.rr_id
+    JOIN rooms r ON rr.room_id = r.room_id
+    JOIN houses h ON r.house_id = h.house_id
+    WHERE i.is_paid = FALSE
+      AND i.due_date BETWEEN :start_date AND :end_date
+      AND h.owner_id = :owner_id
+    """,
+    """
+    SELECT COALESCE(AVG(monthly_revenue), 0) AS avg_rev
+    FROM (
+        SELECT DATE_FORMAT(i.payment_date, '%Y-%m') AS month,
+               SUM(i.price + i.water_price + i.internet_price + i.general_price + i.electricity_price) AS monthly_revenue
+        FROM invoices i
+        JOIN rented_rooms rr ON i.rr_id = rr.rr_id
+        JOIN rooms r ON rr.room_id = r.room_id
+        JOIN houses h ON r.house_id = h.house_id
+        WHERE i.is_paid = TRUE
+          AND i.payment_date BETWEEN :start_date AND :end_date
+          AND h.owner_id = :owner_id
+        GROUP BY DATE_FORMAT(i.payment_date, '%Y-%m')
+    ) t
+    """,
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="Mặc định: file SQLite tạm")
+    parser.add_argument("--owners", type=int, default=2)
+    parser.add_argument("--houses-per-owner", type=int, default=5)
+    parser.add_argument("--rooms-per-house", type=int, default=40)
+    parser.add_argument("--contracts-per-room", type=int, default=2)
+    parser.add_argument("--invoices-per-contract", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--start-date", default="2022-03-15")
+    parser.add_argument("--end-date", default="2025-08-20")
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_reporting.db')}"
+    setup_env(url)
+
+    from sqlalchemy import text, bindparam, DateTime
+    from app.core.database import engine, SessionLocal
+    from app.crud.revenue_rollup import rebuild_revenue_rollups
+    from app.services.reporting import compute_revenue_stats
+    from benchmarks.seed import seed_dataset
+
+    register_mysql_compat(engine)
+    counts = seed_dataset(engine, owners=args.owners, houses_per_owner=args.houses_per_owner,
+                          rooms_per_house=args.rooms_per_house, contracts_per_room=args.contracts_per_room,
+                          invoices_per_contract=args.invoices_per_contract)
+    print(f"Seeded: {counts}")
+
+    db = SessionLocal()
+    rebuild_revenue_rollups(db)
+    counter = QueryCounter(engine)
+    start, end = date.fromisoformat(args.start_date), date.fromisoformat(args.end_date)
+    # Truyền datetime để SQLite so sánh giống MySQL (DATE -> 00:00:00)
+    params = {"start_date": datetime.combine(start, time.min), "end_date": datetime.combine(end, time.min), "owner_id": 1}
+
+    legacy_stmts = [
+        text(q).bindparams(bindparam("start_date", type_=DateTime), bindparam("end_date", type_=DateTime))
+        for q in LEGACY_QUERIES
+    ]
+
+    def legacy():
+        return [db.execute(stmt, params).scalar() or 0 for stmt in legacy_stmts]
+
+    def shared():
+        return compute_revenue_stats(db, owner_id=1, start_date=start, end_date=end)
+
+    # Kiểm tra hai cách cho cùng kết quả trước khi đo
+    old, new = legacy(), shared()
+    expected = (float(old[0]), int(old[1]), int(old[2]), float(old[3]))
+    actual = (new.total_revenue, new.paid_invoices, new.pending_invoices, new.avg_monthly_revenue)
+    if any(abs(a - b) > 1e-6 * max(1.0, abs(a)) for a, b in zip(expected, actual)):
+        raise SystemExit(f"Kết quả không khớp: legacy={expected} shared={actual}")
+
+    rows = []
+    for name, fn in (("legacy_4_queries", legacy), ("compute_revenue_stats", shared)):
+        with counter.measure() as m:
+            fn()
+        rows.append({"variant": name, "round_trips": m["queries"], **time_calls(fn, args.repeat)})
+    print_table(rows)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
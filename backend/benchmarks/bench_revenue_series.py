@@ -0,0 +1,145 @@
+"""Chuỗi doanh thu theo tháng x nhà trọ (x phòng): một truy vấn GROUP BY vs gom ở Python.
+
+Mặc định 1 chủ nhà, 170 nhà trọ x 100 phòng x 3 hợp đồng x 20 hóa đơn ~ 1M hóa đơn trong 5 năm.
+- orm_hydration: tải Invoice + rented_room + room rồi cộng (cách frontend buộc phải làm hiện nay), tắt mặc định
+- projected_tuples: chỉ chọn các cột cần, yield_per, cộng dồn vào dict theo (tháng, nhà[, phòng])
+- grouped_query: compute_revenue_series (CSDL gom nhóm, trả tối đa số tháng x số nhóm dòng)
+
+Cách chạy (từ thư mục backend):
+    python -m benchmarks.bench_revenue_series
+    python -m benchmarks.bench_revenue_series --houses 20 --orm
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.common import setup_env, QueryCounter, time_calls, print_table
+
+
+def projected_tuples(db, owner_id: int, start_month: str, end_month: str, by_room: bool):
+    """Mốc so sánh: cùng bộ lọc, nhưng trả từng hóa đơn dạng tuple và gom ở Python."""
+    from datetime import datetime
+    from sqlalchemy import select
+    from app.models.invoice import Invoice
+    from app.models.rented_room import RentedRoom
+    from app.models.room import Room
+    from app.crud.revenue_rollup import next_month_start
+
+    start = datetime.strptime(start_month, "%Y-%m")
+    end = next_month_start(datetime.strptime(end_month, "%Y-%m"))
+    stmt = (
+        select(
+            Room.house_id, Room.room_id, Invoice.is_paid, Invoice.payment_date, Invoice.due_date,
+            Invoice.price, Invoice.water_price, Invoice.internet_price, Invoice.general_price, Invoice.electricity_price,
+        )
+        .join(RentedRoom, Invoice.rr_id == RentedRoom.rr_id)
+        .join(Room, RentedRoom.room_id == Room.room_id)
+        .where(Invoice.owner_id == owner_id)
+    )
+    totals = {}
+    for house_id, room_id, is_paid, payment_date, due_date, *prices in db.execute(stmt.execution_options(yield_per=20000)):
+        day = payment_date if is_paid else due_date
+        if day is None or not (start <= day < end):
+            continue
+        key = (day.year, day.month, house_id, room_id if by_room else None)
+        t = totals.get(key)
+        if t is None:
+            t = totals[key] = [0.0, 0.0, 0, 0]
+        amount = sum(p or 0 for p in prices)
+        if is_paid:
+            t[0] += amount
+            t[2] += 1
+        else:
+            t[1] += amount
+            t[3] += 1
+    return totals
+
+
+def orm_hydration(db, owner_id: int, start_month: str, end_month: str, by_room: bool):
+    from sqlalchemy.orm import joinedload
+    from app.models.invoice import Invoice
+    from app.models.rented_room import RentedRoom
+
+    totals = {}
+    query = (
+        db.query(Invoice)
+        .options(joinedload(Invoice.rented_room).joinedload(RentedRoom.room))
+        .filter(Invoice.owner_id == owner_id)
+    )
+    for inv in query.yield_per(5000):
+        day = inv.payment_date if inv.is_paid else inv.due_date
+        if day is None:
+            continue
+        month = day.strftime("%Y-%m")
+        if not (start_month <= month <= end_month):
+            continue
+        room = inv.rented_room.room
+        key = (month, room.house_id, room.room_id if by_room else None)
+        amount = inv.price + inv.water_price + inv.internet_price + inv.general_price + inv.electricity_price
+        totals[key] = totals.get(key, 0) + amount
+    db.expunge_all()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="CSDL trống; mặc định: file SQLite tạm")
+    parser.add_argument("--houses", type=int, default=170)
+    parser.add_argument("--rooms-per-house", type=int, default=100)
+    parser.add_argument("--contracts-per-room", type=int, default=3)
+    parser.add_argument("--invoices-per-contract", type=int, default=20)
+    parser.add_argument("--start-month", default="2022-01")
+    parser.add_argument("--end-month", default="2026-12")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--orm", action="store_true", help="Chạy thêm biến thể hydrate ORM (chậm, tốn bộ nhớ)")
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_revenue_series.db')}"
+    setup_env(url)
+
+    from sqlalchemy import text
+    from app.core.database import engine, SessionLocal
+    from app.services.reporting import compute_revenue_series
+    from benchmarks.seed import seed_dataset
+
+    counts = seed_dataset(engine, owners=1, houses_per_owner=args.houses, rooms_per_house=args.rooms_per_house,
+                          contracts_per_room=args.contracts_per_room, invoices_per_contract=args.invoices_per_contract)
+    print(f"Seeded: {counts}")
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE") if engine.dialect.name == "sqlite" else text("ANALYZE TABLE invoices, rented_rooms, rooms"))
+
+    counter = QueryCounter(engine)
+    rows = []
+    with SessionLocal() as db:
+        # Hai cách gom phải cho cùng tổng theo (tháng, nhà)
+        series = compute_revenue_series(db, 1, args.start_month, args.end_month)
+        tuples = projected_tuples(db, 1, args.start_month, args.end_month, False)
+        paid_total = sum(v[0] for v in tuples.values())
+        assert abs(sum(series["total"]["paid_amount"]) - paid_total) < 1e-3 * max(paid_total, 1), "Lệch tổng doanh thu"
+        assert sum(series["total"]["invoice_count"]) == sum(v[2] + v[3] for v in tuples.values())
+
+        variants = []
+        for by_room in (False, True):
+            label = "room" if by_room else "house"
+            if args.orm:
+                variants.append((f"orm_hydration({label})", by_room,
+                                 lambda b=by_room: orm_hydration(db, 1, args.start_month, args.end_month, b)))
+            variants += [
+                (f"projected_tuples({label})", by_room, lambda b=by_room: projected_tuples(db, 1, args.start_month, args.end_month, b)),
+                (f"grouped_query({label})", by_room, lambda b=by_room: compute_revenue_series(db, 1, args.start_month, args.end_month, by_room=b)),
+            ]
+        for name, by_room, fn in variants:
+            with counter.measure() as q:
+                fn()
+            rows.append({"variant": name, "queries": q["queries"], **time_calls(fn, args.repeat)})
+        rows.append({
+            "variant": "grouped_query(one house)", "queries": 1,
+            **time_calls(lambda: compute_revenue_series(db, 1, args.start_month, args.end_month, by_room=True, house_id=1), args.repeat),
+        })
+
+    print(f"{counts['invoices']} hóa đơn, {len(series['months'])} tháng, {len(series['series'])} nhà trọ")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
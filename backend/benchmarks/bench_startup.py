@@ -0,0 +1,122 @@
+"""Thời gian khởi động lạnh (import app.main:app) đo bằng `python -X importtime`; thoát mã 1 nếu chậm đi.
+
+Mỗi lần đo chạy một tiến trình Python mới (sau một lần chạy làm nóng để có sẵn .pyc), lấy
+thời gian import tích lũy của app.main và liệt kê các package tốn thời gian nhất.
+Kiểm tra thêm: các SDK nặng chỉ dùng khi cần (Gemini, openpyxl) không được import lúc khởi động.
+
+So với benchmarks/startup_baseline.json: trung vị vượt baseline * (1 + tolerance) thì báo lỗi.
+Baseline phụ thuộc máy nên không commit (.gitignore): lần chạy đầu trên mỗi máy ghi baseline
+(đo ở commit gốc muốn so sánh), các lần sau so với nó; đo lại bằng --update-baseline.
+
+Cách chạy (từ thư mục backend):
+    python -m benchmarks.bench_startup --runs 7
+    python -m benchmarks.bench_startup --update-baseline
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.common import setup_env, print_table
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "startup_baseline.json")
+# Module không được có mặt sau khi import app.main (chỉ import khi endpoint tương ứng được gọi)
+LAZY_MODULES = ("google.generativeai", "google.ai", "openpyxl")
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def run_once() -> Tuple[float, float, List[Tuple[int, int, int, str]]]:
+    """Trả (thời gian import app.main ms, wall ms của tiến trình, các dòng importtime)."""
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True, text=True, env=os.environ.copy(), cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    wall = (time.perf_counter() - t0) * 1000
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr[-4000:])
+        raise SystemExit(f"import app.main thất bại (mã {proc.returncode})")
+    entries = []
+    for line in proc.stderr.splitlines():
+        m = LINE.match(line)
+        if m:
+            entries.append((int(m.group(1)), int(m.group(2)), len(m.group(3)), m.group(4)))
+    app_main = next((cum for _, cum, _, name in entries if name == "app.main"), None)
+    if app_main is None:
+        raise SystemExit("Không tìm thấy app.main trong output importtime")
+    return app_main / 1000, wall, entries
+
+
+def top_packages(entries, limit: int) -> List[Dict[str, object]]:
+    """Cộng self time theo package gốc (sqlalchemy, fastapi, app, ...)."""
+    totals: Dict[str, int] = {}
+    for self_us, _, _, name in entries:
+        root = name.split(".")[0]
+        totals[root] = totals.get(root, 0) + self_us
+    ordered = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return [{"package": name, "self_ms": us / 1000} for name, us in ordered]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--tolerance", type=float, default=None, help="Mặc định lấy từ file baseline")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    setup_env(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_startup.db')}")
+
+    run_once()  # làm nóng: biên dịch .pyc
+    samples, walls = [], []
+    entries = []
+    for _ in range(args.runs):
+        app_ms, wall_ms, entries = run_once()
+        samples.append(app_ms)
+        walls.append(wall_ms)
+
+    median = statistics.median(samples)
+    print_table([{
+        "runs": args.runs,
+        "import_app_main_p50_ms": median,
+        "import_min_ms": min(samples),
+        "import_max_ms": max(samples),
+        "process_wall_p50_ms": statistics.median(walls),
+    }])
+    print()
+    print_table(top_packages(entries, args.top))
+
+    failures = []
+    loaded = sorted({name for *_, name in entries if name.startswith(LAZY_MODULES)})
+    if loaded:
+        failures.append(f"Module lẽ ra phải lazy đã bị import lúc khởi động: {', '.join(loaded)}")
+
+    if args.update_baseline or not os.path.exists(BASELINE_PATH):
+        tolerance = args.tolerance if args.tolerance is not None else 0.3
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({"import_app_main_ms": round(median, 1), "tolerance": tolerance}, f, indent=2)
+            f.write("\n")
+        print(f"\nĐã ghi baseline: {median:.1f} ms (tolerance {tolerance:.0%}) - các lần chạy sau trên máy này so với nó")
+    else:
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+        tolerance = args.tolerance if args.tolerance is not None else baseline.get("tolerance", 0.3)
+        limit = baseline["import_app_main_ms"] * (1 + tolerance)
+        print(f"\nBaseline {baseline['import_app_main_ms']:.1f} ms, giới hạn {limit:.1f} ms")
+        if median > limit:
+            failures.append(f"Khởi động chậm đi: {median:.1f} ms > {limit:.1f} ms")
+
+    for failure in failures:
+        print(f"[FAIL] {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
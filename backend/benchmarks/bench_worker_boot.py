@@ -0,0 +1,100 @@
+"""Thời gian khởi động worker và số câu SQL phát ra trước khi phục vụ request đầu tiên.
+
+Khởi chạy đồng thời N tiến trình (giống N worker uvicorn cùng boot), mỗi tiến trình:
+import app.main -> chạy lifespan startup -> GET /. So sánh:
+- create_all: như trước đây, tạo bảng lúc import (Base.metadata.create_all, reflect từng bảng)
+- revision_check: hiện tại, chỉ SELECT alembic_version (schema_check=strict)
+- revision_check+prewarm: thêm mở sẵn db_pool_prewarm connection
+
+Cách chạy (từ thư mục backend):
+    python -m benchmarks.bench_worker_boot --workers 8
+    python -m benchmarks.bench_worker_boot --database-url mysql+pymysql://u:p@127.0.0.1/boot_check
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import setup_env, print_table
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from sqlalchemy import event
+from app.core.database import engine, Base
+counts = {"statements": 0, "connects": 0}
+event.listen(engine, "before_cursor_execute", lambda *a: counts.__setitem__("statements", counts["statements"] + 1))
+event.listen(engine, "connect", lambda *a: counts.__setitem__("connects", counts["connects"] + 1))
+import app.main
+if sys.argv[1] == "create_all":
+    Base.metadata.create_all(bind=engine)
+t_import = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    t_ready = time.perf_counter()
+    client.get("/").raise_for_status()
+    t_first = time.perf_counter()
+print(json.dumps({**counts, "import_ms": (t_import - t0) * 1000, "ready_ms": (t_ready - t0) * 1000, "first_response_ms": (t_first - t0) * 1000}))
+"""
+
+
+def boot(mode: str, workers: int, prewarm: int):
+    env = os.environ.copy()
+    env["SCHEMA_CHECK"] = "off" if mode == "create_all" else "strict"
+    env["DB_POOL_PREWARM"] = str(prewarm)
+    t0 = time.perf_counter()
+    procs = [
+        subprocess.Popen([sys.executable, "-c", CHILD, mode], cwd=BACKEND_DIR, env=env,
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        for _ in range(workers)
+    ]
+    results = []
+    for proc in procs:
+        out, err = proc.communicate()
+        if proc.returncode != 0:
+            sys.stderr.write(err[-4000:])
+            raise SystemExit(f"Worker {mode} thất bại (mã {proc.returncode})")
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    all_ready = (time.perf_counter() - t0) * 1000
+    return {
+        "mode": mode + ("+prewarm" if prewarm else ""),
+        "workers": workers,
+        "sql_per_worker": statistics.median(r["statements"] for r in results),
+        "connects_per_worker": statistics.median(r["connects"] for r in results),
+        "import_p50_ms": statistics.median(r["import_ms"] for r in results),
+        "ready_p50_ms": statistics.median(r["ready_ms"] for r in results),
+        "first_resp_p50_ms": statistics.median(r["first_response_ms"] for r in results),
+        "all_ready_ms": all_ready,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="CSDL trống; mặc định: file SQLite tạm")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--prewarm", type=int, default=3)
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_boot.db')}"
+    setup_env(url)
+
+    # Schema theo đúng đường production: migration tới head
+    from manage_db import upgrade
+    upgrade("head")
+
+    rows = [
+        boot("create_all", args.workers, 0),
+        boot("revision_check", args.workers, 0),
+        boot("revision_check", args.workers, args.prewarm),
+    ]
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Chạy EXPLAIN cho các truy vấn CRUD / báo cáo nóng và báo lỗi nếu có full table scan.
+
+Tạo CSDL bằng `alembic upgrade head` (kiểm tra luôn migration), sinh dữ liệu, ANALYZE,
+rồi gọi đúng các hàm CRUD / endpoint, bắt mọi câu SELECT được phát ra và EXPLAIN từng câu.
+
+Cách chạy (từ thư mục backend):
+    python -m benchmarks.check_query_plans
+    python -m benchmarks.check_query_plans --database-url mysql+pymysql://u:p@127.0.0.1/plan_check
+Thoát với mã 1 nếu có truy vấn quét toàn bảng trên các bảng lớn.
+
+Đây là bước kiểm tra index / query plan bắt buộc trước khi merge thay đổi về migration, model
+hoặc truy vấn CRUD / báo cáo (chạy tay hoặc trong CI bằng mã thoát). Để dạng script, không phải
+test pytest: repo chưa có bộ test hay pytest trong requirements, và script cần chạy được với
+--database-url trỏ tới MySQL thật, nơi kế hoạch thực thi mới có ý nghĩa.
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+import tempfile
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from benchmarks.common import setup_env, register_mysql_compat
+
+# Bảng tăng trưởng theo dữ liệu - không được quét toàn bảng
+LARGE_TABLES = {"invoices", "rented_rooms", "rooms", "assets", "houses", "revenue_rollups", "collection_versions", "owner_kpis"}
+
+
+def run_async(fn):
+    """Chạy fn(AsyncSession) trong một event loop riêng rồi đóng pool async (gắn với loop đó)."""
+    from app.core.database import AsyncSessionLocal, async_engine
+
+    async def runner():
+        try:
+            async with AsyncSessionLocal() as adb:
+                return await fn(adb)
+        finally:
+            await async_engine.dispose()
+
+    return asyncio.run(runner())
+
+
+def hot_queries(db):
+    """(tên, hàm) - mỗi hàm gọi đúng code đang chạy trong API."""
+    from app.crud import invoice as invoice_crud, room as room_crud, rented_room as rented_room_crud
+    from app.crud import asset as asset_crud, house as house_crud
+    from app.api.v2 import reports
+    from app.services.reporting import compute_revenue_stats, compute_revenue_stats_async, compute_revenue_series
+    from app.services.occupancy import load_intervals
+    from app.crud import user_async, meter_reading as meter_reading_crud, collection_version
+    from app.crud.meter_reading import MeterReading
+
+    from app.core.pagination import encode_cursor
+
+    owner = SimpleNamespace(owner_id=1)
+    invoice_cursor = encode_cursor([datetime(2022, 6, 1), 100])
+    stats_request = reports.RevenueStatsRequest(start_date=date(2022, 3, 15), end_date=date(2023, 8, 20))
+    return [
+        ("collection_version.get_versions", lambda: collection_version.get_versions(db, 1, [collection_version.INVOICES, collection_version.RENTED_ROOMS])),
+        ("houses.get_houses_by_owner", lambda: house_crud.get_houses_by_owner(db, owner_id=1)),
+        ("rooms.get_room_by_id", lambda: room_crud.get_room_by_id(db, room_id=1, owner_id=1)),
+        ("rooms.get_rooms_by_house", lambda: room_crud.get_rooms_by_house(db, house_id=1, owner_id=1)),
+        ("rooms.get_available_rooms", lambda: room_crud.get_available_rooms(db, owner_id=1)),
+        ("rooms.get_available_rooms(house)", lambda: room_crud.get_available_rooms(db, owner_id=1, house_id=1)),
+        ("rooms.get_all_rooms", lambda: room_crud.get_all_rooms(db, owner_id=1)),
+        ("assets.get_assets_by_room", lambda: asset_crud.get_assets_by_room(db, room_id=1, owner_id=1)),
+        ("rented_rooms.get_rented_room_by_id", lambda: rented_room_crud.get_rented_room_by_id(db, rr_id=1, owner_id=1)),
+        ("rented_rooms.get_rented_rooms_by_room", lambda: rented_room_crud.get_rented_rooms_by_room(db, room_id=1, owner_id=1)),
+        ("rented_rooms.get_active_rented_rooms", lambda: rented_room_crud.get_active_rented_rooms(db, owner_id=1)),
+        ("invoices.get_invoice_by_id", lambda: invoice_crud.get_invoice_by_id(db, invoice_id=1, owner_id=1)),
+        ("invoices.get_invoices_by_rented_room", lambda: invoice_crud.get_invoices_by_rented_room(db, rr_id=1, owner_id=1)),
+        ("invoices.get_pending_invoices", lambda: invoice_crud.get_pending_invoices(db, owner_id=1)),
+        ("invoices.get_all_invoices", lambda: invoice_crud.get_all_invoices(db, owner_id=1)),
+        ("invoices.get_all_invoices(after)", lambda: invoice_crud.get_all_invoices(db, owner_id=1, after=invoice_cursor)),
+        ("invoices.get_pending_invoices(after)", lambda: invoice_crud.get_pending_invoices(db, owner_id=1, after=invoice_cursor)),
+        ("invoices.get_invoices(month)", lambda: invoice_crud.get_invoices(db, owner_id=1, month="2022-06")),
+        ("invoices.get_invoices(month,is_paid)", lambda: invoice_crud.get_invoices(db, owner_id=1, month="2022-06", is_paid=False)),
+        ("invoices.get_invoices(house,room)", lambda: invoice_crud.get_invoices(db, owner_id=1, house_id=1, room_id=1)),
+        ("invoices.iter_invoice_export_rows", lambda: list(invoice_crud.iter_invoice_export_rows(db, owner_id=1))),
+        ("invoices.iter_invoice_export_rows(month,house)", lambda: list(invoice_crud.iter_invoice_export_rows(db, owner_id=1, month="2022-06", house_id=1))),
+        ("invoices.run_billing", lambda: invoice_crud.run_billing(db, owner_id=1, month="2023-06")),
+        ("meter_reading.apply_readings", lambda: meter_reading_crud.apply_readings(db, owner_id=1, readings=[
+            MeterReading(line=1, invoice_id=1, electricity_num=10),
+            MeterReading(line=2, rr_id=2, month="2023-06", electricity_num=10),
+        ])),
+        ("reporting.compute_revenue_stats", lambda: compute_revenue_stats(db, owner_id=1, start_date=stats_request.start_date, end_date=stats_request.end_date)),
+        ("reporting.compute_revenue_stats_async", lambda: run_async(lambda adb: compute_revenue_stats_async(adb, owner_id=1, start_date=stats_request.start_date, end_date=stats_request.end_date))),
+        ("reporting.compute_revenue_series", lambda: compute_revenue_series(db, owner_id=1, start_month="2022-01", end_month="2023-12")),
+        ("reporting.compute_revenue_series(room,house)", lambda: compute_revenue_series(db, owner_id=1, start_month="2022-01", end_month="2023-12", by_room=True, house_id=1)),
+        ("occupancy.load_intervals", lambda: load_intervals(db, owner_id=1)),
+        ("occupancy.load_intervals(house)", lambda: load_intervals(db, owner_id=1, house_id=1)),
+        ("reports.get_system_overview", lambda: run_async(lambda adb: reports.get_system_overview(current_user=owner, db=adb))),
+        ("user_async.get_user_by_id", lambda: run_async(lambda adb: user_async.get_user_by_id(adb, 1))),
+    ]
+
+
+def explain(conn, statement, parameters):
+    """Trả về (các dòng kế hoạch dạng text, danh sách bảng bị quét toàn bộ)."""
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+        lines = [r[-1] for r in rows]
+        full = []
+        for line in lines:
+            m = re.match(r"SCAN (\w+)", line)
+            if m and "USING" not in line and m.group(1) in LARGE_TABLES:
+                full.append(m.group(1))
+        return lines, full
+    rows = conn.exec_driver_sql("EXPLAIN " + statement, parameters).mappings().fetchall()
+    lines = [f"{r['table']}: type={r['type']} key={r['key']} rows={r['rows']}" for r in rows]
+    full = [r["table"] for r in rows if r["type"] == "ALL" and r["table"] in LARGE_TABLES]
+    return lines, full
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="CSDL trống; mặc định: file SQLite tạm")
+    parser.add_argument("--owners", type=int, default=20)
+    parser.add_argument("--verbose", action="store_true", help="In toàn bộ kế hoạch thực thi")
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'plan_check.db')}"
+    setup_env(url)
+
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import event, text
+    from app.core.database import engine, async_engine, SessionLocal
+    from app.crud.revenue_rollup import rebuild_revenue_rollups
+    from app.crud.owner_kpi import rebuild_owner_kpis
+    from benchmarks.seed import seed_dataset
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    command.upgrade(Config(os.path.join(backend_dir, "alembic.ini")), "head")
+    register_mysql_compat(engine)
+    register_mysql_compat(async_engine)
+    seed_dataset(engine, owners=args.owners, houses_per_owner=3, rooms_per_house=20, invoices_per_contract=12)
+
+    db = SessionLocal()
+    rebuild_revenue_rollups(db)
+    rebuild_owner_kpis(db)
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            conn.execute(text("ANALYZE"))
+        else:
+            conn.execute(text("ANALYZE TABLE houses, rooms, rented_rooms, invoices, assets, revenue_rollups, collection_versions, owner_kpis"))
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    failures = []
+    for name, fn in hot_queries(db):
+        captured.clear()
+        engines = (engine, async_engine.sync_engine)
+        for e in engines:
+            event.listen(e, "before_cursor_execute", capture)
+        try:
+            fn()
+        finally:
+            for e in engines:
+                event.remove(e, "before_cursor_execute", capture)
+        statements = list(captured)
+        with engine.connect() as conn:
+            for statement, parameters in statements:
+                lines, full = explain(conn, statement, parameters)
+                status = "FULL SCAN: " + ", ".join(full) if full else "ok"
+                print(f"[{status}] {name}")
+                if args.verbose or full:
+                    for line in lines:
+                        print(f"    {line}")
+                if full:
+                    failures.append(name)
+    db.close()
+
+    if failures:
+        print(f"\n{len(failures)} truy vấn quét toàn bảng: {', '.join(sorted(set(failures)))}")
+        sys.exit(1)
+    print("\nKhông có truy vấn nào quét toàn bảng.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Tiện ích dùng chung cho các benchmark (chạy từ thư mục backend: python -m benchmarks.<tên>)."""
+import os
+import statistics
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+
+def setup_env(database_url: str):
+    """Đặt biến môi trường tối thiểu cho Settings trước khi import app.*"""
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+
+def register_mysql_compat(engine):
+    """Cho phép SQL viết cho MySQL (DATE_FORMAT, NOW) chạy trên SQLite khi benchmark cục bộ."""
+    engine = getattr(engine, "sync_engine", engine)  # AsyncEngine -> Engine gốc
+    if engine.dialect.name != "sqlite":
+        return
+    from sqlalchemy import event
+    from datetime import datetime
+
+    def date_format(value, fmt):
+        if value is None:
+            return None
+        return datetime.fromisoformat(str(value)).strftime(fmt)
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _):
+        dbapi_conn.create_function("DATE_FORMAT", 2, date_format)
+        dbapi_conn.create_function("NOW", 0, lambda: datetime.now().isoformat(sep=" "))
+
+
+class QueryCounter:
+    """Đếm số câu lệnh SQL (round trip) gửi xuống engine."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        self._engine = engine
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    @contextmanager
+    def measure(self):
+        start = self.count
+        box = {}
+        yield box
+        box["queries"] = self.count - start
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def time_calls(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": percentile(samples, 50),
+        "p95_ms": percentile(samples, 95),
+        "p99_ms": percentile(samples, 99),
+    }
+
+
+def print_table(rows: List[Dict[str, object]]):
+    if not rows:
+        return
+    headers = list(rows[0].keys())
+    widths = {h: max(len(h), *(len(_fmt(r[h])) for r in rows)) for h in headers}
+    print("  ".join(h.ljust(widths[h]) for h in headers))
+    for r in rows:
+        print("  ".join(_fmt(r[h]).ljust(widths[h]) for h in headers))
+
+
+def _fmt(value) -> str:
+    return f"{value:.2f}" if isinstance(value, float) else str(value)
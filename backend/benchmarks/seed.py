@@ -0,0 +1,15 @@
+"""Sinh dữ liệu giả lập cho benchmark: tạo bảng bằng create_all rồi gọi generate_dataset (Core bulk insert)."""
+from generate_dataset import generate_dataset
+
+
+def seed_dataset(engine, owners=2, houses_per_owner=3, rooms_per_house=20, contracts_per_room=2,
+                 invoices_per_contract=12, seed=42, batch_size=5000, contract_days=None, **options):
+    from app.core.database import Base
+    from app.models import user, house, room, asset, rented_room, invoice, revenue_rollup, collection_version, owner_kpi  # noqa: F401
+
+    Base.metadata.create_all(bind=engine)
+    counts = generate_dataset(engine, owners=owners, houses_per_owner=houses_per_owner, rooms_per_house=rooms_per_house,
+                              contracts_per_room=contracts_per_room, invoices_per_contract=invoices_per_contract,
+                              seed=seed, batch_size=batch_size, contract_days=contract_days, **options)
+    return {"owners": owners, "houses": counts["houses"], "rooms": counts["rooms"],
+            "rented_rooms": counts["rented_rooms"], "invoices": counts["invoices"]}
@@ -60,6 +60,7 @@ BEGIN
         water_num,
         due_date,
         rr_id,
+        owner_id,
         is_paid,
         created_at
     ) VALUES (
@@ -72,6 +73,7 @@ BEGIN
         0,       -- Số nước
         DATE_ADD(NEW.start_date, INTERVAL 30 DAY),  -- Ngày đến hạn sau 30 ngày từ ngày bắt đầu
         NEW.rr_id,
+        NEW.owner_id,
         FALSE,
         NOW()
     );
@@ -114,16 +116,93 @@ BEGIN
 END //
 DELIMITER ;
 
+-- 7. Trigger đồng bộ owner_id khi phòng chuyển sang nhà trọ khác
+DELIMITER //
+CREATE TRIGGER tr_before_update_room_owner
+BEFORE UPDATE ON rooms
+FOR EACH ROW
+BEGIN
+    IF NEW.house_id <> OLD.house_id THEN
+        SET NEW.owner_id = (SELECT owner_id FROM houses WHERE house_id = NEW.house_id);
+    END IF;
+END //
+DELIMITER ;
+
+-- 8. Trigger lan truyền owner_id của phòng xuống hợp đồng và hóa đơn
+DELIMITER //
+CREATE TRIGGER tr_after_update_room_owner
+AFTER UPDATE ON rooms
+FOR EACH ROW
+BEGIN
+    IF NEW.owner_id <> OLD.owner_id THEN
+        UPDATE rented_rooms SET owner_id = NEW.owner_id WHERE room_id = NEW.room_id;
+        UPDATE invoices i
+        JOIN rented_rooms rr ON i.rr_id = rr.rr_id
+        SET i.owner_id = NEW.owner_id
+        WHERE rr.room_id = NEW.room_id;
+    END IF;
+END //
+DELIMITER ;
+
+-- 9. Trigger đồng bộ owner_id khi nhà trọ đổi chủ; chuyển chỉ số của nhà (owner_kpis) sang chủ mới
+-- (giống alembic/versions/0008_house_owner_kpis.py)
+DELIMITER //
+CREATE TRIGGER tr_after_update_house_owner
+AFTER UPDATE ON houses
+FOR EACH ROW
+BEGIN
+    DECLARE v_rooms, v_available, v_occupied, v_contracts, v_pending INT DEFAULT 0;
+    DECLARE v_house_month, v_old_month, v_new_month VARCHAR(7) DEFAULT NULL;
+    IF NEW.owner_id <> OLD.owner_id THEN
+        UPDATE rooms SET owner_id = NEW.owner_id WHERE house_id = NEW.house_id;
+        UPDATE revenue_rollups SET owner_id = NEW.owner_id WHERE house_id = NEW.house_id;
+
+        SELECT COUNT(*), COALESCE(SUM(is_available = TRUE), 0), COALESCE(SUM(is_available = FALSE), 0)
+        INTO v_rooms, v_available, v_occupied
+        FROM rooms WHERE house_id = NEW.house_id;
+        SELECT COUNT(*) INTO v_contracts
+        FROM rented_rooms rr JOIN rooms r ON rr.room_id = r.room_id
+        WHERE r.house_id = NEW.house_id AND rr.is_active = TRUE;
+        SELECT COALESCE(SUM(pending_count), 0), MAX(CASE WHEN paid_count > 0 THEN month END)
+        INTO v_pending, v_house_month
+        FROM revenue_rollups WHERE house_id = NEW.house_id;
+
+        SELECT revenue_month INTO v_old_month FROM owner_kpis WHERE owner_id = OLD.owner_id;
+        UPDATE owner_kpis SET
+            total_houses = total_houses - 1,
+            total_rooms = total_rooms - v_rooms,
+            available_rooms = available_rooms - v_available,
+            occupied_rooms = occupied_rooms - v_occupied,
+            active_contracts = active_contracts - v_contracts,
+            pending_invoices = pending_invoices - v_pending,
+            month_revenue = month_revenue - COALESCE((SELECT paid_total FROM revenue_rollups
+                                                      WHERE house_id = NEW.house_id AND month = v_old_month), 0)
+        WHERE owner_id = OLD.owner_id;
+
+        INSERT IGNORE INTO owner_kpis (owner_id, total_houses, total_rooms, available_rooms, occupied_rooms,
+                                       active_contracts, pending_invoices, month_revenue)
+        VALUES (NEW.owner_id, 0, 0, 0, 0, 0, 0, 0);
+        SELECT revenue_month INTO v_new_month FROM owner_kpis WHERE owner_id = NEW.owner_id;
+        IF v_house_month IS NOT NULL AND (v_new_month IS NULL OR v_new_month < v_house_month) THEN
+            SET v_new_month = v_house_month;
+            UPDATE owner_kpis SET revenue_month = v_new_month, month_revenue = 0 WHERE owner_id = NEW.owner_id;
+        END IF;
+        UPDATE owner_kpis SET
+            total_houses = total_houses + 1,
+            total_rooms = total_rooms + v_rooms,
+            available_rooms = available_rooms + v_available,
+            occupied_rooms = occupied_rooms + v_occupied,
+            active_contracts = active_contracts + v_contracts,
+            pending_invoices = pending_invoices + v_pending,
+            month_revenue = month_revenue + COALESCE((SELECT paid_total FROM revenue_rollups
+                                                      WHERE house_id = NEW.house_id AND month = v_new_month), 0)
+        WHERE owner_id = NEW.owner_id;
+    END IF;
+END //
+DELIMITER ;
+
 -- ============================================
--- INDEXES để tối ưu hiệu suất
+-- INDEXES: được quản lý bằng Alembic (alembic/versions/0004_hot_path_indexes.py)
+-- Chạy: alembic upgrade head
+-- Kiểm tra kế hoạch truy vấn: python -m benchmarks.check_query_plans
 -- ============================================
-
-CREATE INDEX idx_rooms_house_id ON rooms(house_id);
-CREATE INDEX idx_rooms_is_available ON rooms(is_available);
-CREATE INDEX idx_rented_rooms_room_id ON rented_rooms(room_id);
-CREATE INDEX idx_rented_rooms_is_active ON rented_rooms(is_active);
-CREATE INDEX idx_invoices_rr_id ON invoices(rr_id);
-CREATE INDEX idx_invoices_is_paid ON invoices(is_paid);
-CREATE INDEX idx_invoices_payment_date ON invoices(payment_date);
-CREATE INDEX idx_assets_room_id ON assets(room_id);
-CREATE INDEX idx_houses_owner_id ON houses(owner_id);
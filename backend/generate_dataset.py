@@ -0,0 +1,227 @@
+import argparse
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+# Sinh dữ liệu giả lập quy mô lớn (benchmark, kiểm tra query plan) bằng Core bulk insert
+# Cùng tham số + cùng --seed luôn ra cùng một CSDL (id, ngày, số tiền giống hệt nhau)
+# Cách dùng (CSDL trống, đã có bảng: python manage_db.py upgrade hoặc create):
+#   python generate_dataset.py --owners 20 --houses-per-owner 10 --rooms-per-house 30 \
+#       --contracts-per-room 4 --invoices-per-contract 12     # ~0.3M hóa đơn
+#   python generate_dataset.py --owners 100 --houses-per-owner 10 --rooms-per-house 40 \
+#       --contracts-per-room 5 --invoices-per-contract 12 --create-schema   # ~2.4M hóa đơn
+# Tài khoản: owner<N>@example.com / --password (mặc định owner123)
+
+# Thứ tự ghi theo khóa ngoại: bảng cha luôn được ghi trước trong cùng một lô
+TABLE_ORDER = ("houses", "rooms", "assets", "rented_rooms", "invoices")
+
+ROOM_PRICES = (1_500_000, 2_000_000, 2_500_000, 3_000_000, 3_500_000)
+ASSET_NAMES = ("Điều hòa", "Tủ lạnh", "Giường đôi", "Giường đơn", "Quạt điện", "Máy nước nóng", "Tủ quần áo")
+DISTRICTS = ("Quận 1", "Quận 3", "Quận 7", "Bình Thạnh", "Thủ Đức", "Gò Vấp")
+
+
+def _add_months(value: datetime, months: int) -> datetime:
+    # Ngày trong tháng luôn <= 28 (xem _contract_start) nên không cần xử lý cuối tháng
+    year, month = divmod(value.month - 1 + months, 12)
+    return value.replace(year=value.year + year, month=month + 1)
+
+
+def _contract_start(value: datetime) -> datetime:
+    # Ngày 29-31 dời sang ngày 1 tháng sau (không lùi lại để hợp đồng kế tiếp không chồng lấn)
+    return value if value.day <= 28 else _add_months(value.replace(day=1), 1)
+
+
+class _BatchWriter:
+    """Gom dòng theo bảng, ghi bằng executemany mỗi khi đủ batch_size dòng rồi commit."""
+
+    def __init__(self, conn, tables, batch_size: int):
+        self.conn = conn
+        self.tables = tables
+        self.batch_size = batch_size
+        self.buffers: Dict[str, List[dict]] = {name: [] for name in TABLE_ORDER}
+        self.pending = 0
+        self.written = dict.fromkeys(TABLE_ORDER, 0)
+
+    def add(self, table: str, row: dict):
+        self.buffers[table].append(row)
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for name in TABLE_ORDER:
+            rows = self.buffers[name]
+            if rows:
+                self.conn.execute(self.tables[name].insert(), rows)
+                self.written[name] += len(rows)
+                self.buffers[name] = []
+        self.conn.commit()
+        self.pending = 0
+
+
+def generate_dataset(engine, owners=2, houses_per_owner=3, rooms_per_house=20, contracts_per_room=2,
+                     invoices_per_contract=12, assets_per_room=0, seed=42, batch_size=10000,
+                     start_date: date = date(2022, 1, 1), contract_days: Optional[int] = None,
+                     max_vacancy_days=0, unpaid_ratio=0.15, vacant_ratio=0.0,
+                     password: Optional[str] = None) -> Dict[str, int]:
+    """Chèn dữ liệu giả lập vào CSDL trống và trả về số dòng mỗi bảng.
+
+    Mỗi phòng có `contracts_per_room` hợp đồng nối tiếp (cách nhau tối đa `max_vacancy_days` ngày
+    trống), chỉ hợp đồng cuối còn hiệu lực (trừ khoảng `vacant_ratio` phòng đang trống). Mỗi hợp đồng có một hóa đơn mỗi tháng (billing_month
+    như đợt lập hóa đơn hàng tháng), chỉ số điện / nước tăng dần, khoảng `unpaid_ratio` chưa thanh toán.
+    Id được gán sẵn nên không cần đọc lại sau khi insert; bộ nhớ chỉ giữ một lô.
+    Không tính revenue_rollups / owner_kpis (xem rebuild_revenue_rollup.py).
+    """
+    from app.core.database import Base
+    from app.models import user, house, room, asset, rented_room, invoice, revenue_rollup, collection_version, owner_kpi  # noqa: F401
+
+    tables = Base.metadata.tables
+    rnd = random.Random(seed)
+    base = datetime.combine(start_date, datetime.min.time())
+    if password is None:
+        password_hash = "x"
+    else:
+        from app.core.security import get_password_hash
+        password_hash = get_password_hash(password)  # bcrypt một lần, dùng chung cho mọi chủ nhà
+
+    with engine.connect() as conn:
+        if conn.execute(tables["users"].select().limit(1)).first() is not None:
+            raise RuntimeError("Database is not empty; generate_dataset needs empty tables")
+        role_id = conn.execute(tables["roles"].select().where(tables["roles"].c.authority == "owner")).scalar()
+        if role_id is None:
+            role_id = 1
+            conn.execute(tables["roles"].insert(), [{"id": role_id, "authority": "owner"}])
+        conn.execute(tables["users"].insert(), [
+            {"owner_id": o, "fullname": f"Owner {o}", "phone": f"09{o:08d}", "email": f"owner{o}@example.com",
+             "password": password_hash, "role_id": role_id, "is_active": True, "created_at": base}
+            for o in range(1, owners + 1)
+        ])
+
+        writer = _BatchWriter(conn, tables, batch_size)
+        house_id = room_id = asset_id = rr_id = invoice_id = 0
+        for o in range(1, owners + 1):
+            for _ in range(houses_per_owner):
+                house_id += 1
+                district = rnd.choice(DISTRICTS)
+                floors = rnd.randint(1, 6)
+                writer.add("houses", {
+                    "house_id": house_id, "name": f"Nhà trọ {house_id}", "floor_count": floors,
+                    "ward": f"Phường {rnd.randint(1, 15)}", "district": district,
+                    "address_line": f"{rnd.randint(1, 999)} Đường {house_id}, {district}", "owner_id": o,
+                    "created_at": base,
+                })
+                for r in range(rooms_per_house):
+                    room_id += 1
+                    price = rnd.choice(ROOM_PRICES)
+                    created = base + timedelta(days=rnd.randint(0, 60))
+                    room_row = {
+                        "room_id": room_id, "name": f"P{r + 101}", "capacity": rnd.randint(1, 4),
+                        "price": price, "house_id": house_id, "owner_id": o, "is_available": True, "created_at": created,
+                    }
+                    # Hợp đồng cuối còn hiệu lực: phòng đang có người thuê
+                    vacant = vacant_ratio > 0 and rnd.random() < vacant_ratio
+                    if contracts_per_room and not vacant:
+                        room_row["is_available"] = False
+                    writer.add("rooms", room_row)
+                    for _ in range(assets_per_room):
+                        asset_id += 1
+                        writer.add("assets", {"asset_id": asset_id, "name": rnd.choice(ASSET_NAMES), "room_id": room_id,
+                                              "created_at": created})
+
+                    start = _contract_start(created)
+                    for c in range(contracts_per_room):
+                        rr_id += 1
+                        if contract_days:
+                            end = start + timedelta(days=contract_days)
+                        else:
+                            end = _add_months(start, max(invoices_per_contract, 1))
+                        unit_price = rnd.choice((3500, 3800, 4000))
+                        meter = float(rnd.randint(0, 5000))
+                        water = float(rnd.randint(0, 500))
+                        writer.add("rented_rooms", {
+                            "rr_id": rr_id, "tenant_name": f"Người thuê {rr_id}", "tenant_phone": f"03{rr_id:08d}",
+                            "number_of_tenants": rnd.randint(1, 3), "start_date": start, "end_date": end,
+                            "deposit": price, "monthly_rent": price, "initial_electricity_num": meter,
+                            "electricity_unit_price": unit_price, "water_price": 80_000, "internet_price": 100_000,
+                            "general_price": 100_000, "room_id": room_id, "owner_id": o,
+                            "is_active": c == contracts_per_room - 1 and not vacant, "created_at": start,
+                        })
+                        for k in range(invoices_per_contract):
+                            invoice_id += 1
+                            due = _add_months(start, k + 1)
+                            usage = rnd.randint(50, 300)
+                            meter += usage
+                            water += rnd.randint(2, 10)
+                            paid = rnd.random() >= unpaid_ratio
+                            writer.add("invoices", {
+                                "invoice_id": invoice_id, "price": price, "water_price": 80_000,
+                                "internet_price": 100_000, "general_price": 100_000,
+                                "electricity_price": float(usage * unit_price), "electricity_num": meter,
+                                "water_num": water, "due_date": due,
+                                "payment_date": due + timedelta(days=rnd.randint(-5, 10)) if paid else None,
+                                "is_paid": paid, "billing_month": due.strftime("%Y-%m"), "rr_id": rr_id, "owner_id": o,
+                                "created_at": due - timedelta(days=5),
+                            })
+                        start = _contract_start(end + timedelta(days=rnd.randint(0, max_vacancy_days)))
+        writer.flush()
+
+    return {"owners": owners, **writer.written}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic dataset with bulk inserts")
+    parser.add_argument("--owners", type=int, default=10)
+    parser.add_argument("--houses-per-owner", type=int, default=5)
+    parser.add_argument("--rooms-per-house", type=int, default=20)
+    parser.add_argument("--contracts-per-room", type=int, default=3, help="Số hợp đồng nối tiếp mỗi phòng (lịch sử thuê)")
+    parser.add_argument("--invoices-per-contract", type=int, default=12, help="Số tháng mỗi hợp đồng / số hóa đơn")
+    parser.add_argument("--assets-per-room", type=int, default=2)
+    parser.add_argument("--max-vacancy-days", type=int, default=15, help="Số ngày trống tối đa giữa hai hợp đồng")
+    parser.add_argument("--unpaid-ratio", type=float, default=0.15)
+    parser.add_argument("--vacant-ratio", type=float, default=0.1, help="Tỉ lệ phòng không còn hợp đồng hiệu lực")
+    parser.add_argument("--start-date", type=date.fromisoformat, default=date(2020, 1, 1))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--password", default="owner123", help="Mật khẩu chung của các chủ nhà")
+    parser.add_argument("--create-schema", action="store_true", help="CSDL trống: create_all + stamp head trước")
+    parser.add_argument("--skip-rollups", action="store_true", help="Không tính revenue_rollups / owner_kpis")
+    args = parser.parse_args()
+
+    from app.core.database import engine, SessionLocal
+
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    if args.create_schema:
+        from manage_db import create
+        create()
+
+    t0 = time.perf_counter()
+    try:
+        counts = generate_dataset(
+            engine, owners=args.owners, houses_per_owner=args.houses_per_owner, rooms_per_house=args.rooms_per_house,
+            contracts_per_room=args.contracts_per_room, invoices_per_contract=args.invoices_per_contract,
+            assets_per_room=args.assets_per_room, seed=args.seed, batch_size=args.batch_size,
+            start_date=args.start_date, max_vacancy_days=args.max_vacancy_days, unpaid_ratio=args.unpaid_ratio,
+            vacant_ratio=args.vacant_ratio, password=args.password,
+        )
+    except RuntimeError as e:
+        sys.exit(str(e))
+    elapsed = time.perf_counter() - t0
+    rows = sum(counts.values())
+    print(f"Inserted {counts} in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+
+    if not args.skip_rollups:
+        from app.crud.revenue_rollup import rebuild_revenue_rollups
+        from app.crud.owner_kpi import rebuild_owner_kpis
+
+        t0 = time.perf_counter()
+        with SessionLocal() as db:
+            rebuild_revenue_rollups(db)
+            rebuild_owner_kpis(db)
+        print(f"Rebuilt revenue_rollups / owner_kpis in {time.perf_counter() - t0:.1f}s")
+    print(f"Owner accounts: owner1@example.com .. owner{args.owners}@example.com / {args.password}")
+
+
+if __name__ == "__main__":
+    main()
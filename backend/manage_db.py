@@ -0,0 +1,87 @@
+import argparse
+import os
+import sys
+
+from app.core.database import engine, Base
+from app.core.schema import expected_heads, current_revisions
+from app.models import user, house, room, asset, rented_room, invoice, revenue_rollup, collection_version, owner_kpi  # noqa: F401
+
+# Quản lý schema CSDL (thay cho create_all lúc import app)
+# Cách dùng:
+#   python manage_db.py upgrade          # chạy migration tới head (production)
+#   python manage_db.py create           # CSDL trống: create_all + stamp head (nhanh, cho dev/test)
+#   python manage_db.py stamp 0001_initial  # CSDL cũ tạo bằng create_all, chưa có alembic_version
+#   python manage_db.py check            # so revision CSDL với code, thoát mã 1 nếu lệch
+#   python manage_db.py seed             # dữ liệu mẫu (init_db.py)
+# Dữ liệu giả lập quy mô lớn: python generate_dataset.py (xem đầu file đó)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+
+def _alembic_config():
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "alembic"))
+    return config
+
+
+def upgrade(revision: str):
+    from alembic import command
+
+    command.upgrade(_alembic_config(), revision)
+
+
+def stamp(revision: str):
+    from alembic import command
+
+    command.stamp(_alembic_config(), revision)
+
+
+def create():
+    with engine.connect() as conn:
+        if current_revisions(conn) is not None:
+            sys.exit("Database already has an alembic_version table; use `upgrade` instead")
+    Base.metadata.create_all(bind=engine)
+    stamp("head")
+
+
+def check() -> bool:
+    expected = expected_heads()
+    with engine.connect() as conn:
+        current = current_revisions(conn)
+    print(f"database: {current or 'missing'}")
+    print(f"code:     {sorted(expected)}")
+    return current is not None and set(current) == expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create / migrate / check the database schema")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_upgrade = sub.add_parser("upgrade", help="Chạy migration tới revision (mặc định head)")
+    p_upgrade.add_argument("revision", nargs="?", default="head")
+    sub.add_parser("create", help="CSDL trống: tạo bảng theo model rồi stamp head")
+    p_stamp = sub.add_parser("stamp", help="Ghi revision mà không chạy migration")
+    p_stamp.add_argument("revision")
+    sub.add_parser("check", help="So revision CSDL với code")
+    sub.add_parser("seed", help="Chèn dữ liệu mẫu")
+    args = parser.parse_args()
+
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    if args.command == "upgrade":
+        upgrade(args.revision)
+    elif args.command == "create":
+        create()
+    elif args.command == "stamp":
+        stamp(args.revision)
+    elif args.command == "check":
+        if not check():
+            sys.exit(1)
+    elif args.command == "seed":
+        from init_db import init_db
+
+        init_db()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import argparse
+
+from app.core.database import SessionLocal
+from app.models import user, house, room, asset, rented_room, invoice, revenue_rollup, collection_version, owner_kpi  # noqa: F401
+from app.crud.revenue_rollup import rebuild_revenue_rollups
+from app.crud.owner_kpi import rebuild_owner_kpis
+
+# Tính lại bảng revenue_rollups từ bảng invoices, rồi owner_kpis (dùng khi dữ liệu tổng hợp bị lệch)
+# Cách dùng: python rebuild_revenue_rollup.py [--owner-id 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild revenue_rollups and owner_kpis")
+    parser.add_argument("--owner-id", type=int, default=None, help="Chỉ tính lại cho một chủ nhà")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        count = rebuild_revenue_rollups(db, owner_id=args.owner_id)
+        print(f"Rebuilt revenue_rollups: {count} rows")
+        count = rebuild_owner_kpis(db, owner_id=args.owner_id)
+        print(f"Rebuilt owner_kpis: {count} rows")
+    except Exception as e:
+        print(f"Error rebuilding revenue_rollups: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,26 @@
 import api from './api';
 
+const POLL_INTERVAL_MS = 1500;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
 export const aiService = {
-  generateRevenueReport: async (startDate, endDate) => {
-    const response = await api.post('/ai/generate-revenue-report', {
+  // Gửi job rồi poll trạng thái, không giữ một request HTTP mở suốt lúc model chạy
+  generateRevenueReport: async (startDate, endDate, forceRefresh = false) => {
+    const { data: job } = await api.post('/ai/revenue-report-jobs', {
       start_date: startDate,
-      end_date: endDate
+      end_date: endDate,
+      force_refresh: forceRefresh
     });
-    return response.data;
+    let current = job;
+    while (current.status === 'queued' || current.status === 'running') {
+      await sleep(POLL_INTERVAL_MS);
+      ({ data: current } = await api.get(`/ai/revenue-report-jobs/${job.job_id}`));
+    }
+    if (current.status !== 'succeeded') {
+      throw new Error(current.error || 'AI report failed');
+    }
+    return current;
   }
 };
 
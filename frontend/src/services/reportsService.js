@@ -12,6 +12,21 @@ export const reportsService = {
       end_date: endDate
     });
     return response.data;
+  },
+
+  // startMonth / endMonth: 'YYYY-MM'; houseId tùy chọn
+  getOccupancy: async (startMonth, endMonth, houseId) => {
+    const response = await api.get('/reports/occupancy', {
+      params: { start_month: startMonth, end_month: endMonth, house_id: houseId }
+    });
+    return response.data;
+  },
+
+  getRevenueSeries: async (startMonth, endMonth, groupBy = 'house', houseId) => {
+    const response = await api.get('/reports/revenue-series', {
+      params: { start_month: startMonth, end_month: endMonth, group_by: groupBy, house_id: houseId }
+    });
+    return response.data;
   }
 };
 